@@ -12,7 +12,7 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def download_file(url, destination, description=""):
+def download_file(url, destination, description="", min_size=1024 * 1024):
     """Download file with progress"""
     try:
         logger.info(f"📥 Downloading {description}...")
@@ -39,7 +39,7 @@ def download_file(url, destination, description=""):
                             logger.info(f"   Progress: {progress:.1f}% ({downloaded // (1024*1024)}MB/{total_size // (1024*1024)}MB)")
         
         # Verify download
-        if os.path.exists(destination) and os.path.getsize(destination) > 1024 * 1024:
+        if os.path.exists(destination) and os.path.getsize(destination) > min_size:
             file_size = os.path.getsize(destination)
             logger.info(f"✅ Successfully downloaded {description} ({file_size} bytes)")
             return True
@@ -85,6 +85,16 @@ def main():
         'RealESRGAN_x2plus.pth': {
             'url': 'https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.1/RealESRGAN_x2plus.pth',
             'description': 'Real-ESRGAN 2x Super Resolution Model'
+        },
+        'FSRCNN_x2.pb': {
+            'url': 'https://github.com/Saafke/FSRCNN_Tensorflow/raw/master/models/FSRCNN_x2.pb',
+            'description': 'FSRCNN 2x Light Super Resolution Model',
+            'min_size': 1024
+        },
+        'FSRCNN_x4.pb': {
+            'url': 'https://github.com/Saafke/FSRCNN_Tensorflow/raw/master/models/FSRCNN_x4.pb',
+            'description': 'FSRCNN 4x Light Super Resolution Model',
+            'min_size': 1024
         }
     }
     
@@ -95,14 +105,14 @@ def main():
         model_path = os.path.join(target_dir, model_name)
         
         # Check if model already exists
-        if os.path.exists(model_path) and os.path.getsize(model_path) > 1024 * 1024:
+        if os.path.exists(model_path) and os.path.getsize(model_path) > model_info.get('min_size', 1024 * 1024):
             file_size = os.path.getsize(model_path)
             logger.info(f"✅ {model_info['description']} already exists ({file_size} bytes)")
             downloaded_count += 1
             continue
         
         # Download model
-        if download_file(model_info['url'], model_path, model_info['description']):
+        if download_file(model_info['url'], model_path, model_info['description'], model_info.get('min_size', 1024 * 1024)):
             downloaded_count += 1
         else:
             logger.error(f"❌ Failed to download {model_name}")
@@ -0,0 +1,101 @@
+"""
+Cross-thread batching for network inference.
+
+Frame workers submit their inputs and block. A single worker thread takes
+the first waiting request, keeps collecting requests until max_batch items
+are queued or max_wait has passed, runs them through one batched forward
+pass and hands every request its share of the results. Since a submitter
+blocks on its request, the batch is run straight away once it holds a
+request of every live submitting thread, so a single-threaded caller
+never waits.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class InferenceBatcher:
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch: int,
+        max_wait: float,
+        name: str = "inference-batcher",
+    ) -> None:
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.name = name
+        self.requests: "queue.Queue[Tuple[List[Any], Future]]" = queue.Queue()
+        self.worker: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        # threads that submitted, by ident, dropped once they exit
+        self.submitters: Dict[int, threading.Thread] = {}
+        # request that did not fit the previous batch, only touched by the worker
+        self.carry: Optional[Tuple[List[Any], Future]] = None
+
+    def submit(self, items: List[Any]) -> List[Any]:
+        """Queue items for the next batch and wait for their results."""
+        if not items:
+            return []
+        future: Future = Future()
+        with self.lock:
+            self.submitters[threading.get_ident()] = threading.current_thread()
+        self.ensure_worker()
+        self.requests.put((items, future))
+        return future.result()
+
+    def ensure_worker(self) -> None:
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.work, name=self.name, daemon=True)
+                self.worker.start()
+
+    def count_submitters(self) -> int:
+        with self.lock:
+            for ident, thread in list(self.submitters.items()):
+                if not thread.is_alive():
+                    del self.submitters[ident]
+            return len(self.submitters)
+
+    def collect(self) -> List[Tuple[List[Any], Future]]:
+        if self.carry is not None:
+            batch = [self.carry]
+            self.carry = None
+        else:
+            batch = [self.requests.get()]
+        count = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        submitters = self.count_submitters()
+        # each submitter has one request at most, the others may still add theirs
+        while count < self.max_batch and len(batch) < submitters:
+            timeout = deadline - time.monotonic()
+            try:
+                pending = self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if count + len(pending[0]) > self.max_batch:
+                # never split a request, it opens the next batch instead
+                self.carry = pending
+                break
+            batch.append(pending)
+            count += len(pending[0])
+        return batch
+
+    def work(self) -> None:
+        while True:
+            batch = self.collect()
+            items = [item for request_items, _ in batch for item in request_items]
+            try:
+                results = self.run_batch(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_items, future in batch:
+                future.set_result(results[start : start + len(request_items)])
+                start += len(request_items)
@@ -0,0 +1,241 @@
+"""
+ROI-local blending helpers shared by the frame processors.
+
+Pasting an aligned face crop back into a frame only touches the bounding
+region of the warped crop. Its soft blend mask is built the way
+inswapper's paste_back builds it, but eroded and blurred inside that
+region instead of at full frame size for every face. Partial blends of an
+enhanced frame likewise only touch the feathered regions around the faces.
+"""
+
+from typing import Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from modules.typing import Frame
+
+
+def get_face_size(affine: np.ndarray, crop_size: int) -> float:
+    """Side length in frame pixels of a crop aligned with the given affine."""
+    scale = np.sqrt(abs(np.linalg.det(affine[:, :2])))
+    return crop_size / max(scale, 1e-6)
+
+
+def get_roi(
+    inverse_affine: np.ndarray, crop_size: int, frame_shape: Tuple[int, ...]
+) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Frame-clipped bounding box (x0, y0, x1, y1) of a warped crop, with the
+    margin its paste mask blurs into.
+    """
+    corners = np.array(
+        [[0, 0, 1], [crop_size, 0, 1], [0, crop_size, 1], [crop_size, crop_size, 1]],
+        dtype=np.float32,
+    )
+    points = corners @ inverse_affine.T
+    x0, y0 = np.floor(points.min(axis=0)).astype(int) - 1
+    x1, y1 = np.ceil(points.max(axis=0)).astype(int) + 1
+    # the mask blur reaches max(mask_size // 20, 5), mask_size is at most the box side
+    margin = max(max(x1 - x0, y1 - y0) // 20, 5) + 1
+    x0, y0 = max(0, x0 - margin), max(0, y0 - margin)
+    x1, y1 = min(frame_shape[1], x1 + margin), min(frame_shape[0], y1 + margin)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+def get_paste_mask(
+    crop_to_roi: np.ndarray,
+    crop_size: int,
+    roi_size: Tuple[int, int],
+    erode_divisor: int = 10,
+    blur_divisor: int = 20,
+) -> Optional[np.ndarray]:
+    """
+    Soft blend mask of a warped crop, built like inswapper's paste-back mask.
+
+    The white crop is warped into the ROI and thresholded, then eroded by
+    max(mask_size // erode_divisor, 10) and blurred by
+    max(mask_size // blur_divisor, 5), mask_size being the geometric mean
+    side of the frame-clipped mask. The ROI reaches the frame edges where the
+    crop does and keeps a zero margin elsewhere, so erosion and blur see the
+    same borders as on the full frame. None when no pixel of the crop lands
+    in the ROI.
+    """
+    white = np.full((crop_size, crop_size), 255, dtype=np.float32)
+    mask = cv2.warpAffine(white, crop_to_roi, roi_size, borderValue=0.0)
+    mask[mask > 20] = 255
+    rows, columns = np.where(mask == 255)
+    if rows.size == 0:
+        return None
+    mask_size = int(np.sqrt((rows.max() - rows.min()) * (columns.max() - columns.min())))
+    erode_size = max(mask_size // erode_divisor, 10)
+    mask = cv2.erode(mask, np.ones((erode_size, erode_size), np.uint8), iterations=1)
+    blur_size = max(mask_size // blur_divisor, 5)
+    mask = cv2.GaussianBlur(mask, (2 * blur_size + 1, 2 * blur_size + 1), 0)
+    return mask / 255
+
+
+def paste_crop(
+    frame: Frame,
+    crop: Frame,
+    affine: np.ndarray,
+    erode_divisor: int = 10,
+    blur_divisor: int = 20,
+) -> Frame:
+    """Blend an aligned crop back into the frame in place, inside its ROI only."""
+    crop_size = crop.shape[0]
+    inverse_affine = cv2.invertAffineTransform(affine)
+    roi = get_roi(inverse_affine, crop_size, frame.shape)
+    if roi is None:
+        return frame
+    x0, y0, x1, y1 = roi
+    roi_size = (x1 - x0, y1 - y0)
+
+    crop_to_roi = inverse_affine.copy()
+    crop_to_roi[:, 2] -= (x0, y0)
+    mask = get_paste_mask(crop_to_roi, crop_size, roi_size, erode_divisor, blur_divisor)
+    if mask is None:
+        return frame
+    warped_crop = cv2.warpAffine(crop, crop_to_roi, roi_size, borderValue=0.0)
+
+    frame_roi = frame[y0:y1, x0:x1]
+    mask = mask[:, :, np.newaxis]
+    blended = mask * warped_crop + (1 - mask) * frame_roi.astype(np.float32)
+    frame_roi[:] = blended.astype(np.uint8)
+    return frame
+
+
+def paste_crops(frame: Frame, crops: List[Tuple[Frame, np.ndarray]]) -> Frame:
+    """Composite several aligned crops into a single copy of the frame."""
+    result = frame.copy()
+    for crop, affine in crops:
+        paste_crop(result, crop, affine)
+    return result
+
+
+def get_face_region(
+    bbox: np.ndarray, padding: float, frame_shape: Tuple[int, ...]
+) -> Optional[Tuple[int, int, int, int]]:
+    """Frame-clipped face box (x0, y0, x1, y1), grown by padding times its size on every side."""
+    x0, y0, x1, y1 = bbox[:4]
+    pad_x, pad_y = (x1 - x0) * padding, (y1 - y0) * padding
+    x0, y0 = max(0, int(x0 - pad_x)), max(0, int(y0 - pad_y))
+    x1, y1 = min(frame_shape[1], int(np.ceil(x1 + pad_x))), min(frame_shape[0], int(np.ceil(y1 + pad_y)))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+def get_feather_mask(width: int, height: int, feather_divisor: int) -> np.ndarray:
+    """Mask of ones fading linearly to zero over the outer 1/feather_divisor of each side."""
+
+    def ramp(size: int) -> np.ndarray:
+        feather = max(1, size // feather_divisor)
+        distance = np.minimum(np.arange(size), np.arange(size)[::-1]) + 1
+        return np.minimum(distance / feather, 1.0).astype(np.float32)
+
+    return np.outer(ramp(height), ramp(width))
+
+
+def merge_regions(
+    regions: List[Tuple[int, int, int, int]]
+) -> List[Tuple[Tuple[int, int, int, int], List[Tuple[int, int, int, int]]]]:
+    """Group overlapping regions, so overlaps are blended once: [(union, members)]."""
+    groups = [(region, [region]) for region in regions]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(groups)):
+            for j in range(i + 1, len(groups)):
+                (ax0, ay0, ax1, ay1), a_members = groups[i]
+                (bx0, by0, bx1, by1), b_members = groups[j]
+                if ax0 < bx1 and bx0 < ax1 and ay0 < by1 and by0 < ay1:
+                    union = (min(ax0, bx0), min(ay0, by0), max(ax1, bx1), max(ay1, by1))
+                    groups[i] = (union, a_members + b_members)
+                    del groups[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return groups
+
+
+def blend_face_regions(
+    frame: Frame,
+    processed_frame: Frame,
+    faces: List[Any],
+    weight: float,
+    padding: float = 0.5,
+    feather_divisor: int = 8,
+) -> Frame:
+    """
+    Blend processed_frame into frame in place, only around the given faces.
+
+    The ROI counterpart of cv2.addWeighted(frame, 1 - weight, processed_frame,
+    weight, 0) for processors that only change face regions: inside each face
+    box, grown by padding, the result is weighted the same way, fading to the
+    untouched frame over a feathered border. Overlapping boxes share one mask.
+    """
+    if processed_frame is frame or processed_frame.shape != frame.shape:
+        return frame
+    regions = []
+    for face in faces:
+        bbox = getattr(face, "bbox", None)
+        if bbox is None:
+            continue
+        region = get_face_region(bbox, padding, frame.shape)
+        if region is not None:
+            regions.append(region)
+
+    for (x0, y0, x1, y1), members in merge_regions(regions):
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+        for mx0, my0, mx1, my1 in members:
+            member_mask = mask[my0 - y0 : my1 - y0, mx0 - x0 : mx1 - x0]
+            np.maximum(
+                member_mask,
+                get_feather_mask(mx1 - mx0, my1 - my0, feather_divisor),
+                out=member_mask,
+            )
+        frame_roi = frame[y0:y1, x0:x1]
+        mask = (mask * weight)[:, :, np.newaxis]
+        blended = frame_roi + mask * (processed_frame[y0:y1, x0:x1].astype(np.float32) - frame_roi)
+        frame_roi[:] = blended.astype(np.uint8)
+    return frame
+
+
+def smooth_face_edges(frame: Frame, face: Any, strength: float = 0.1) -> Frame:
+    """
+    Soften a face's contour in place with a slight blur.
+
+    The convex hull of the 106 landmarks, blurred into a soft mask, mixes in
+    strength of a 3x3 Gaussian blur of the frame. Only the hull's bounding
+    region, plus the few pixels both blurs reach, is touched.
+    """
+    landmarks = getattr(face, "landmark_2d_106", None)
+    if landmarks is None:
+        return frame
+    hull = cv2.convexHull(landmarks.astype(np.int32))
+    x, y, width, height = cv2.boundingRect(hull)
+    # the 5x5 mask blur spreads 2 pixels, the 3x3 frame blur reads 1 more
+    margin = 4
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1, y1 = min(frame.shape[1], x + width + margin), min(frame.shape[0], y + height + margin)
+    if x1 <= x0 or y1 <= y0:
+        return frame
+
+    mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    cv2.fillPoly(mask, [hull - (x0, y0)], 255)
+    mask = cv2.GaussianBlur(mask, (5, 5), 2).astype(np.float32) / 255.0
+    mask = (mask * strength)[:, :, np.newaxis]
+    # blur with the frame around the region as context, like a full-frame blur
+    bx0, by0 = max(0, x0 - 1), max(0, y0 - 1)
+    bx1, by1 = min(frame.shape[1], x1 + 1), min(frame.shape[0], y1 + 1)
+    blurred = cv2.GaussianBlur(frame[by0:by1, bx0:bx1], (3, 3), 1)
+    blurred = blurred[y0 - by0 : y0 - by0 + (y1 - y0), x0 - bx0 : x0 - bx0 + (x1 - x0)]
+
+    frame_roi = frame[y0:y1, x0:x1]
+    smoothed = frame_roi * (1 - mask) + blurred.astype(np.float32) * mask
+    frame_roi[:] = smoothed.astype(np.uint8)
+    return frame
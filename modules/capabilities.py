@@ -0,0 +1,142 @@
+"""
+Availability of the optional subsystems and negative caching of failed loads.
+
+probe_capabilities checks once, at startup, which optional subsystems can
+run on this worker: super resolution, the GFPGAN face enhancer, the NSFW
+filter and TensorRT. Only whether their packages are installed and their
+model files exist is checked, nothing is imported or loaded, so workers
+on the onnx backends never pull in torch. Subsystems that are not
+available are skipped by their callers without further attempts.
+
+Model loads that fail are remembered for --load-retry-interval seconds.
+Until then callers skip the model straight away instead of repeating the
+import, model search and load for every frame.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import modules.globals
+
+logger = logging.getLogger(__name__)
+
+CAPABILITIES: Dict[str, bool] = {}
+# why a subsystem is not available, for the logs and the job reports
+CAPABILITY_ERRORS: Dict[str, str] = {}
+# monotonic time of the last failed load, by load key
+FAILED_LOADS: Dict[Hashable, float] = {}
+LOCK = threading.Lock()
+
+
+def require_modules(*names: str) -> None:
+    """Raise when a module is not installed, without importing it"""
+    for name in names:
+        if importlib.util.find_spec(name) is None:
+            raise ModuleNotFoundError(f"No module named '{name}'")
+
+
+def probe_super_resolution() -> None:
+    """Real-ESRGAN on torch, or an exported graph for ONNX Runtime"""
+    try:
+        require_modules("torch", "basicsr")
+    except ModuleNotFoundError as e:
+        from modules.processors.frame.super_resolution import SR_ONNX_MODELS, find_model_file
+
+        require_modules("onnxruntime")
+        if not any(find_model_file(model_name) for model_name in SR_ONNX_MODELS.values()):
+            raise RuntimeError(f"{e} and no exported graph was found")
+
+
+def probe_face_enhancer() -> None:
+    """GFPGANer and its weights, for the torch backend"""
+    require_modules("torch", "gfpgan")
+    model_path = os.path.join(modules.globals.get_models_dir(), "GFPGANv1.4.pth")
+    if not os.path.isfile(model_path):
+        raise FileNotFoundError(f"GFPGAN weights not found: {model_path}")
+
+
+def probe_nsfw() -> None:
+    require_modules("opennsfw2")
+
+
+def probe_tensorrt() -> None:
+    require_modules("torch_tensorrt")
+
+
+CAPABILITY_PROBES: Dict[str, Callable[[], None]] = {
+    "super_resolution": probe_super_resolution,
+    "face_enhancer": probe_face_enhancer,
+    "nsfw": probe_nsfw,
+    "tensorrt": probe_tensorrt,
+}
+
+
+def probe_capability(name: str) -> bool:
+    try:
+        CAPABILITY_PROBES[name]()
+        available = True
+    except Exception as e:
+        available = False
+        CAPABILITY_ERRORS[name] = str(e)
+    CAPABILITIES[name] = available
+    return available
+
+
+def probe_capabilities() -> Dict[str, bool]:
+    """Probe every optional subsystem once, later calls return the recorded result"""
+    with LOCK:
+        for name in CAPABILITY_PROBES:
+            if name not in CAPABILITIES:
+                probe_capability(name)
+        capabilities = dict(CAPABILITIES)
+    for name, available in capabilities.items():
+        if available:
+            logger.info(f"✅ {name} available")
+        else:
+            logger.warning(f"⚠️ {name} not available: {CAPABILITY_ERRORS.get(name)}")
+    return capabilities
+
+
+def is_available(name: str) -> bool:
+    """Whether a subsystem can run here, probed on first use when the startup probe did not run"""
+    available = CAPABILITIES.get(name)
+    if available is None:
+        with LOCK:
+            available = CAPABILITIES.get(name)
+            if available is None:
+                available = probe_capability(name)
+    return available
+
+
+def has_load_failed(key: Hashable) -> bool:
+    """True while a failed load of key is within the retry interval"""
+    failed_at = FAILED_LOADS.get(key)
+    if failed_at is None:
+        return False
+    if time.monotonic() - failed_at < modules.globals.load_retry_interval:
+        return True
+    with LOCK:
+        FAILED_LOADS.pop(key, None)
+    return False
+
+
+def record_load_failure(key: Hashable, error: Optional[Any] = None) -> None:
+    with LOCK:
+        FAILED_LOADS[key] = time.monotonic()
+    reason = f" ({error})" if error is not None else ""
+    logger.warning(
+        f"⚠️ Loading {key} failed{reason}, not retried for {modules.globals.load_retry_interval:.0f}s"
+    )
+
+
+def get_capabilities() -> Dict[str, Any]:
+    """Probed subsystems and the loads currently skipped, for job reports"""
+    with LOCK:
+        return {
+            "available": dict(CAPABILITIES),
+            "failed_loads": [str(key) for key in FAILED_LOADS],
+        }
@@ -41,6 +41,7 @@ if not is_headless:
 else:
     ui = MockUI()
 
+from modules.capabilities import probe_capabilities
 from modules.processors.frame.core import get_frame_processors_modules
 from modules.utilities import has_image_extension, is_image, is_video, detect_fps, create_video, extract_frames, get_temp_frame_paths, restore_audio, create_temp, move_temp, clean_temp, normalize_output_path
 
@@ -57,7 +58,7 @@ def parse_args() -> None:
     program.add_argument('-s', '--source', help='select an source image', dest='source_path')
     program.add_argument('-t', '--target', help='select an target image or video', dest='target_path')
     program.add_argument('-o', '--output', help='select output file or directory', dest='output_path')
-    program.add_argument('--frame-processor', help='pipeline of frame processors', dest='frame_processor', default=['face_swapper'], choices=['face_swapper', 'face_enhancer'], nargs='+')
+    program.add_argument('--frame-processor', help='pipeline of frame processors', dest='frame_processor', default=['face_swapper'], choices=['face_swapper', 'face_enhancer', 'super_resolution'], nargs='+')
     program.add_argument('--keep-fps', help='keep original fps', dest='keep_fps', action='store_true', default=False)
     program.add_argument('--keep-audio', help='keep original audio', dest='keep_audio', action='store_true', default=True)
     program.add_argument('--keep-frames', help='keep temporary frames', dest='keep_frames', action='store_true', default=False)
@@ -73,6 +74,39 @@ def parse_args() -> None:
     program.add_argument('--max-memory', help='maximum amount of RAM in GB', dest='max_memory', type=int, default=suggest_max_memory())
     program.add_argument('--execution-provider', help='execution provider', dest='execution_provider', default=['cpu'], choices=suggest_execution_providers(), nargs='+')
     program.add_argument('--execution-threads', help='number of execution threads', dest='execution_threads', type=int, default=suggest_execution_threads())
+    program.add_argument('--frame-batch-size', help='number of frames processed together per execution thread', dest='frame_batch_size', type=int, default=1)
+    program.add_argument('--swapper-precision', help='inswapper model variant, auto picks it from the execution provider', dest='swapper_precision', default=modules.globals.swapper_precision, choices=['auto', 'fp16', 'fp32', 'int8'])
+    program.add_argument('--frame-dedup', help='reuse the output of repeated video frames', dest='frame_dedup', action='store_true', default=modules.globals.frame_dedup)
+    program.add_argument('--frame-dedup-threshold', help='largest pixel difference (0-255) of the 64x64 frame signatures at which a frame counts as a repeat', dest='frame_dedup_threshold', type=float, default=modules.globals.frame_dedup_threshold)
+    program.add_argument('--temporal-reuse', help='reuse swapped and enhanced crops of near-static faces across video frames', dest='temporal_reuse', action='store_true', default=modules.globals.temporal_reuse)
+    program.add_argument('--temporal-reuse-threshold', help='largest pixel difference (0-255) of the 64x64 crop thumbnails at which a cached crop is reused', dest='temporal_reuse_threshold', type=float, default=modules.globals.temporal_reuse_threshold)
+    program.add_argument('--temporal-reuse-max', help='reuses in a row before a crop is recomputed', dest='temporal_reuse_max', type=int, default=modules.globals.temporal_reuse_max)
+    program.add_argument('--video-mode', help='full runs every frame through the models, fast only every keyframe and propagates faces in between', dest='video_mode', default=modules.globals.video_mode, choices=['full', 'fast'])
+    program.add_argument('--keyframe-interval', help='frames between keyframes in the fast video mode', dest='keyframe_interval', type=int, default=modules.globals.keyframe_interval)
+    program.add_argument('--sr-scale', help='super resolution upscaling factor', dest='sr_scale', type=int, default=modules.globals.sr_scale, choices=[2, 4])
+    program.add_argument('--sr-mode', help='run Real-ESRGAN on the whole frame (full) or only around the faces (face)', dest='sr_mode', default=modules.globals.sr_mode, choices=['full', 'face'])
+    program.add_argument('--sr-tile-size', help='largest super resolution tile side in pixels (0 = plan from free memory)', dest='sr_tile_size', type=int, default=modules.globals.sr_tile_size)
+    program.add_argument('--sr-backend', help='super resolution runtime (auto = torch on CUDA, the ONNX graph or else torch on CPU)', dest='sr_backend', default=modules.globals.sr_backend, choices=['auto', 'torch', 'torchscript', 'onnx'])
+    program.add_argument('--sr-precision', help='super resolution precision (auto = fp16 on CUDA, fp32 on CPU)', dest='sr_precision', default=modules.globals.sr_precision, choices=['auto', 'fp16', 'fp32'])
+    program.add_argument('--sr-tile-batch-size', help='maximum super resolution tiles per forward pass', dest='sr_tile_batch_size', type=int, default=modules.globals.sr_tile_batch_size)
+    program.add_argument('--swapper-pool-size', help='number of swapper sessions shared by the execution threads, tune together with --ort-intra-op-threads', dest='swapper_pool_size', type=int, default=modules.globals.swapper_pool_size)
+    program.add_argument('--swapper-thread-affinity', help='pin each execution thread to one pooled swapper session', dest='swapper_thread_affinity', action='store_true', default=modules.globals.swapper_thread_affinity)
+    program.add_argument('--face-enhancer-mode', help='let GFPGAN detect and enhance every face of the frame (full) or enhance only the target faces by their landmarks (crop)', dest='face_enhancer_mode', default=modules.globals.face_enhancer_mode, choices=['crop', 'full'])
+    program.add_argument('--face-enhancer-backend', help='run the face enhancer on torch or on the exported onnx graph', dest='face_enhancer_backend', default=modules.globals.face_enhancer_backend, choices=['torch', 'onnx'])
+    program.add_argument('--face-enhancer-precision', help='precision of the onnx face enhancer graph', dest='face_enhancer_precision', default=modules.globals.face_enhancer_precision, choices=['fp32', 'int8'])
+    program.add_argument('--enhancer-min-face-size', help='smallest aligned face region in pixels (about 1.6x the face box) the face enhancer restores', dest='enhancer_min_face_size', type=int, default=modules.globals.enhancer_min_face_size)
+    program.add_argument('--enhancer-max-face-size', help='largest aligned face region in pixels (about 1.6x the face box) the face enhancer restores (0 = no limit)', dest='enhancer_max_face_size', type=int, default=modules.globals.enhancer_max_face_size)
+    program.add_argument('--enhancer-min-det-score', help='lowest detection score the face enhancer restores', dest='enhancer_min_det_score', type=float, default=modules.globals.enhancer_min_det_score)
+    program.add_argument('--enhancer-batch-size', help='maximum face crops per face enhancer forward pass', dest='enhancer_batch_size', type=int, default=modules.globals.enhancer_batch_size)
+    program.add_argument('--enhancer-batch-wait', help='milliseconds a face enhancer batch waits for crops from other frames', dest='enhancer_batch_wait_ms', type=float, default=modules.globals.enhancer_batch_wait_ms)
+    program.add_argument('--load-retry-interval', help='seconds a failed optional model load is skipped before it is tried again', dest='load_retry_interval', type=float, default=modules.globals.load_retry_interval)
+    program.add_argument('--ort-graph-optimization-level', help='onnxruntime graph optimization level', dest='ort_graph_optimization_level', default=modules.globals.ort_graph_optimization_level, choices=['disable', 'basic', 'extended', 'all'])
+    program.add_argument('--ort-intra-op-threads', help='onnxruntime intra-op threads per session (0 = auto)', dest='ort_intra_op_threads', type=int, default=modules.globals.ort_intra_op_threads)
+    program.add_argument('--ort-inter-op-threads', help='onnxruntime inter-op threads per session (0 = auto)', dest='ort_inter_op_threads', type=int, default=modules.globals.ort_inter_op_threads)
+    program.add_argument('--ort-execution-mode', help='onnxruntime execution mode', dest='ort_execution_mode', default=modules.globals.ort_execution_mode, choices=['sequential', 'parallel'])
+    program.add_argument('--ort-disable-cpu-mem-arena', help='disable the onnxruntime cpu memory arena', dest='ort_enable_cpu_mem_arena', action='store_false', default=modules.globals.ort_enable_cpu_mem_arena)
+    program.add_argument('--ort-disable-io-binding', help='run onnx sessions without preallocated io bindings', dest='ort_io_binding', action='store_false', default=modules.globals.ort_io_binding)
+    program.add_argument('--ort-disable-optimized-model-cache', help='do not save or load optimized onnx graphs', dest='ort_optimized_model_cache', action='store_false', default=modules.globals.ort_optimized_model_cache)
     program.add_argument('-v', '--version', action='version', version=f'{modules.metadata.name} {modules.metadata.version}')
 
     # register deprecated args
@@ -102,6 +136,39 @@ def parse_args() -> None:
     modules.globals.max_memory = args.max_memory
     modules.globals.execution_providers = decode_execution_providers(args.execution_provider)
     modules.globals.execution_threads = args.execution_threads
+    modules.globals.frame_batch_size = args.frame_batch_size
+    modules.globals.swapper_precision = args.swapper_precision
+    modules.globals.frame_dedup = args.frame_dedup
+    modules.globals.frame_dedup_threshold = args.frame_dedup_threshold
+    modules.globals.temporal_reuse = args.temporal_reuse
+    modules.globals.temporal_reuse_threshold = args.temporal_reuse_threshold
+    modules.globals.temporal_reuse_max = args.temporal_reuse_max
+    modules.globals.video_mode = args.video_mode
+    modules.globals.keyframe_interval = args.keyframe_interval
+    modules.globals.sr_scale = args.sr_scale
+    modules.globals.sr_mode = args.sr_mode
+    modules.globals.sr_tile_size = args.sr_tile_size
+    modules.globals.sr_tile_batch_size = args.sr_tile_batch_size
+    modules.globals.sr_backend = args.sr_backend
+    modules.globals.sr_precision = args.sr_precision
+    modules.globals.load_retry_interval = args.load_retry_interval
+    modules.globals.swapper_pool_size = args.swapper_pool_size
+    modules.globals.swapper_thread_affinity = args.swapper_thread_affinity
+    modules.globals.face_enhancer_mode = args.face_enhancer_mode
+    modules.globals.face_enhancer_backend = args.face_enhancer_backend
+    modules.globals.face_enhancer_precision = args.face_enhancer_precision
+    modules.globals.enhancer_min_face_size = args.enhancer_min_face_size
+    modules.globals.enhancer_max_face_size = args.enhancer_max_face_size
+    modules.globals.enhancer_min_det_score = args.enhancer_min_det_score
+    modules.globals.enhancer_batch_size = args.enhancer_batch_size
+    modules.globals.enhancer_batch_wait_ms = args.enhancer_batch_wait_ms
+    modules.globals.ort_graph_optimization_level = args.ort_graph_optimization_level
+    modules.globals.ort_intra_op_threads = args.ort_intra_op_threads
+    modules.globals.ort_inter_op_threads = args.ort_inter_op_threads
+    modules.globals.ort_execution_mode = args.ort_execution_mode
+    modules.globals.ort_enable_cpu_mem_arena = args.ort_enable_cpu_mem_arena
+    modules.globals.ort_optimized_model_cache = args.ort_optimized_model_cache
+    modules.globals.ort_io_binding = args.ort_io_binding
     modules.globals.lang = args.lang
 
     #for ENHANCER tumbler:
@@ -274,6 +341,7 @@ def run() -> None:
     for frame_processor in get_frame_processors_modules(modules.globals.frame_processors):
         if not frame_processor.pre_check():
             return
+    probe_capabilities()
     limit_resources()
     if modules.globals.headless:
         start()
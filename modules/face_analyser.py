@@ -1,12 +1,15 @@
 import os
+import glob
 import shutil
 from typing import Any
 import insightface
+from insightface.utils import ensure_available
 
 import cv2
 import numpy as np
 import modules.globals
 from tqdm import tqdm
+from modules.onnx_session import load_insightface_model
 from modules.typing import Frame
 from modules.cluster_analysis import find_cluster_centroids, find_closest_centroid
 from modules.utilities import get_temp_directory_path, create_temp, extract_frames, clean_temp, get_temp_frame_paths
@@ -15,11 +18,27 @@ from pathlib import Path
 FACE_ANALYSER = None
 
 
+class FaceAnalysis(insightface.app.FaceAnalysis):
+    """insightface FaceAnalysis whose models run on sessions from modules.onnx_session."""
+
+    def __init__(self, name: str, root: str = '~/.insightface') -> None:
+        self.models = {}
+        self.model_dir = ensure_available('models', name, root=root)
+        for onnx_file in sorted(glob.glob(os.path.join(self.model_dir, '*.onnx'))):
+            model = load_insightface_model(onnx_file)
+            if model is None:
+                print('model not recognized:', onnx_file)
+            elif model.taskname not in self.models:
+                self.models[model.taskname] = model
+        assert 'detection' in self.models
+        self.det_model = self.models['detection']
+
+
 def get_face_analyser() -> Any:
     global FACE_ANALYSER
 
     if FACE_ANALYSER is None:
-        FACE_ANALYSER = insightface.app.FaceAnalysis(name='buffalo_l', providers=modules.globals.execution_providers)
+        FACE_ANALYSER = FaceAnalysis(name='buffalo_l')
         FACE_ANALYSER.prepare(ctx_id=0, det_size=(640, 640))
     return FACE_ANALYSER
 
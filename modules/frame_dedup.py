@@ -0,0 +1,90 @@
+"""
+Whole-frame deduplication for the video paths.
+
+Screen recordings, slideshows and frozen segments repeat the same frame
+many times. Frames are compared by a downscaled grey signature against the
+first frame of the current run of duplicates (not the previous frame, so a
+slow pan never chains into one run), and duplicates reuse that frame's
+processed output instead of going through the models again.
+
+Only near-exact repeats count: no signature pixel may differ by more than
+--frame-dedup-threshold. A mean difference would pass lip and eye motion of
+a static talking head as a repeat and freeze the output.
+"""
+
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+import modules.globals
+from modules.typing import Frame
+
+SIGNATURE_SIZE = 64
+
+
+def get_frame_signature(frame: Frame) -> np.ndarray:
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(
+        frame, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+
+
+def is_duplicate_signature(signature: np.ndarray, reference: Optional[np.ndarray]) -> bool:
+    return (
+        reference is not None
+        and np.max(np.abs(signature - reference)) <= modules.globals.frame_dedup_threshold
+    )
+
+
+def find_duplicate_frames(frame_paths: List[str]) -> Dict[str, str]:
+    """Map each duplicate frame path to the path of the earlier frame it repeats."""
+    duplicates: Dict[str, str] = {}
+    reference = None
+    reference_path = None
+    for frame_path in frame_paths:
+        # reduced decoding is enough for the signature and much cheaper for jpg frames
+        frame = cv2.imread(frame_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if frame is None:
+            reference = reference_path = None
+            continue
+        signature = get_frame_signature(frame)
+        if is_duplicate_signature(signature, reference):
+            duplicates[frame_path] = reference_path
+        else:
+            reference, reference_path = signature, frame_path
+    return duplicates
+
+
+class FrameDeduplicator:
+    """
+    Streaming deduplication for frame-by-frame loops.
+
+    lookup() returns the processed output of the run's first frame when the
+    frame repeats it, otherwise None, and the caller processes the frame and
+    hands the result to store().
+    """
+
+    def __init__(self) -> None:
+        self.reference: Optional[np.ndarray] = None
+        self.pending: Optional[np.ndarray] = None
+        self.output: Optional[Frame] = None
+        self.duplicates = 0
+
+    def lookup(self, frame: Frame) -> Optional[Frame]:
+        if not modules.globals.frame_dedup:
+            return None
+        signature = get_frame_signature(frame)
+        if self.output is not None and is_duplicate_signature(signature, self.reference):
+            self.duplicates += 1
+            return self.output
+        self.pending = signature
+        self.output = None
+        return None
+
+    def store(self, output: Frame) -> None:
+        if self.pending is None:
+            return
+        self.reference, self.pending = self.pending, None
+        self.output = output
@@ -1,4 +1,5 @@
 import os
+import json
 from typing import List, Dict, Any
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -30,6 +31,61 @@ live_resizable = True
 max_memory = None
 execution_providers: List[str] = []
 execution_threads = None
+frame_batch_size = 1  # frames handed to a worker per task, their faces share one swapper run
+swap_batch_size = 16  # maximum number of aligned face crops per swapper inference
+swapper_precision = os.environ.get('SWAPPER_PRECISION', 'auto')  # auto, fp16, fp32 or int8
+# whole-frame deduplication of video frames
+frame_dedup = os.environ.get('FRAME_DEDUP', 'false').lower() == 'true'
+frame_dedup_threshold = float(os.environ.get('FRAME_DEDUP_THRESHOLD', '2'))  # max abs diff of 64x64 gray frames
+# temporal reuse of swapped/enhanced crops for near-static faces in videos
+temporal_reuse = os.environ.get('TEMPORAL_REUSE', 'false').lower() == 'true'
+temporal_reuse_threshold = float(os.environ.get('TEMPORAL_REUSE_THRESHOLD', '4'))  # max abs diff of 64x64 gray crops
+temporal_reuse_max = int(os.environ.get('TEMPORAL_REUSE_MAX', '8'))  # reuses in a row before a forced recompute
+# fast video mode: only keyframes go through the models
+video_mode = os.environ.get('VIDEO_MODE', 'full')  # full or fast (keyframes only, propagated in between)
+keyframe_interval = int(os.environ.get('KEYFRAME_INTERVAL', '5'))
+face_enhancer_mode = os.environ.get('FACE_ENHANCER_MODE', 'full')  # full: GFPGAN detects on the whole frame, crop: enhance only the swapped faces by their kps
+face_enhancer_backend = os.environ.get('FACE_ENHANCER_BACKEND', 'torch')  # torch (GFPGANer) or onnx (exported GFPGAN graph)
+face_enhancer_precision = os.environ.get('FACE_ENHANCER_PRECISION', 'fp32')  # fp32 or int8, onnx backend only
+# face enhancement policy, faces outside these limits are not enhanced; sizes are
+# the side of the aligned 512 FFHQ region in frame pixels, about 1.6x the face box
+enhancer_min_face_size = int(os.environ.get('ENHANCER_MIN_FACE_SIZE', '64'))  # pixels
+enhancer_max_face_size = int(os.environ.get('ENHANCER_MAX_FACE_SIZE', '0'))  # pixels, 0 for no limit
+enhancer_min_det_score = float(os.environ.get('ENHANCER_MIN_DET_SCORE', '0.5'))
+enhancer_batch_size = int(os.environ.get('ENHANCER_BATCH_SIZE', '4'))  # face crops per GFPGAN forward pass
+enhancer_batch_wait_ms = float(os.environ.get('ENHANCER_BATCH_WAIT_MS', '5'))  # how long a batch waits for crops from other frames
+swapper_pool_size = int(os.environ.get('SWAPPER_POOL_SIZE', '1'))  # swapper sessions frame workers run on concurrently
+swapper_thread_affinity = os.environ.get('SWAPPER_THREAD_AFFINITY', 'false').lower() == 'true'  # pin each worker thread to one pooled session
+
+# super resolution frame processor
+sr_scale = int(os.environ.get('SR_SCALE', '4'))  # 2 or 4
+sr_max_size = int(os.environ.get('SR_MAX_SIZE', '4096'))  # largest output side, larger frames get a smaller or plain upscale
+output_quality = os.environ.get('OUTPUT_QUALITY', 'max')  # fast, balanced or max, see modules/output_resolution.py
+image_preset = os.environ.get('IMAGE_PRESET', 'max')  # fast, balanced or max, stages run on image jobs, see modules/image_pipeline.py
+# Real-ESRGAN tiling, see plan_tiles in modules/processors/frame/super_resolution.py
+sr_tile_size = int(os.environ.get('SR_TILE_SIZE', '0'))  # largest tile side in input pixels, 0 plans it from free memory
+sr_tile_batch_size = int(os.environ.get('SR_TILE_BATCH_SIZE', '4'))  # maximum tiles per forward pass
+sr_memory_fraction = float(os.environ.get('SR_MEMORY_FRACTION', '0.5'))  # share of free RAM/VRAM a forward pass may use
+sr_backend = os.environ.get('SR_BACKEND', 'auto')  # auto, torch, torchscript or onnx; auto: torch on CUDA, the ONNX graph or else torch on CPU
+sr_precision = os.environ.get('SR_PRECISION', 'auto')  # auto, fp16 or fp32; auto: fp16 on CUDA, CPU always runs fp32
+sr_model_cache_mb = int(os.environ.get('SR_MODEL_CACHE_MB', '1024'))  # weights of resident super resolution models, least recently used are evicted
+sr_mode = os.environ.get('SR_MODE', 'full')  # full: Real-ESRGAN on the whole frame, face: only around the faces, the rest is resized
+sr_face_padding = float(os.environ.get('SR_FACE_PADDING', '0.5'))  # margin around each face box in face mode, times the box size
+
+# optional subsystems, see modules/capabilities.py
+load_retry_interval = float(os.environ.get('LOAD_RETRY_INTERVAL', '300'))  # seconds a failed model load is skipped before it is tried again
+
+# ONNX Runtime session tuning, see modules/onnx_session.py
+ort_graph_optimization_level = os.environ.get('ORT_GRAPH_OPTIMIZATION_LEVEL', 'all')  # disable, basic, extended or all
+ort_intra_op_threads = int(os.environ.get('ORT_INTRA_OP_THREADS', '0'))  # 0 lets onnxruntime decide
+ort_inter_op_threads = int(os.environ.get('ORT_INTER_OP_THREADS', '0'))
+ort_execution_mode = os.environ.get('ORT_EXECUTION_MODE', 'sequential')  # sequential or parallel
+ort_enable_cpu_mem_arena = os.environ.get('ORT_ENABLE_CPU_MEM_ARENA', 'true').lower() == 'true'
+ort_enable_mem_pattern = os.environ.get('ORT_ENABLE_MEM_PATTERN', 'true').lower() == 'true'
+ort_optimized_model_cache = os.environ.get('ORT_OPTIMIZED_MODEL_CACHE', 'true').lower() == 'true'
+ort_io_binding = os.environ.get('ORT_IO_BINDING', 'true').lower() == 'true'  # preallocated per-thread buffers
+# per-model overrides keyed by model file name, e.g. {"inswapper_128_fp16.onnx": {"execution_mode": "parallel"}}
+ort_model_options: Dict[str, Dict[str, Any]] = json.loads(os.environ.get('ORT_MODEL_OPTIONS', '{}'))
 
 # Check if running in headless mode (RunPod Serverless)
 headless = os.environ.get('HEADLESS', 'false').lower() == 'true' or os.environ.get('DISPLAY', '') == ''
@@ -0,0 +1,201 @@
+"""
+Staged face swap pipeline for still images.
+
+The image handlers each hard-wired the same chain of swap rounds, face
+enhancement passes, edge smoothing, super resolution and a final resize.
+run_image_pipeline runs those stages once, as far as a preset asks:
+
+    swap      swap_passes rounds, the later ones swap again onto the faces
+              detected on the previous result
+    enhance   enhance_passes GFPGAN passes around the target faces, every
+              pass but the last blended in at ENHANCE_BLEND
+    smooth    edge smoothing along the swapped face contours
+    output    super resolution and one resize to the planned output size,
+              see modules/output_resolution.py
+
+The faces are detected once per refinement round and once on the final
+swap. Each detection also checks the round before it, a round after which
+a swapped face no longer detects is reverted.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import modules.globals
+from modules.blending import blend_face_regions, smooth_face_edges
+from modules.face_analyser import get_many_faces
+from modules.output_resolution import plan_output, render_output
+from modules.processors.frame.face_swapper import get_source_latent, swap_faces_batch
+from modules.temporal_cache import get_iou
+from modules.typing import Face, Frame
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PRESETS: Dict[str, Dict[str, Any]] = {
+    "fast": {
+        "swap_passes": 1,
+        "enhance_passes": 1,
+        "edge_smoothing": False,
+        "super_resolution": False,
+        "output_quality": "fast",
+    },
+    "balanced": {
+        "swap_passes": 2,
+        "enhance_passes": 1,
+        "edge_smoothing": True,
+        "super_resolution": True,
+        "output_quality": "balanced",
+    },
+    "max": {
+        "swap_passes": 3,
+        "enhance_passes": 2,
+        "edge_smoothing": True,
+        "super_resolution": True,
+        "output_quality": "max",
+    },
+}
+ENHANCE_BLEND = 0.6
+# detection score a face needs to be swapped again, and to keep the round before
+REFINE_MIN_SCORE = 0.5
+# box overlap a detected face needs to be taken for a target face
+MATCH_MIN_IOU = 0.3
+
+
+def get_image_preset(name: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """A preset's stage settings with the given ones replaced, None values are ignored."""
+    name = name or modules.globals.image_preset
+    preset = dict(IMAGE_PRESETS[name], name=name)
+    for key, value in (overrides or {}).items():
+        if key in IMAGE_PRESETS[name] and value is not None:
+            preset[key] = value
+    return preset
+
+
+def match_faces(target_faces: List[Face], detected_faces: List[Face]) -> List[Optional[Face]]:
+    """The detected face overlapping each target face the most, None when none overlaps enough."""
+    matches = []
+    for target_face in target_faces:
+        best_face, best_iou = None, MATCH_MIN_IOU
+        for face in detected_faces:
+            iou = get_iou(target_face.bbox, face.bbox)
+            if iou >= best_iou:
+                best_face, best_iou = face, iou
+        matches.append(best_face)
+    return matches
+
+
+def run_swap_stage(
+    frame: Frame, face_pairs: List[Tuple[Any, Face]], passes: int, detect_result: bool
+) -> Tuple[Frame, Optional[List[Optional[Face]]], int]:
+    """
+    Swapped frame, the faces detected on it (None when not detected) and the rounds kept.
+
+    The first round swaps onto the target faces. Every later round first
+    detects the faces on the result: when a swapped face is missing or
+    scores below REFINE_MIN_SCORE, the round before is reverted (the first
+    one is always kept) and refinement stops, otherwise all faces are
+    swapped again onto their detections. The last round is checked the same
+    way when it is a refinement, or when detect_result asks for its faces.
+    """
+    sources = [get_source_latent(source_face) for source_face, _ in face_pairs]
+    target_faces = [target_face for _, target_face in face_pairs]
+    result = swap_faces_batch(list(zip(sources, target_faces)), frame)
+    previous, previous_faces = frame, None
+    detected_faces = None
+    rounds = 1
+    while rounds < passes or (detected_faces is None and (rounds > 1 or detect_result)):
+        faces = match_faces(target_faces, get_many_faces(result) or [])
+        if any(face is None or face.det_score < REFINE_MIN_SCORE for face in faces):
+            if rounds > 1:
+                logger.info(f"⚠️ Swap round {rounds} reverted, it degraded face detection")
+                result, detected_faces = previous, previous_faces
+                rounds -= 1
+            else:
+                detected_faces = faces
+            break
+        detected_faces = faces
+        if rounds == passes:
+            break
+        previous, previous_faces = result, faces
+        result = swap_faces_batch(list(zip(sources, faces)), result)
+        detected_faces = None
+        rounds += 1
+    return result, detected_faces, rounds
+
+
+def run_enhance_stage(frame: Frame, faces: List[Face], passes: int) -> Frame:
+    from modules.processors.frame.face_enhancer import enhance_face
+
+    for enhance_pass in range(passes):
+        enhanced_frame = enhance_face(frame, faces)
+        if enhance_pass < passes - 1:
+            frame = blend_face_regions(frame, enhanced_frame, faces, ENHANCE_BLEND)
+        else:
+            frame = enhanced_frame
+    return frame
+
+
+def run_image_pipeline(
+    target_frame: Frame, face_pairs: List[Tuple[Any, Face]], preset: Optional[Dict[str, Any]] = None
+) -> Tuple[Frame, Dict[str, Any]]:
+    """
+    Swap each (source face, target face) pair into the target frame and run
+    the stages of the preset, get_image_preset() by default.
+
+    Returns the output frame and a report of the preset, the passes run,
+    the output size and the seconds spent per stage. Failures of the
+    optional stages are logged and the stage is skipped.
+    """
+    preset = preset or get_image_preset()
+    target_faces = [target_face for _, target_face in face_pairs]
+    output_plan = plan_output(target_frame.shape[1], target_frame.shape[0], preset["output_quality"])
+    if not preset["super_resolution"]:
+        output_plan = dict(output_plan, sr_scale=0, sr_input_size=None)
+    modules.globals.mouth_mask = True
+    modules.globals.color_correction = True
+    report: Dict[str, Any] = {"preset": preset["name"], "stage_seconds": {}}
+
+    def timed(stage: str, start: float) -> None:
+        report["stage_seconds"][stage] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    result_frame, detected_faces, report["swap_passes"] = run_swap_stage(
+        target_frame, face_pairs, max(1, preset["swap_passes"]), preset["edge_smoothing"]
+    )
+    timed("swap", start)
+    logger.info(f"✅ Swap stage: {report['swap_passes']}/{preset['swap_passes']} round(s)")
+
+    report["enhance_passes"] = 0
+    if preset["enhance_passes"] > 0:
+        start = time.perf_counter()
+        try:
+            result_frame = run_enhance_stage(result_frame, target_faces, preset["enhance_passes"])
+            report["enhance_passes"] = preset["enhance_passes"]
+            logger.info(f"✅ Enhancement stage: {preset['enhance_passes']} pass(es)")
+        except ImportError:
+            logger.warning("⚠️ Face enhancer module not available")
+        except Exception as e:
+            logger.warning(f"⚠️ Face enhancement failed: {e}")
+        timed("enhance", start)
+
+    if preset["edge_smoothing"] and detected_faces:
+        start = time.perf_counter()
+        try:
+            for face in detected_faces:
+                if face is not None:
+                    smooth_face_edges(result_frame, face)
+            logger.info("✅ Edge smoothing applied")
+        except Exception as e:
+            logger.warning(f"⚠️ Edge smoothing failed: {e}")
+        timed("smooth", start)
+
+    start = time.perf_counter()
+    try:
+        result_frame = render_output(result_frame, output_plan, faces=target_faces)
+    except Exception as e:
+        logger.warning(f"⚠️ Super resolution failed: {e}")
+    timed("output", start)
+    report["output_size"] = [result_frame.shape[1], result_frame.shape[0]]
+    logger.info(f"📊 Image pipeline: {report}")
+    return result_frame, report
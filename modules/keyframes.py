@@ -0,0 +1,120 @@
+"""
+Keyframe propagation for the "fast" video mode.
+
+Only keyframes go through the models. For every face of a keyframe the
+processor hands back its landmarks and its processed aligned crop. The
+landmarks are tracked with pyramidal Lucas-Kanade flow forward from the
+previous keyframe and backward from the next one, and each intermediate
+frame gets the keyframe crops, cross-faded by temporal distance, pasted at
+the tracked landmarks. Faces whose tracking is lost are left unprocessed.
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from modules.typing import Frame
+
+# landmarks and processed aligned crop of one face of a keyframe
+KeyframeFace = Tuple[np.ndarray, Frame]
+
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01),
+)
+
+
+def track_faces(grays: List[np.ndarray], faces: List[KeyframeFace]) -> List[List[Optional[np.ndarray]]]:
+    """Landmarks of each face in each frame, tracked from the first frame; None once lost."""
+    points = [kps.astype(np.float32) for kps, _ in faces]
+    tracks = [points]
+    for previous_gray, gray in zip(grays, grays[1:]):
+        alive = [index for index, face_points in enumerate(tracks[-1]) if face_points is not None]
+        current: List[Optional[np.ndarray]] = [None] * len(faces)
+        if alive:
+            stacked = np.concatenate([tracks[-1][index] for index in alive]).reshape(-1, 1, 2)
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(previous_gray, gray, stacked, None, **LK_PARAMS)
+            if moved is not None:
+                moved = moved.reshape(len(alive), -1, 2)
+                status = status.reshape(len(alive), -1)
+                for position, index in enumerate(alive):
+                    if status[position].all():
+                        current[index] = moved[position]
+        tracks.append(current)
+    return tracks
+
+
+def is_same_face(points: np.ndarray, other_points: np.ndarray) -> bool:
+    # centres closer than half the eye distance
+    eye_distance = np.linalg.norm(points[0] - points[1])
+    return np.linalg.norm(points.mean(axis=0) - other_points.mean(axis=0)) < 0.5 * eye_distance
+
+
+def blend_tracked_faces(
+    start_faces: List[KeyframeFace],
+    start_points: List[Optional[np.ndarray]],
+    end_faces: List[KeyframeFace],
+    end_points: List[Optional[np.ndarray]],
+    weight: float,
+) -> List[KeyframeFace]:
+    """
+    Faces for an intermediate frame, weight being its distance to the start
+    keyframe as a fraction of the segment.
+
+    A face tracked from both keyframes gets its landmarks and crops
+    cross-faded; a face tracked from one side only keeps that side's crop.
+    """
+    faces = []
+    matched_end = set()
+    for (_, start_crop), points in zip(start_faces, start_points):
+        if points is None:
+            continue
+        match = next(
+            (
+                index
+                for index, other_points in enumerate(end_points)
+                if other_points is not None
+                and index not in matched_end
+                and end_faces[index][1].shape == start_crop.shape
+                and is_same_face(points, other_points)
+            ),
+            None,
+        )
+        if match is None:
+            faces.append((points, start_crop))
+            continue
+        matched_end.add(match)
+        kps = (1.0 - weight) * points + weight * end_points[match]
+        crop = cv2.addWeighted(start_crop, 1.0 - weight, end_faces[match][1], weight, 0)
+        faces.append((kps, crop))
+    for index, ((_, end_crop), points) in enumerate(zip(end_faces, end_points)):
+        if points is not None and index not in matched_end:
+            faces.append((points, end_crop))
+    return faces
+
+
+def propagate_segment(
+    frames: List[Frame],
+    start_faces: List[KeyframeFace],
+    end_faces: List[KeyframeFace],
+    propagate: Callable[[Frame, List[KeyframeFace]], Frame],
+) -> List[Frame]:
+    """
+    Outputs for the frames strictly between two keyframes.
+
+    frames holds the original frames from the start keyframe to the end
+    keyframe, both included.
+    """
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+    forward = track_faces(grays, start_faces)
+    backward = track_faces(grays[::-1], end_faces)[::-1]
+    span = len(frames) - 1
+    results = []
+    for offset in range(1, span):
+        faces = blend_tracked_faces(
+            start_faces, forward[offset], end_faces, backward[offset], offset / span
+        )
+        results.append(propagate(frames[offset], faces))
+    return results
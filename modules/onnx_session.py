@@ -0,0 +1,363 @@
+"""
+ONNX Runtime session creation for the insightface models.
+
+Every session is built from the tunable SessionOptions in modules.globals
+(graph optimisation level, intra/inter-op threads, execution mode, memory
+arena). Optimised graphs are saved next to the models so later cold starts
+load them instead of optimising the original graph again.
+
+Sessions are wrapped in IOBindingSession, which runs through IO bindings
+over preallocated per-thread input/output buffers instead of allocating
+fresh arrays and OrtValues on every call. SessionPool keeps several
+independently loaded copies of a model so frame workers run in parallel.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime
+
+import modules.globals
+
+logger = logging.getLogger(__name__)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+SESSION_OPTION_KEYS = [
+    "graph_optimization_level",
+    "intra_op_threads",
+    "inter_op_threads",
+    "execution_mode",
+    "enable_cpu_mem_arena",
+    "enable_mem_pattern",
+    "optimized_model_cache",
+    "io_binding",
+]
+ONNX_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(uint8)": np.uint8,
+}
+IO_BINDING_CACHE_SIZE = 32  # bound shape combinations kept per session and thread
+
+
+def get_session_config(model_path: str) -> Dict[str, Any]:
+    """Global session settings merged with the per-model overrides for model_path."""
+    config = {key: getattr(modules.globals, f"ort_{key}") for key in SESSION_OPTION_KEYS}
+    config.update(modules.globals.ort_model_options.get(os.path.basename(model_path), {}))
+    return config
+
+
+def configure_session_options(options: Dict[str, Any]) -> bool:
+    """
+    Apply session settings given as a dict (CLI, env or handler input).
+
+    The per-model overrides go under "models" keyed by model file name.
+    Returns True when a setting changed, meaning sessions created before
+    need to be recreated to pick it up.
+    """
+    changed = False
+    for key in SESSION_OPTION_KEYS:
+        if key in options and options[key] != getattr(modules.globals, f"ort_{key}"):
+            setattr(modules.globals, f"ort_{key}", options[key])
+            changed = True
+    model_options = options.get("models")
+    if model_options and model_options != modules.globals.ort_model_options:
+        modules.globals.ort_model_options = dict(model_options)
+        changed = True
+    return changed
+
+
+def create_session_options(config: Dict[str, Any]) -> onnxruntime.SessionOptions:
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+        config["graph_optimization_level"]
+    ]
+    session_options.intra_op_num_threads = int(config["intra_op_threads"])
+    session_options.inter_op_num_threads = int(config["inter_op_threads"])
+    session_options.execution_mode = EXECUTION_MODES[config["execution_mode"]]
+    session_options.enable_cpu_mem_arena = bool(config["enable_cpu_mem_arena"])
+    session_options.enable_mem_pattern = bool(config["enable_mem_pattern"])
+    return session_options
+
+
+def get_optimized_model_path(
+    model_path: str, providers: List[str], config: Dict[str, Any]
+) -> str:
+    """
+    Cache location of the optimised graph of model_path.
+
+    Optimised graphs can contain provider specific nodes, so the cache key
+    covers the source model, the providers, the optimisation level and the
+    onnxruntime version.
+    """
+    stat = os.stat(model_path)
+    key = json.dumps(
+        [
+            os.path.abspath(model_path),
+            stat.st_size,
+            int(stat.st_mtime),
+            providers,
+            config["graph_optimization_level"],
+            onnxruntime.__version__,
+        ]
+    )
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    cache_dir = os.path.join(modules.globals.get_models_dir(), "ort_cache")
+    return os.path.join(cache_dir, f"{name}.{digest}.onnx")
+
+
+def create_inference_session(
+    model_path: str, providers: Optional[List[str]] = None
+) -> onnxruntime.InferenceSession:
+    """Create a tuned session for model_path, going through the optimised-graph cache."""
+    providers = providers or modules.globals.execution_providers or ["CPUExecutionProvider"]
+    config = get_session_config(model_path)
+    session_options = create_session_options(config)
+
+    if not config["optimized_model_cache"] or config["graph_optimization_level"] == "disable":
+        return onnxruntime.InferenceSession(model_path, session_options, providers=providers)
+
+    optimized_model_path = get_optimized_model_path(model_path, providers, config)
+    if os.path.isfile(optimized_model_path):
+        # the cached graph is already optimised, skip the optimisation passes
+        session_options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS["disable"]
+        try:
+            return onnxruntime.InferenceSession(
+                optimized_model_path, session_options, providers=providers
+            )
+        except Exception as e:
+            logger.warning(f"Ignoring unusable optimised graph {optimized_model_path}: {e}")
+            session_options = create_session_options(config)
+
+    temp_model_path = f"{optimized_model_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(optimized_model_path), exist_ok=True)
+        session_options.optimized_model_filepath = temp_model_path
+        session = onnxruntime.InferenceSession(model_path, session_options, providers=providers)
+        os.replace(temp_model_path, optimized_model_path)
+        logger.info(f"Saved optimised graph of {model_path} to {optimized_model_path}")
+        return session
+    except Exception as e:
+        logger.warning(f"Could not cache the optimised graph of {model_path}: {e}")
+        if os.path.exists(temp_model_path):
+            os.remove(temp_model_path)
+        return onnxruntime.InferenceSession(
+            model_path, create_session_options(config), providers=providers
+        )
+
+
+class IOBinding:
+    """Preallocated input/output buffers of one session for one set of input shapes."""
+
+    def __init__(self, session: onnxruntime.InferenceSession, input_arrays: Dict[str, np.ndarray]) -> None:
+        self.io_binding = session.io_binding()
+        self.inputs = input_arrays
+        self.outputs: Optional[List[np.ndarray]] = None
+        for name, array in input_arrays.items():
+            self.io_binding.bind_input(
+                name, "cpu", 0, array.dtype.type, array.shape, array.ctypes.data
+            )
+
+    def bind_outputs(self, output_names: List[str], output_arrays: List[np.ndarray]) -> None:
+        self.outputs = output_arrays
+        for name, array in zip(output_names, output_arrays):
+            self.io_binding.bind_output(
+                name, "cpu", 0, array.dtype.type, array.shape, array.ctypes.data
+            )
+
+
+class IOBindingSession:
+    """
+    InferenceSession wrapper that runs through IO bindings.
+
+    Each thread keeps its own bindings, one per combination of input shapes,
+    so buffers are allocated on the first call with a shape and reused after.
+    Output shapes are learned from that first, plain run. run() is a drop-in
+    for InferenceSession.run and returns copies; hot paths can fill
+    get_binding().inputs in place and read run_binding() outputs directly,
+    which stay valid until the next run of that binding on the same thread.
+    """
+
+    def __init__(self, session: onnxruntime.InferenceSession) -> None:
+        self.session = session
+        self.input_types = {
+            model_input.name: ONNX_TYPES.get(model_input.type, np.float32)
+            for model_input in session.get_inputs()
+        }
+        self.output_names = [output.name for output in session.get_outputs()]
+        self.local = threading.local()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    def get_binding(self, input_shapes: Dict[str, Tuple[int, ...]]) -> IOBinding:
+        bindings = getattr(self.local, "bindings", None)
+        if bindings is None:
+            bindings = self.local.bindings = {}
+        key = tuple((name, tuple(shape)) for name, shape in input_shapes.items())
+        binding = bindings.get(key)
+        if binding is None:
+            if len(bindings) >= IO_BINDING_CACHE_SIZE:
+                bindings.pop(next(iter(bindings)))
+            input_arrays = {
+                name: np.empty(shape, dtype=self.input_types[name])
+                for name, shape in input_shapes.items()
+            }
+            binding = bindings[key] = IOBinding(self.session, input_arrays)
+        return binding
+
+    def run_binding(self, binding: IOBinding) -> List[np.ndarray]:
+        if binding.outputs is None:
+            outputs = self.session.run(self.output_names, binding.inputs)
+            binding.bind_outputs(
+                self.output_names, [np.ascontiguousarray(output) for output in outputs]
+            )
+            return binding.outputs
+        self.session.run_with_iobinding(binding.io_binding)
+        return binding.outputs
+
+    def run(self, output_names: Optional[List[str]], input_feed: Dict[str, np.ndarray], run_options: Any = None) -> List[np.ndarray]:
+        binding = self.get_binding({name: value.shape for name, value in input_feed.items()})
+        for name, value in input_feed.items():
+            np.copyto(binding.inputs[name], value, casting="unsafe")
+        outputs = self.run_binding(binding)
+        if output_names:
+            return [outputs[self.output_names.index(name)].copy() for name in output_names]
+        return [output.copy() for output in outputs]
+
+
+class SessionPool:
+    """
+    Pool of independently loaded models that frame workers check out.
+
+    Members are created lazily by factory, up to size. Without thread
+    affinity a worker takes whichever member is free and waits when all are
+    busy. With thread affinity every thread is pinned to one member (round
+    robin), which keeps its IO bindings and caches warm; threads sharing a
+    member take turns. Size times the intra-op threads of each session
+    should roughly match the cores available.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int, thread_affinity: bool = False) -> None:
+        self.factory = factory
+        self.size = max(1, size)
+        self.thread_affinity = thread_affinity
+        self.members: List[Any] = []
+        self.member_locks: List[threading.Lock] = []
+        self.available: "queue.Queue[int]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.next_slot = 0
+
+    def add_member(self) -> int:
+        # called with self.lock held
+        self.members.append(self.factory())
+        self.member_locks.append(threading.Lock())
+        index = len(self.members) - 1
+        self.available.put(index)
+        return index
+
+    def get(self) -> Any:
+        """First member, for reading model metadata without checking it out."""
+        with self.lock:
+            if not self.members:
+                self.add_member()
+        return self.members[0]
+
+    def get_thread_slot(self) -> int:
+        index = getattr(self.local, "slot", None)
+        if index is None:
+            with self.lock:
+                index = self.next_slot % self.size
+                self.next_slot += 1
+                while len(self.members) <= index:
+                    self.add_member()
+            self.local.slot = index
+        return index
+
+    def acquire(self) -> int:
+        try:
+            return self.available.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.members) < self.size:
+                self.add_member()
+        return self.available.get()
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        if self.thread_affinity:
+            index = self.get_thread_slot()
+            with self.member_locks[index]:
+                yield self.members[index]
+            return
+        index = self.acquire()
+        try:
+            yield self.members[index]
+        finally:
+            self.available.put(index)
+
+
+def load_session(model_path: str, providers: Optional[List[str]] = None) -> Any:
+    """Tuned session for model_path, wrapped in IOBindingSession when enabled."""
+    session = create_inference_session(model_path, providers)
+    if get_session_config(model_path)["io_binding"]:
+        session = IOBindingSession(session)
+    return session
+
+
+def load_insightface_model(model_path: str, providers: Optional[List[str]] = None) -> Any:
+    """
+    Load an insightface model on a tuned session.
+
+    Routes to the model class the same way insightface.model_zoo does. The
+    model metadata is read from the original file, only the session runs the
+    cached optimised graph.
+    """
+    from insightface.model_zoo.arcface_onnx import ArcFaceONNX
+    from insightface.model_zoo.attribute import Attribute
+    from insightface.model_zoo.inswapper import INSwapper
+    from insightface.model_zoo.landmark import Landmark
+    from insightface.model_zoo.retinaface import RetinaFace
+
+    session = load_session(model_path, providers)
+    inputs = session.get_inputs()
+    input_shape = inputs[0].shape
+    outputs = session.get_outputs()
+
+    if len(outputs) >= 5:
+        return RetinaFace(model_file=model_path, session=session)
+    elif input_shape[2] == 192 and input_shape[3] == 192:
+        return Landmark(model_file=model_path, session=session)
+    elif input_shape[2] == 96 and input_shape[3] == 96:
+        return Attribute(model_file=model_path, session=session)
+    elif len(inputs) == 2 and input_shape[2] == 128 and input_shape[3] == 128:
+        return INSwapper(model_file=model_path, session=session)
+    elif (
+        input_shape[2] == input_shape[3]
+        and input_shape[2] >= 112
+        and input_shape[2] % 16 == 0
+    ):
+        return ArcFaceONNX(model_file=model_path, session=session)
+    return None
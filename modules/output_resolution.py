@@ -0,0 +1,125 @@
+"""
+Output resolution planning for the image pipelines.
+
+The final output size is decided once, from the input size and the
+requested quality tier, before any stage runs. Swapping and enhancement
+work at the input resolution, super resolution is run at the scale that
+gets closest to the planned size without overshooting it, and a single
+final resize lands on the exact size. No stage produces pixels that a
+later stage throws away.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+
+import modules.globals
+from modules.typing import Face, Frame
+
+logger = logging.getLogger(__name__)
+
+# min_long_side: long side the output should reach, min_short_side: short
+# side it must reach, max_side: largest output side, max_sr_scale: largest
+# super resolution model scale used
+OUTPUT_QUALITY_TIERS: Dict[str, Dict[str, int]] = {
+    "fast": {"min_long_side": 1024, "min_short_side": 512, "max_side": 2048, "max_sr_scale": 2},
+    "balanced": {"min_long_side": 1536, "min_short_side": 512, "max_side": 3072, "max_sr_scale": 2},
+    "max": {"min_long_side": 1536, "min_short_side": 512, "max_side": 4096, "max_sr_scale": 4},
+}
+SR_SCALES = (2, 4)
+# below this upscale factor a Lanczos resize is used instead of super resolution
+MIN_SR_SCALE = 1.5
+
+
+def plan_output(width: int, height: int, quality: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Output size of an image and how the stages get there
+
+    The super resolution scale is the smallest model scale that brings the
+    long side to min_long_side (the largest allowed when none does), the
+    short side is brought to min_short_side and the result is capped by
+    max_side. The plan holds:
+
+        output_size: (width, height) of the final image
+        sr_scale: model scale to run, 0 for none
+        sr_input_size: (width, height) the frame is resized to before super
+            resolution, so the model output is the output size; None to run
+            on the frame as it is and resize the model output up to it
+    """
+    tier = OUTPUT_QUALITY_TIERS[quality or modules.globals.output_quality]
+    long_side, short_side = max(width, height), min(width, height)
+    scales = [scale for scale in SR_SCALES if scale <= tier["max_sr_scale"]]
+    target_scale = 1
+    if long_side < tier["min_long_side"]:
+        target_scale = next(
+            (scale for scale in scales if long_side * scale >= tier["min_long_side"]), scales[-1]
+        )
+    output_scale = max(target_scale, tier["min_short_side"] / short_side, 1.0)
+    output_scale = min(output_scale, max(tier["max_side"] / long_side, 1.0))
+    output_size = (round(width * output_scale), round(height * output_scale))
+
+    sr_input_size = None
+    if output_scale < MIN_SR_SCALE:
+        sr_scale = 0
+    else:
+        sr_scale = max((scale for scale in scales if scale <= output_scale), default=scales[0])
+        if sr_scale > output_scale:
+            sr_input_size = (round(output_size[0] / sr_scale), round(output_size[1] / sr_scale))
+    plan = {
+        "input_size": (width, height),
+        "output_size": output_size,
+        "sr_scale": sr_scale,
+        "sr_input_size": sr_input_size,
+    }
+    logger.info(f"📐 Output plan ({quality or modules.globals.output_quality}): {plan}")
+    return plan
+
+
+def resize_frame(frame: Frame, size: Tuple[int, int]) -> Frame:
+    """Resize to (width, height), Lanczos up and area down"""
+    height, width = frame.shape[:2]
+    if (width, height) == size:
+        return frame
+    interpolation = cv2.INTER_AREA if size[0] < width else cv2.INTER_LANCZOS4
+    return cv2.resize(frame, size, interpolation=interpolation)
+
+
+def scale_faces(faces: List[Face], factor: float) -> List[Face]:
+    """Copies of the faces with their box and kps scaled, for a frame resized by factor"""
+    scaled_faces = []
+    for face in faces:
+        scaled_face = Face(face)
+        for key in ("bbox", "kps"):
+            if getattr(face, key, None) is not None:
+                setattr(scaled_face, key, getattr(face, key) * factor)
+        scaled_faces.append(scaled_face)
+    return scaled_faces
+
+
+def render_output(frame: Frame, plan: Dict[str, Any], faces: Optional[List[Face]] = None) -> Frame:
+    """
+    Bring a processed frame to the planned output size
+
+    Runs super resolution at the planned scale when the model is
+    available, then one final resize onto the exact output size.
+    """
+    if plan["sr_scale"]:
+        try:
+            from modules.processors.frame.super_resolution import enhance_resolution
+
+            sr_frame = frame
+            if plan["sr_input_size"] is not None:
+                sr_frame = resize_frame(frame, plan["sr_input_size"])
+                if faces:
+                    faces = scale_faces(faces, plan["sr_input_size"][0] / frame.shape[1])
+            # the plan already fits max_side, enhance_resolution must not
+            # swap the model for its own resize
+            enhanced_frame = enhance_resolution(
+                sr_frame, plan["sr_scale"], max_size=max(sr_frame.shape[:2]) * plan["sr_scale"], faces=faces
+            )
+            if enhanced_frame is not None:
+                frame = enhanced_frame
+        except ImportError as e:
+            logger.warning(f"⚠️ Super resolution not available, resizing: {e}")
+    return resize_frame(frame, plan["output_size"])
@@ -3,10 +3,12 @@ import opennsfw2
 from PIL import Image
 import cv2  # Add OpenCV import
 import modules.globals  # Import globals to access the color correction toggle
+from modules.capabilities import record_load_failure
 
 from modules.typing import Frame
 
 MAX_PROBABILITY = 0.85
+NSFW_LOAD_KEY = ("nsfw",)
 
 # Preload the model once for efficiency
 model = None
@@ -20,7 +22,11 @@ def predict_frame(target_frame: Frame) -> bool:
     image = opennsfw2.preprocess_image(image, opennsfw2.Preprocessing.YAHOO)
     global model
     if model is None: 
-        model = opennsfw2.make_open_nsfw_model()
+        try:
+            model = opennsfw2.make_open_nsfw_model()
+        except Exception as e:
+            record_load_failure(NSFW_LOAD_KEY, e)
+            raise
         
     views = numpy.expand_dims(image, axis=0)
     _, probability = model.predict(views)[0]
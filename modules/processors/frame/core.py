@@ -1,12 +1,19 @@
+import os
 import sys
+import shutil
 import importlib
 from concurrent.futures import ThreadPoolExecutor
 from types import ModuleType
-from typing import Any, List, Callable
+from typing import Any, Dict, List, Callable, Tuple
 from tqdm import tqdm
+import cv2
 
 import modules
 import modules.globals                   
+from modules.frame_dedup import find_duplicate_frames
+from modules.keyframes import KeyframeFace, propagate_segment
+from modules.typing import Frame
+from modules.temporal_cache import reset_temporal_cache
 
 FRAME_PROCESSORS_MODULES: List[ModuleType] = []
 FRAME_PROCESSORS_INTERFACE = [
@@ -69,8 +76,9 @@ def set_frame_processors_modules_from_ui(frame_processors: List[str]) -> None:
 def multi_process_frame(source_path: str, temp_frame_paths: List[str], process_frames: Callable[[str, List[str], Any], None], progress: Any = None) -> None:
     with ThreadPoolExecutor(max_workers=modules.globals.execution_threads) as executor:
         futures = []
-        for path in temp_frame_paths:
-            future = executor.submit(process_frames, source_path, [path], progress)
+        batch_size = max(1, modules.globals.frame_batch_size)
+        for index in range(0, len(temp_frame_paths), batch_size):
+            future = executor.submit(process_frames, source_path, temp_frame_paths[index:index + batch_size], progress)
             futures.append(future)
         for future in futures:
             future.result()
@@ -79,6 +87,78 @@ def multi_process_frame(source_path: str, temp_frame_paths: List[str], process_f
 def process_video(source_path: str, frame_paths: list[str], process_frames: Callable[[str, List[str], Any], None]) -> None:
     progress_bar_format = '{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]'
     total = len(frame_paths)
+    reset_temporal_cache()
+    # duplicate frames skip the models and get a copy of the frame they repeat
+    duplicate_frames = find_duplicate_frames(frame_paths) if modules.globals.frame_dedup else {}
+    unique_frame_paths = [frame_path for frame_path in frame_paths if frame_path not in duplicate_frames]
     with tqdm(total=total, desc='Processing', unit='frame', dynamic_ncols=True, bar_format=progress_bar_format) as progress:
-        progress.set_postfix({'execution_providers': modules.globals.execution_providers, 'execution_threads': modules.globals.execution_threads, 'max_memory': modules.globals.max_memory})
-        multi_process_frame(source_path, frame_paths, process_frames, progress)
+        progress.set_postfix({'execution_providers': modules.globals.execution_providers, 'execution_threads': modules.globals.execution_threads, 'max_memory': modules.globals.max_memory, 'duplicate_frames': len(duplicate_frames)})
+        multi_process_frame(source_path, unique_frame_paths, process_frames, progress)
+        for frame_path, original_frame_path in duplicate_frames.items():
+            shutil.copyfile(original_frame_path, frame_path)
+            progress.update(1)
+
+
+def get_keyframe_indices(frame_count: int) -> List[int]:
+    """Every keyframe_interval-th frame, and the last frame so every frame has a keyframe after it."""
+    indices = list(range(0, frame_count, max(1, modules.globals.keyframe_interval)))
+    if indices and indices[-1] != frame_count - 1:
+        indices.append(frame_count - 1)
+    return indices
+
+
+def process_video_keyframes(frame_paths: List[str], process_keyframe: Callable[[Frame, str], Tuple[Frame, List[KeyframeFace]]], propagate: Callable[[Frame, List[KeyframeFace]], Frame]) -> None:
+    """
+    Fast video mode: run the models on keyframes only, see modules/keyframes.py.
+
+    process_keyframe returns the processed keyframe with the landmarks and
+    processed aligned crop of each face; propagate pastes tracked crops into
+    an intermediate frame. Processed keyframes are written next to the
+    originals until all segments are done, since tracking reads the originals.
+    Like process_frames, a keyframe or segment that fails keeps its original
+    frames; a failed keyframe has no faces to propagate.
+    """
+    progress_bar_format = '{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}{postfix}]'
+    keyframe_indices = get_keyframe_indices(len(frame_paths))
+    keyframe_faces: Dict[int, List[KeyframeFace]] = {}
+    reset_temporal_cache()
+
+    def get_keyframe_output_path(index: int) -> str:
+        root, extension = os.path.splitext(frame_paths[index])
+        return f'{root}.keyframe{extension}'
+
+    def run_keyframe(index: int) -> None:
+        frame = cv2.imread(frame_paths[index])
+        try:
+            output, faces = process_keyframe(frame, frame_paths[index])
+        except Exception as exception:
+            print(exception)
+            output, faces = frame, []
+        cv2.imwrite(get_keyframe_output_path(index), output)
+        keyframe_faces[index] = faces
+        progress.update(1)
+
+    def run_segment(start: int, end: int) -> None:
+        frames = [cv2.imread(frame_path) for frame_path in frame_paths[start:end + 1]]
+        try:
+            outputs = propagate_segment(frames, keyframe_faces[start], keyframe_faces[end], propagate)
+            for frame_path, output in zip(frame_paths[start + 1:end], outputs):
+                cv2.imwrite(frame_path, output)
+        except Exception as exception:
+            print(exception)
+        progress.update(end - start - 1)
+
+    try:
+        with tqdm(total=len(frame_paths), desc='Processing', unit='frame', dynamic_ncols=True, bar_format=progress_bar_format) as progress:
+            progress.set_postfix({'execution_providers': modules.globals.execution_providers, 'execution_threads': modules.globals.execution_threads, 'keyframes': len(keyframe_indices)})
+            with ThreadPoolExecutor(max_workers=modules.globals.execution_threads) as executor:
+                for future in [executor.submit(run_keyframe, index) for index in keyframe_indices]:
+                    future.result()
+                for future in [executor.submit(run_segment, start, end) for start, end in zip(keyframe_indices, keyframe_indices[1:])]:
+                    future.result()
+    finally:
+        # no .keyframe file may stay behind in the temp dir, even when the run is aborted
+        for index in keyframe_indices:
+            keyframe_output_path = get_keyframe_output_path(index)
+            if os.path.exists(keyframe_output_path):
+                os.replace(keyframe_output_path, frame_paths[index])
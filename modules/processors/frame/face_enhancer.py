@@ -1,27 +1,64 @@
-from typing import Any, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import cv2
+import logging
 import threading
-import gfpgan
+import time
+import numpy as np
 import os
 
 import modules.globals
 import modules.processors.frame.core
 from modules.core import update_status
-from modules.face_analyser import get_one_face
+from modules.batching import InferenceBatcher
+from modules.blending import get_face_size, paste_crop
+from modules.capabilities import has_load_failed, is_available, record_load_failure
+from modules.face_analyser import get_one_face, get_many_faces
+from modules.keyframes import KeyframeFace
+from modules.onnx_session import load_session
+from modules.temporal_cache import cache_crop, get_cached_crop
 from modules.typing import Frame, Face
 import platform
-import torch
 from modules.utilities import (
     conditional_download,
     is_image,
     is_video,
 )
 
+# torch, gfpgan and basicsr are imported on first use, so workers on the
+# onnx backend never load them
 FACE_ENHANCER = None
+ENHANCER_SESSIONS: Dict[str, Any] = {}
+ENHANCER_BATCHERS: Dict[str, InferenceBatcher] = {}
+# only guards GFPGANer.enhance, whose face helper keeps per-call state
 THREAD_SEMAPHORE = threading.Semaphore()
 THREAD_LOCK = threading.Lock()
 NAME = "DLC.FACE-ENHANCER"
 
+logger = logging.getLogger(__name__)
+
+# enhancement policy state: per-job deadline, running per-face cost, decision counts
+ENHANCER_DEADLINE: Optional[float] = None
+FACE_ENHANCE_SECONDS: Optional[float] = None
+ENHANCER_DECISIONS: Dict[str, int] = {}
+
+# facexlib's FFHQ five point template GFPGAN was trained on, at 512x512
+FFHQ_TEMPLATE = np.array(
+    [
+        [192.98138, 239.94708],
+        [318.90277, 240.1936],
+        [256.63416, 314.01935],
+        [201.26117, 371.41043],
+        [313.08905, 371.15118],
+    ],
+    dtype=np.float32,
+)
+ENHANCER_CROP_SIZE = 512
+# GFPGAN graphs exported by runpod/export_gfpgan_onnx.py
+ENHANCER_ONNX_MODELS = {
+    "fp32": "GFPGANv1.4.onnx",
+    "int8": "GFPGANv1.4_int8.onnx",
+}
+
 # Use the centralized model directory configuration
 models_dir = modules.globals.get_models_dir()
 
@@ -46,57 +83,325 @@ def pre_start() -> bool:
     return True
 
 
-TENSORRT_AVAILABLE = False
-try:
-    import torch_tensorrt
-    TENSORRT_AVAILABLE = True
-except ImportError as im:
-    print(f"TensorRT is not available: {im}")
-    pass
-except Exception as e:
-    print(f"TensorRT is not available: {e}")
-    pass
+def is_tensorrt_available() -> bool:
+    return is_available("tensorrt")
+
+
+def get_enhancer_load_key() -> Tuple[str, ...]:
+    backend = modules.globals.face_enhancer_backend
+    if backend == "onnx":
+        return ("face_enhancer", backend, modules.globals.face_enhancer_precision)
+    return ("face_enhancer", backend)
+
+
+def is_face_enhancer_available() -> bool:
+    """
+    False when the selected backend cannot run on this worker or its model
+    failed to load within the retry interval, frames then pass unchanged.
+    """
+    if modules.globals.face_enhancer_backend == "torch" and not is_available("face_enhancer"):
+        return False
+    return not has_load_failed(get_enhancer_load_key())
+
 
 def get_face_enhancer() -> Any:
     global FACE_ENHANCER
 
     with THREAD_LOCK:
         if FACE_ENHANCER is None:
-            model_path = os.path.join(models_dir, "GFPGANv1.4.pth")
-            
-            selected_device = None
-            device_priority = []
-
-            if TENSORRT_AVAILABLE and torch.cuda.is_available():
-                selected_device = torch.device("cuda")
-                device_priority.append("TensorRT+CUDA")
-            elif torch.cuda.is_available():
-                selected_device = torch.device("cuda")
-                device_priority.append("CUDA")
-            elif torch.backends.mps.is_available() and platform.system() == "Darwin":
-                selected_device = torch.device("mps")
-                device_priority.append("MPS")
-            elif not torch.cuda.is_available():
-                selected_device = torch.device("cpu")
-                device_priority.append("CPU")
-            
-            FACE_ENHANCER = gfpgan.GFPGANer(model_path=model_path, upscale=1, device=selected_device)
-
-            # for debug:
-            print(f"Selected device: {selected_device} and device priority: {device_priority}")
+            try:
+                FACE_ENHANCER = load_face_enhancer()
+            except Exception as e:
+                record_load_failure(("face_enhancer", "torch"), e)
+                raise
     return FACE_ENHANCER
 
 
-def enhance_face(temp_frame: Frame) -> Frame:
-    with THREAD_SEMAPHORE:
-        _, _, temp_frame = get_face_enhancer().enhance(temp_frame, paste_back=True)
-    return temp_frame
+def load_face_enhancer() -> Any:
+    import gfpgan
+    import torch
 
+    model_path = os.path.join(models_dir, "GFPGANv1.4.pth")
 
-def process_frame(source_face: Face, temp_frame: Frame) -> Frame:
+    selected_device = None
+    device_priority = []
+
+    if is_tensorrt_available() and torch.cuda.is_available():
+        selected_device = torch.device("cuda")
+        device_priority.append("TensorRT+CUDA")
+    elif torch.cuda.is_available():
+        selected_device = torch.device("cuda")
+        device_priority.append("CUDA")
+    elif torch.backends.mps.is_available() and platform.system() == "Darwin":
+        selected_device = torch.device("mps")
+        device_priority.append("MPS")
+    elif not torch.cuda.is_available():
+        selected_device = torch.device("cpu")
+        device_priority.append("CPU")
+
+    face_enhancer = gfpgan.GFPGANer(model_path=model_path, upscale=1, device=selected_device)
+
+    # for debug:
+    print(f"Selected device: {selected_device} and device priority: {device_priority}")
+    return face_enhancer
+
+
+def enhance_face(temp_frame: Frame, target_faces: Optional[List[Face]] = None) -> Frame:
+    """
+    Enhance the faces of a frame with GFPGAN.
+
+    In "full" mode, the default, GFPGANer detects every face of the frame
+    and pastes it back with its face parsing mask. In "crop" mode only the
+    given target faces are aligned by their kps, restored and pasted back
+    inside their face regions. The onnx backend has no detector of its own,
+    it always takes the crop path, detecting the faces with the face
+    analyser when none are given.
+    """
+    if not is_face_enhancer_available():
+        return temp_frame
+    if modules.globals.face_enhancer_backend == "onnx":
+        if target_faces is None:
+            target_faces = get_target_faces(temp_frame)
+        return enhance_face_crops(temp_frame, target_faces)
+    if target_faces is None or modules.globals.face_enhancer_mode == "full":
+        if is_budget_spent(0.0):
+            record_decision(None, None, False, "time budget spent")
+            return temp_frame
+        with THREAD_SEMAPHORE:
+            _, _, temp_frame = get_face_enhancer().enhance(temp_frame, paste_back=True)
+        return temp_frame
+    return enhance_face_crops(temp_frame, target_faces)
+
+
+def get_alignment(kps: np.ndarray) -> np.ndarray:
+    """Affine onto the FFHQ template, estimated the same way facexlib aligns for GFPGAN."""
+    return cv2.estimateAffinePartial2D(
+        kps.astype(np.float32), FFHQ_TEMPLATE, method=cv2.LMEDS
+    )[0]
+
+
+def align_face(temp_frame: Frame, affine: np.ndarray) -> Frame:
+    return cv2.warpAffine(
+        temp_frame,
+        affine,
+        (ENHANCER_CROP_SIZE, ENHANCER_CROP_SIZE),
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(135, 133, 132),
+    )
+
+
+def start_enhancement_budget(seconds: Optional[float]) -> None:
+    """Start a job's enhancement time budget (None for unlimited) and reset the decision counts."""
+    global ENHANCER_DEADLINE
+
+    ENHANCER_DEADLINE = time.monotonic() + float(seconds) if seconds else None
+    ENHANCER_DECISIONS.clear()
+
+
+def is_budget_spent(estimate: float) -> bool:
+    return ENHANCER_DEADLINE is not None and ENHANCER_DEADLINE - time.monotonic() < estimate
+
+
+def decide_enhancement(face: Face, face_size: float) -> Tuple[bool, str]:
+    """
+    Whether a face is worth a GFPGAN pass.
+
+    face_size is the side of the aligned FFHQ region in frame pixels, about
+    1.6 times the face box. Tiny faces are upsampled to 512 and back for no
+    visible gain, an optional upper limit skips faces already sharper than
+    the network's 512 crop, and low-confidence detections are likely not
+    faces. Once the job's time
+    budget would be overrun by another face, the remaining faces are
+    skipped.
+    """
+    det_score = float(getattr(face, "det_score", None) or 0.0)
+    if det_score < modules.globals.enhancer_min_det_score:
+        return False, "low det_score"
+    if face_size < modules.globals.enhancer_min_face_size:
+        return False, "face too small"
+    if modules.globals.enhancer_max_face_size and face_size > modules.globals.enhancer_max_face_size:
+        return False, "face too large"
+    if is_budget_spent(FACE_ENHANCE_SECONDS or 0.0):
+        return False, "time budget spent"
+    return True, "enhance"
+
+
+def record_decision(face: Optional[Face], face_size: Optional[float], enhance: bool, reason: str) -> None:
+    with THREAD_LOCK:
+        ENHANCER_DECISIONS[reason] = ENHANCER_DECISIONS.get(reason, 0) + 1
+    if face is None:
+        logger.debug(f"Face enhancer: {'enhance' if enhance else 'skip'} whole frame ({reason})")
+        return
+    logger.debug(
+        f"Face enhancer: {'enhance' if enhance else 'skip'} face of {face_size:.0f}px, "
+        f"det_score {float(getattr(face, 'det_score', None) or 0.0):.2f} ({reason})"
+    )
+
+
+def get_enhancement_decisions() -> Dict[str, int]:
+    with THREAD_LOCK:
+        return dict(ENHANCER_DECISIONS)
+
+
+def record_enhancement_time(seconds: float, face_count: int) -> None:
+    global FACE_ENHANCE_SECONDS
+
+    per_face = seconds / face_count
+    if FACE_ENHANCE_SECONDS is None:
+        FACE_ENHANCE_SECONDS = per_face
+    else:
+        FACE_ENHANCE_SECONDS = 0.8 * FACE_ENHANCE_SECONDS + 0.2 * per_face
+
+
+def get_enhancer_batcher(backend: str) -> InferenceBatcher:
+    run_batches: Dict[str, Callable[[List[Frame]], List[Frame]]] = {
+        "torch": run_face_enhancer_torch,
+        "onnx": run_face_enhancer_onnx,
+    }
+    with THREAD_LOCK:
+        batcher = ENHANCER_BATCHERS.get(backend)
+        if batcher is None:
+            batcher = ENHANCER_BATCHERS[backend] = InferenceBatcher(
+                run_batches[backend],
+                modules.globals.enhancer_batch_size,
+                modules.globals.enhancer_batch_wait_ms / 1000.0,
+                name=f"face-enhancer-{backend}-batcher",
+            )
+    return batcher
+
+
+def run_face_enhancer(crops: List[Frame]) -> List[Frame]:
+    """
+    Restore aligned 512 crops with the GFPGAN network.
+
+    Crops from concurrent frames are gathered by the enhancer batcher of the
+    selected backend into shared forward passes of up to
+    --enhancer-batch-size faces.
+    """
+    return get_enhancer_batcher(modules.globals.face_enhancer_backend).submit(crops)
+
+
+def run_face_enhancer_torch(crops: List[Frame]) -> List[Frame]:
+    """
+    One GFPGAN forward pass over the crops, skipping its detection and parsing.
+
+    The noise injection is off, as in the exported graph, so both backends
+    restore a crop the same way every time.
+    """
+    import torch
+    from basicsr.utils import img2tensor, tensor2img
+    from torchvision.transforms.functional import normalize
+
+    face_enhancer = get_face_enhancer()
+    tensors = []
+    for crop in crops:
+        tensor = img2tensor(crop / 255.0, bgr2rgb=True, float32=True)
+        normalize(tensor, (0.5, 0.5, 0.5), (0.5, 0.5, 0.5), inplace=True)
+        tensors.append(tensor)
+    batch = torch.stack(tensors).to(face_enhancer.device)
+    with torch.no_grad():
+        outputs = face_enhancer.gfpgan(batch, return_rgb=False, randomize_noise=False, weight=0.5)[0]
+    return [
+        tensor2img(output, rgb2bgr=True, min_max=(-1, 1)).astype(np.uint8)
+        for output in outputs
+    ]
+
+
+def get_face_enhancer_session() -> Any:
+    precision = modules.globals.face_enhancer_precision
+    with THREAD_LOCK:
+        session = ENHANCER_SESSIONS.get(precision)
+        if session is None:
+            model_path = os.path.join(
+                modules.globals.get_models_dir(), ENHANCER_ONNX_MODELS[precision]
+            )
+            try:
+                if not os.path.isfile(model_path):
+                    raise FileNotFoundError(
+                        f"Face enhancer graph not found: {model_path}, "
+                        f"export it with runpod/export_gfpgan_onnx.py"
+                    )
+                session = ENHANCER_SESSIONS[precision] = load_session(model_path)
+            except Exception as e:
+                record_load_failure(("face_enhancer", "onnx", precision), e)
+                raise
+    return session
+
+
+def run_face_enhancer_onnx(crops: List[Frame]) -> List[Frame]:
+    """The same forward pass on the exported GFPGAN graph, with torch's pre and post processing."""
+    session = get_face_enhancer_session()
+    blob = np.stack([crop[:, :, ::-1].transpose(2, 0, 1) for crop in crops])
+    blob = blob.astype(np.float32) / 127.5 - 1.0
+    outputs = session.run(None, {session.get_inputs()[0].name: blob})[0]
+    outputs = (np.clip(outputs, -1.0, 1.0) + 1.0) * 127.5
+    return [
+        np.ascontiguousarray(output.transpose(1, 2, 0)[:, :, ::-1].round().astype(np.uint8))
+        for output in outputs
+    ]
+
+
+def enhance_face_crops(temp_frame: Frame, target_faces: List[Face]) -> Frame:
+    return enhance_face_crops_with_kps(temp_frame, target_faces)[0]
+
+
+def enhance_face_crops_with_kps(
+    temp_frame: Frame, target_faces: List[Face]
+) -> Tuple[Frame, List[KeyframeFace]]:
+    """Enhanced frame, plus the kps and restored crop of each enhanced face for keyframe propagation."""
+    if not is_face_enhancer_available():
+        return temp_frame, []
+    affines = []
+    face_kps = []
+    restored_crops = []
+    # crops that miss the temporal cache: (index, crop, face, thumbnail)
+    pending = []
+    for face in target_faces:
+        if getattr(face, "kps", None) is None:
+            continue
+        affine = get_alignment(face.kps)
+        face_size = get_face_size(affine, ENHANCER_CROP_SIZE)
+        enhance, reason = decide_enhancement(face, face_size)
+        record_decision(face, face_size, enhance, reason)
+        if not enhance:
+            continue
+        crop = align_face(temp_frame, affine)
+        cached_crop, thumbnail = get_cached_crop("enhance", face, crop)
+        if cached_crop is None:
+            pending.append((len(restored_crops), crop, face, thumbnail))
+        restored_crops.append(cached_crop)
+        affines.append(affine)
+        face_kps.append(face.kps)
+    if not affines:
+        return temp_frame, []
+
+    if pending:
+        start = time.perf_counter()
+        new_crops = run_face_enhancer([crop for _, crop, _, _ in pending])
+        record_enhancement_time(time.perf_counter() - start, len(pending))
+        for (index, _, face, thumbnail), restored_crop in zip(pending, new_crops):
+            restored_crops[index] = restored_crop
+            cache_crop("enhance", face, thumbnail, restored_crop)
+
+    result = temp_frame.copy()
+    for restored_crop, affine in zip(restored_crops, affines):
+        paste_crop(result, restored_crop, affine)
+    return result, list(zip(face_kps, restored_crops))
+
+
+def get_target_faces(temp_frame: Frame) -> List[Face]:
+    if modules.globals.many_faces:
+        return get_many_faces(temp_frame) or []
     target_face = get_one_face(temp_frame)
-    if target_face:
-        temp_frame = enhance_face(temp_frame)
+    return [target_face] if target_face else []
+
+
+def process_frame(source_face: Face, temp_frame: Frame) -> Frame:
+    if not is_face_enhancer_available():
+        return temp_frame
+    target_faces = get_target_faces(temp_frame)
+    if target_faces:
+        temp_frame = enhance_face(temp_frame, target_faces)
     return temp_frame
 
 
@@ -118,11 +423,35 @@ def process_image(source_path: str, target_path: str, output_path: str) -> None:
 
 
 def process_video(source_path: str, temp_frame_paths: List[str]) -> None:
+    if modules.globals.video_mode == "fast":
+        # keyframes always take the crop path, GFPGANer's own paste-back leaves nothing to propagate
+        modules.processors.frame.core.process_video_keyframes(
+            temp_frame_paths, process_keyframe, propagate_enhanced_faces
+        )
+        return
     modules.processors.frame.core.process_video(None, temp_frame_paths, process_frames)
 
 
+def process_keyframe(temp_frame: Frame, temp_frame_path: str) -> Tuple[Frame, List[KeyframeFace]]:
+    if not is_face_enhancer_available():
+        return temp_frame, []
+    return enhance_face_crops_with_kps(temp_frame, get_target_faces(temp_frame))
+
+
+def propagate_enhanced_faces(temp_frame: Frame, faces: List[KeyframeFace]) -> Frame:
+    """Paste keyframe restored crops at tracked landmarks, for the fast video mode."""
+    if not faces:
+        return temp_frame
+    result = temp_frame.copy()
+    for kps, restored_crop in faces:
+        paste_crop(result, restored_crop, get_alignment(kps))
+    return result
+
+
 def process_frame_v2(temp_frame: Frame) -> Frame:
-    target_face = get_one_face(temp_frame)
-    if target_face:
-        temp_frame = enhance_face(temp_frame)
+    if not is_face_enhancer_available():
+        return temp_frame
+    target_faces = get_target_faces(temp_frame)
+    if target_faces:
+        temp_frame = enhance_face(temp_frame, target_faces)
     return temp_frame
@@ -1,6 +1,6 @@
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple, Union
 import cv2
-import insightface
+from insightface.utils import face_align
 import threading
 import numpy as np
 import modules.globals
@@ -8,6 +8,10 @@ import logging
 import modules.processors.frame.core
 from modules.core import update_status
 from modules.face_analyser import get_one_face, get_many_faces, default_source_face
+from modules.onnx_session import IOBindingSession, SessionPool, load_insightface_model
+from modules.blending import paste_crops
+from modules.keyframes import KeyframeFace
+from modules.temporal_cache import cache_crop, get_cached_crop
 from modules.typing import Face, Frame
 from modules.utilities import (
     conditional_download,
@@ -17,7 +21,10 @@ from modules.utilities import (
 from modules.cluster_analysis import find_closest_centroid
 import os
 
-FACE_SWAPPER = None
+FACE_SWAPPER_POOL = None
+# by swapper model file and source embedding, the emap differs between models
+SOURCE_LATENTS: Dict[Tuple[Optional[str], bytes], np.ndarray] = {}
+SOURCE_LATENT_CACHE_SIZE = 64
 THREAD_LOCK = threading.Lock()
 NAME = "DLC.FACE-SWAPPER"
 
@@ -55,122 +62,318 @@ def pre_start() -> bool:
     return True
 
 
-def get_face_swapper() -> Any:
-    global FACE_SWAPPER
+SWAPPER_MODELS = {
+    "fp16": "inswapper_128_fp16.onnx",
+    "fp32": "inswapper_128.onnx",
+    "int8": "inswapper_128_int8.onnx",
+}
+# providers with native half precision kernels, everything else runs on the CPU path
+FP16_PROVIDERS = [
+    "CUDAExecutionProvider",
+    "TensorrtExecutionProvider",
+    "ROCMExecutionProvider",
+    "CoreMLExecutionProvider",
+    "DmlExecutionProvider",
+]
+
+
+def get_swapper_precisions() -> List[str]:
+    """
+    Inswapper variants to try, best first, for the active execution provider.
+
+    fp16 is only fast where the provider has half precision kernels, on the
+    CPU provider it is cast back and forth, so CPU workers prefer the int8
+    model made by runpod/quantize_inswapper.py and then the fp32 original.
+    """
+    precision = modules.globals.swapper_precision
+    if precision in SWAPPER_MODELS:
+        precisions = [precision]
+    elif any(provider in FP16_PROVIDERS for provider in modules.globals.execution_providers):
+        precisions = ["fp16", "fp32"]
+    else:
+        precisions = ["int8", "fp32"]
+    # fp16 is the model every deployment ships, keep it as the last resort
+    if "fp16" not in precisions:
+        precisions.append("fp16")
+    return precisions
+
+
+def find_swapper_model(model_name: str) -> Union[str, None]:
+    models_dir = modules.globals.get_models_dir()
+    search_paths = [
+        os.path.join(models_dir, model_name),
+        os.path.join('/workspace/faceswap', model_name),
+        os.path.join('/workspace/models', model_name),
+        os.path.join('/app/models', model_name),
+        os.path.join('/runpod-volume/models', model_name),
+        os.path.join(os.getcwd(), model_name),
+        os.path.join('..', model_name),
+        os.path.join('/workspace', model_name),
+    ]
+    for path in search_paths:
+        if os.path.isfile(path) and os.access(path, os.R_OK):
+            return path
+    return None
+
+
+def load_face_swapper() -> Any:
+    precisions = get_swapper_precisions()
+    print(f"🔍 Searching for face swapper model...")
+    print(f"   Execution providers: {modules.globals.execution_providers}")
+    print(f"   Precision preference: {precisions}")
+
+    model_path = None
+    for precision in precisions:
+        model_path = find_swapper_model(SWAPPER_MODELS[precision])
+        print(f"   {SWAPPER_MODELS[precision]} -> {model_path}")
+        if model_path:
+            break
+    else:
+        models_dir = modules.globals.get_models_dir()
+        raise FileNotFoundError(
+            f"❌ Face swapper model not found in {models_dir} or the fallback locations.\n"
+            f"   Tried: {', '.join(SWAPPER_MODELS[precision] for precision in precisions)}\n"
+            f"\n💡 Please ensure inswapper_128_fp16.onnx is available in the models directory.\n"
+            f"   You can download it from:\n"
+            f"   https://huggingface.co/hacksider/deep-live-cam/resolve/main/inswapper_128_fp16.onnx"
+        )
+
+    try:
+        print(f"🔄 Loading face swapper model from: {model_path}")
+        face_swapper = load_insightface_model(model_path)
+        print(f"✅ Face swapper model loaded successfully from: {model_path}")
+    except Exception as e:
+        raise RuntimeError(f"❌ Failed to load face swapper model from {model_path}: {str(e)}")
+    return face_swapper
+
+
+def get_face_swapper_pool() -> SessionPool:
+    """Pool of swapper sessions, sized by --swapper-pool-size."""
+    global FACE_SWAPPER_POOL
 
     with THREAD_LOCK:
-        if FACE_SWAPPER is None:
-            # Get models directory dynamically at runtime
-            models_dir = modules.globals.get_models_dir()
-            model_path = os.path.join(models_dir, "inswapper_128_fp16.onnx")
-            
-            print(f"🔍 Searching for face swapper model...")
-            print(f"   Primary models_dir: {models_dir}")
-            print(f"   Primary model_path: {model_path}")
-            print(f"   Primary exists: {os.path.exists(model_path)}")
-            
-            # Check if model file exists and provide helpful error message
-            if not os.path.exists(model_path):
-                # Try alternative locations with detailed checking
-                alternative_paths = [
-                    '/workspace/faceswap/inswapper_128_fp16.onnx',
-                    '/workspace/models/inswapper_128_fp16.onnx',
-                    '/app/models/inswapper_128_fp16.onnx',
-                    '/runpod-volume/models/inswapper_128_fp16.onnx'
-                ]
-                
-                print(f"   Primary path not found, checking alternatives...")
-                
-                for i, alt_path in enumerate(alternative_paths):
-                    exists = os.path.exists(alt_path)
-                    is_file = os.path.isfile(alt_path) if exists else False
-                    readable = os.access(alt_path, os.R_OK) if exists else False
-                    
-                    print(f"   Alternative {i+1}: {alt_path}")
-                    print(f"     exists: {exists}, is_file: {is_file}, readable: {readable}")
-                    
-                    if exists and is_file and readable:
-                        model_path = alt_path
-                        print(f"✅ Found model at alternative path: {model_path}")
-                        break
-                else:
-                    # Also check current working directory and common paths
-                    additional_paths = [
-                        'inswapper_128_fp16.onnx',  # current directory
-                        './inswapper_128_fp16.onnx',
-                        '../inswapper_128_fp16.onnx',
-                        '/workspace/inswapper_128_fp16.onnx',
-                        os.path.join(os.getcwd(), 'inswapper_128_fp16.onnx')
-                    ]
-                    
-                    print(f"   Checking additional paths...")
-                    for i, add_path in enumerate(additional_paths):
-                        exists = os.path.exists(add_path)
-                        print(f"   Additional {i+1}: {add_path} -> exists: {exists}")
-                        if exists and os.path.isfile(add_path):
-                            model_path = add_path
-                            print(f"✅ Found model at additional path: {model_path}")
-                            break
-                    else:
-                        # List what's actually in /workspace/faceswap/ to help debug
-                        workspace_dir = '/workspace/faceswap'
-                        if os.path.exists(workspace_dir):
-                            try:
-                                files = os.listdir(workspace_dir)
-                                print(f"   Files in {workspace_dir}: {files}")
-                            except Exception as e:
-                                print(f"   Error listing {workspace_dir}: {e}")
-                        
-                        # Model not found anywhere
-                        raise FileNotFoundError(
-                            f"❌ Face swapper model not found. Searched paths:\n"
-                            f"  Primary: {model_path}\n" +
-                            "\n".join(f"  Alternative: {path}" for path in alternative_paths) +
-                            f"\n\n💡 Please ensure inswapper_128_fp16.onnx is available in one of these locations.\n"
-                            f"   You can download it from:\n"
-                            f"   https://huggingface.co/hacksider/deep-live-cam/resolve/main/inswapper_128_fp16.onnx"
-                        )
-            
-            try:
-                print(f"🔄 Loading face swapper model from: {model_path}")
-                FACE_SWAPPER = insightface.model_zoo.get_model(
-                    model_path, providers=modules.globals.execution_providers
+        if FACE_SWAPPER_POOL is None:
+            FACE_SWAPPER_POOL = SessionPool(
+                load_face_swapper,
+                modules.globals.swapper_pool_size,
+                modules.globals.swapper_thread_affinity,
+            )
+    return FACE_SWAPPER_POOL
+
+
+def get_face_swapper() -> Any:
+    """A swapper from the pool, for its metadata or for single-threaded use."""
+    return get_face_swapper_pool().get()
+
+
+# A swap source is either a detected source face or its precomputed latent
+Source = Union[Face, np.ndarray]
+
+
+def swap_face(source_face: Source, target_face: Face, temp_frame: Frame) -> Frame:
+    return swap_faces_batch([(source_face, target_face)], temp_frame)
+
+
+def swap_faces_batch(face_pairs: List[Tuple[Source, Face]], temp_frame: Frame) -> Frame:
+    """Swap every (source, target_face) pair of one frame with a single inswapper run."""
+    return swap_faces_in_frames([(temp_frame, face_pairs)])[0]
+
+
+def swap_faces_in_frames(
+    frame_jobs: List[Tuple[Frame, List[Tuple[Source, Face]]]]
+) -> List[Frame]:
+    return swap_faces_with_crops(frame_jobs)[0]
+
+
+def swap_faces_with_crops(
+    frame_jobs: List[Tuple[Frame, List[Tuple[Source, Face]]]]
+) -> Tuple[List[Frame], List[List[KeyframeFace]]]:
+    """
+    Swap the faces of several frames at once.
+
+    All target faces of all frames are aligned to the swapper input size, run
+    through inswapper as stacked batches and pasted back into their frames.
+    Crops of near-static tracked faces are taken from the temporal cache.
+    Input frames are left untouched, a new frame is returned for each job with
+    all of its faces composited in a single pass over their face regions.
+    Sources may be given as faces or as latents from get_source_latent.
+    Next to the frames, the landmarks and swapped crop of each face are
+    returned per frame for keyframe propagation.
+    """
+    if not any(face_pairs for _, face_pairs in frame_jobs):
+        return [temp_frame for temp_frame, _ in frame_jobs], [[] for _ in frame_jobs]
+    face_swapper = get_face_swapper()
+    crop_size = face_swapper.input_size[0]
+
+    swapped_crops = []
+    affines = []
+    # crops that miss the temporal cache: (index, crop, latent, target_face, thumbnail)
+    pending = []
+    for temp_frame, face_pairs in frame_jobs:
+        for source, target_face in face_pairs:
+            aligned_crop, affine = face_align.norm_crop2(
+                temp_frame, target_face.kps, crop_size
+            )
+            latent = source if isinstance(source, np.ndarray) else get_source_latent(source)
+            cached_crop, thumbnail = get_cached_crop(
+                "swap", target_face, aligned_crop, latent.tobytes()
+            )
+            if cached_crop is None:
+                pending.append((len(swapped_crops), aligned_crop, latent, target_face, thumbnail))
+            swapped_crops.append(cached_crop)
+            affines.append(affine)
+
+    if pending:
+        with get_face_swapper_pool().checkout() as pooled_face_swapper:
+            new_crops = run_face_swapper(
+                pooled_face_swapper,
+                [crop for _, crop, _, _, _ in pending],
+                [latent for _, _, latent, _, _ in pending],
+            )
+        for (index, _, latent, target_face, thumbnail), swapped_crop in zip(pending, new_crops):
+            swapped_crops[index] = swapped_crop
+            cache_crop("swap", target_face, thumbnail, swapped_crop, latent.tobytes())
+
+    results = []
+    face_crops = []
+    crop_index = 0
+    for temp_frame, face_pairs in frame_jobs:
+        face_count = len(face_pairs)
+        face_crops.append(
+            [
+                (target_face.kps, swapped_crop)
+                for (_, target_face), swapped_crop in zip(
+                    face_pairs, swapped_crops[crop_index : crop_index + face_count]
+                )
+            ]
+        )
+        swapped_frame = paste_crops(
+            temp_frame,
+            list(
+                zip(
+                    swapped_crops[crop_index : crop_index + face_count],
+                    affines[crop_index : crop_index + face_count],
                 )
-                print(f"✅ Face swapper model loaded successfully from: {model_path}")
-            except Exception as e:
-                raise RuntimeError(f"❌ Failed to load face swapper model from {model_path}: {str(e)}")
-                
-    return FACE_SWAPPER
+            ),
+        )
+        crop_index += face_count
+        if modules.globals.mouth_mask:
+            for _, target_face in face_pairs:
+                swapped_frame = apply_mouth_mask(target_face, temp_frame, swapped_frame)
+        results.append(swapped_frame)
+    return results, face_crops
+
 
+def get_source_latent(source_face: Face) -> np.ndarray:
+    """
+    Inswapper latent of a source face, cached by the face's identity embedding
+    and the loaded swapper model.
 
-def swap_face(source_face: Face, target_face: Face, temp_frame: Frame) -> Frame:
+    The projection through the swapper's emap only depends on the source and
+    the model, so it is computed once per source instead of once per swapped
+    face, and again when the swapper is reloaded from another model file.
+    """
     face_swapper = get_face_swapper()
+    key = (getattr(face_swapper, "model_file", None), source_face.normed_embedding.tobytes())
+    latent = SOURCE_LATENTS.get(key)
+    if latent is None:
+        latent = source_face.normed_embedding.reshape((1, -1))
+        latent = np.dot(latent, face_swapper.emap)
+        latent /= np.linalg.norm(latent)
+        with THREAD_LOCK:
+            if len(SOURCE_LATENTS) >= SOURCE_LATENT_CACHE_SIZE:
+                SOURCE_LATENTS.pop(next(iter(SOURCE_LATENTS)))
+            SOURCE_LATENTS[key] = latent
+    return latent
+
+
+def supports_batching(face_swapper: Any) -> bool:
+    batch_dim = face_swapper.session.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int) or batch_dim < 1
+
+
+def run_face_swapper(
+    face_swapper: Any, crops: List[Frame], latents: List[np.ndarray]
+) -> List[Frame]:
+    """
+    Run inswapper over aligned crops, in batches where the model allows it.
 
-    # Apply the face swap
-    swapped_frame = face_swapper.get(
-        temp_frame, target_face, source_face, paste_back=True
+    With an IOBindingSession the crops and latents are written straight into
+    the session's bound input buffers, so a call costs little beyond the
+    kernel time.
+    """
+    if not crops:
+        return []
+    batch_size = (
+        max(1, modules.globals.swap_batch_size)
+        if supports_batching(face_swapper)
+        else 1
     )
+    session = face_swapper.session
+    target_name, source_name = face_swapper.input_names[:2]
+    width, height = face_swapper.input_size
+
+    bgr_fakes = []
+    for start in range(0, len(crops), batch_size):
+        batch_crops = crops[start : start + batch_size]
+        batch_latents = latents[start : start + batch_size]
+        input_shapes = {
+            target_name: (len(batch_crops), 3, height, width),
+            source_name: (len(batch_latents), batch_latents[0].shape[-1]),
+        }
+        if isinstance(session, IOBindingSession):
+            binding = session.get_binding(input_shapes)
+            target, source = binding.inputs[target_name], binding.inputs[source_name]
+        else:
+            target = np.empty(input_shapes[target_name], dtype=np.float32)
+            source = np.empty(input_shapes[source_name], dtype=np.float32)
+
+        for index, crop in enumerate(batch_crops):
+            # same normalisation as cv2.dnn.blobFromImage with swapRB, without the temporary
+            np.subtract(
+                crop[:, :, ::-1].transpose(2, 0, 1),
+                face_swapper.input_mean,
+                out=target[index],
+                casting="unsafe",
+            )
+        target *= 1.0 / face_swapper.input_std
+        np.concatenate(batch_latents, axis=0, out=source, casting="unsafe")
 
-    if modules.globals.mouth_mask:
-        # Create a mask for the target face
-        face_mask = create_face_mask(target_face, temp_frame)
-
-        # Create the mouth mask
-        mouth_mask, mouth_cutout, mouth_box, lower_lip_polygon = (
-            create_lower_mouth_mask(target_face, temp_frame)
+        if isinstance(session, IOBindingSession):
+            prediction = session.run_binding(binding)[0]
+        else:
+            prediction = session.run(
+                face_swapper.output_names, {target_name: target, source_name: source}
+            )[0]
+        # the uint8 conversion copies out of the bound output buffer before it is reused
+        prediction = np.clip(255 * prediction, 0, 255).astype(np.uint8)
+        bgr_fakes.extend(
+            np.ascontiguousarray(prediction.transpose((0, 2, 3, 1))[:, :, :, ::-1])
         )
+    return bgr_fakes
 
-        # Apply the mouth area
-        swapped_frame = apply_mouth_area(
-            swapped_frame, mouth_cutout, mouth_box, face_mask, lower_lip_polygon
-        )
 
-        if modules.globals.show_mouth_mask_box:
-            mouth_mask_data = (mouth_mask, mouth_cutout, mouth_box, lower_lip_polygon)
-            swapped_frame = draw_mouth_mask_visualization(
-                swapped_frame, target_face, mouth_mask_data
-            )
+def apply_mouth_mask(target_face: Face, temp_frame: Frame, swapped_frame: Frame) -> Frame:
+    # Create the mouth mask
+    mouth_mask, mouth_cutout, mouth_box, lower_lip_polygon = (
+        create_lower_mouth_mask(target_face, temp_frame)
+    )
+    if mouth_cutout is None:
+        return swapped_frame
 
+    # Create a mask for the target face, only within the mouth box
+    face_mask = create_face_mask(target_face, temp_frame, mouth_box)
+
+    # Apply the mouth area
+    swapped_frame = apply_mouth_area(
+        swapped_frame, mouth_cutout, mouth_box, face_mask, lower_lip_polygon
+    )
+
+    if modules.globals.show_mouth_mask_box:
+        mouth_mask_data = (mouth_mask, mouth_cutout, mouth_box, lower_lip_polygon)
+        swapped_frame = draw_mouth_mask_visualization(
+            swapped_frame, target_face, mouth_mask_data
+        )
     return swapped_frame
 
 
@@ -178,42 +381,48 @@ def process_frame(source_face: Face, temp_frame: Frame) -> Frame:
     if modules.globals.color_correction:
         temp_frame = cv2.cvtColor(temp_frame, cv2.COLOR_BGR2RGB)
 
+    return swap_faces_batch(get_face_pairs(source_face, temp_frame), temp_frame)
+
+
+def get_face_pairs(source_face: Face, temp_frame: Frame) -> List[Tuple[Source, Face]]:
     if modules.globals.many_faces:
         many_faces = get_many_faces(temp_frame)
+        if many_faces and source_face:
+            source_latent = get_source_latent(source_face)
+            return [(source_latent, target_face) for target_face in many_faces]
         if many_faces:
-            for target_face in many_faces:
-                if source_face and target_face:
-                    temp_frame = swap_face(source_face, target_face, temp_frame)
-                else:
-                    print("Face detection failed for target/source.")
+            print("Face detection failed for target/source.")
     else:
         target_face = get_one_face(temp_frame)
         if target_face and source_face:
-            temp_frame = swap_face(source_face, target_face, temp_frame)
-        else:
-            logging.error("Face detection failed for target or source.")
-    return temp_frame
-
+            return [(get_source_latent(source_face), target_face)]
+        logging.error("Face detection failed for target or source.")
+    return []
 
 
 def process_frame_v2(temp_frame: Frame, temp_frame_path: str = "") -> Frame:
+    return swap_faces_batch(get_face_pairs_v2(temp_frame, temp_frame_path), temp_frame)
+
+
+def get_face_pairs_v2(temp_frame: Frame, temp_frame_path: str = "") -> List[Tuple[Source, Face]]:
+    face_pairs = []
     if is_image(modules.globals.target_path):
         if modules.globals.many_faces:
-            source_face = default_source_face()
+            source_latent = get_source_latent(default_source_face())
             for map in modules.globals.source_target_map:
                 target_face = map["target"]["face"]
-                temp_frame = swap_face(source_face, target_face, temp_frame)
+                face_pairs.append((source_latent, target_face))
 
         elif not modules.globals.many_faces:
             for map in modules.globals.source_target_map:
                 if "source" in map:
-                    source_face = map["source"]["face"]
+                    source_latent = get_source_latent(map["source"]["face"])
                     target_face = map["target"]["face"]
-                    temp_frame = swap_face(source_face, target_face, temp_frame)
+                    face_pairs.append((source_latent, target_face))
 
     elif is_video(modules.globals.target_path):
         if modules.globals.many_faces:
-            source_face = default_source_face()
+            source_latent = get_source_latent(default_source_face())
             for map in modules.globals.source_target_map:
                 target_frame = [
                     f
@@ -223,7 +432,7 @@ def process_frame_v2(temp_frame: Frame, temp_frame_path: str = "") -> Frame:
 
                 for frame in target_frame:
                     for target_face in frame["faces"]:
-                        temp_frame = swap_face(source_face, target_face, temp_frame)
+                        face_pairs.append((source_latent, target_face))
 
         elif not modules.globals.many_faces:
             for map in modules.globals.source_target_map:
@@ -233,19 +442,19 @@ def process_frame_v2(temp_frame: Frame, temp_frame_path: str = "") -> Frame:
                         for f in map["target_faces_in_frame"]
                         if f["location"] == temp_frame_path
                     ]
-                    source_face = map["source"]["face"]
+                    source_latent = get_source_latent(map["source"]["face"])
 
                     for frame in target_frame:
                         for target_face in frame["faces"]:
-                            temp_frame = swap_face(source_face, target_face, temp_frame)
+                            face_pairs.append((source_latent, target_face))
 
     else:
         detected_faces = get_many_faces(temp_frame)
         if modules.globals.many_faces:
             if detected_faces:
-                source_face = default_source_face()
+                source_latent = get_source_latent(default_source_face())
                 for target_face in detected_faces:
-                    temp_frame = swap_face(source_face, target_face, temp_frame)
+                    face_pairs.append((source_latent, target_face))
 
         elif not modules.globals.many_faces:
             if detected_faces:
@@ -258,12 +467,15 @@ def process_frame_v2(temp_frame: Frame, temp_frame_path: str = "") -> Frame:
                             detected_face.normed_embedding,
                         )
 
-                        temp_frame = swap_face(
-                            modules.globals.simple_map["source_faces"][
-                                closest_centroid_index
-                            ],
-                            detected_face,
-                            temp_frame,
+                        face_pairs.append(
+                            (
+                                get_source_latent(
+                                    modules.globals.simple_map["source_faces"][
+                                        closest_centroid_index
+                                    ]
+                                ),
+                                detected_face,
+                            )
                         )
                 else:
                     detected_faces_centroids = []
@@ -277,41 +489,67 @@ def process_frame_v2(temp_frame: Frame, temp_frame_path: str = "") -> Frame:
                             detected_faces_centroids, target_embedding
                         )
 
-                        temp_frame = swap_face(
-                            modules.globals.simple_map["source_faces"][i],
-                            detected_faces[closest_centroid_index],
-                            temp_frame,
+                        face_pairs.append(
+                            (
+                                get_source_latent(
+                                    modules.globals.simple_map["source_faces"][i]
+                                ),
+                                detected_faces[closest_centroid_index],
+                            )
                         )
                         i += 1
+    return face_pairs
+
+
+def prepare_frame(temp_frame: Frame) -> Frame:
+    if not modules.globals.map_faces and modules.globals.color_correction:
+        return cv2.cvtColor(temp_frame, cv2.COLOR_BGR2RGB)
     return temp_frame
 
 
+def get_frame_job(
+    source_face: Face, temp_frame: Frame, temp_frame_path: str
+) -> Tuple[Frame, List[Tuple[Source, Face]]]:
+    temp_frame = prepare_frame(temp_frame)
+    if not modules.globals.map_faces:
+        return temp_frame, get_face_pairs(source_face, temp_frame)
+    return temp_frame, get_face_pairs_v2(temp_frame, temp_frame_path)
+
+
 def process_frames(
     source_path: str, temp_frame_paths: List[str], progress: Any = None
 ) -> None:
+    source_face = None
     if not modules.globals.map_faces:
         source_face = get_one_face(cv2.imread(source_path))
-        for temp_frame_path in temp_frame_paths:
-            temp_frame = cv2.imread(temp_frame_path)
-            try:
-                result = process_frame(source_face, temp_frame)
-                cv2.imwrite(temp_frame_path, result)
-            except Exception as exception:
-                print(exception)
-                pass
+    frame_jobs = []
+    job_paths = []
+    for temp_frame_path in temp_frame_paths:
+        temp_frame = cv2.imread(temp_frame_path)
+        try:
+            frame_jobs.append(get_frame_job(source_face, temp_frame, temp_frame_path))
+            job_paths.append(temp_frame_path)
+        except Exception as exception:
+            print(exception)
             if progress:
                 progress.update(1)
-    else:
-        for temp_frame_path in temp_frame_paths:
-            temp_frame = cv2.imread(temp_frame_path)
+
+    try:
+        results = swap_faces_in_frames(frame_jobs)
+    except Exception as exception:
+        print(exception)
+        # retry frame by frame, so only the frames that fail stay unswapped
+        results = []
+        for frame_job in frame_jobs:
             try:
-                result = process_frame_v2(temp_frame, temp_frame_path)
-                cv2.imwrite(temp_frame_path, result)
-            except Exception as exception:
-                print(exception)
-                pass
-            if progress:
-                progress.update(1)
+                results.extend(swap_faces_in_frames([frame_job]))
+            except Exception as frame_exception:
+                print(frame_exception)
+                results.append(frame_job[0])
+    for temp_frame_path, result in zip(job_paths, results):
+        cv2.imwrite(temp_frame_path, result)
+        if progress:
+            progress.update(1)
 
 
 def process_image(source_path: str, target_path: str, output_path: str) -> None:
@@ -335,16 +573,48 @@ def process_video(source_path: str, temp_frame_paths: List[str]) -> None:
         update_status(
             "Many faces enabled. Using first source image. Progressing...", NAME
         )
+    if modules.globals.video_mode == "fast":
+        source_face = None
+        if not modules.globals.map_faces:
+            source_face = get_one_face(cv2.imread(source_path))
+
+        def process_keyframe(temp_frame: Frame, temp_frame_path: str) -> Tuple[Frame, List[KeyframeFace]]:
+            results, face_crops = swap_faces_with_crops(
+                [get_frame_job(source_face, temp_frame, temp_frame_path)]
+            )
+            return results[0], face_crops[0]
+
+        modules.processors.frame.core.process_video_keyframes(
+            temp_frame_paths, process_keyframe, propagate_swapped_faces
+        )
+        return
     modules.processors.frame.core.process_video(
         source_path, temp_frame_paths, process_frames
     )
 
 
+def propagate_swapped_faces(temp_frame: Frame, faces: List[KeyframeFace]) -> Frame:
+    """Paste keyframe swapped crops at tracked landmarks, for the fast video mode."""
+    return paste_crops(
+        prepare_frame(temp_frame),
+        [(crop, face_align.estimate_norm(kps, crop.shape[0])) for kps, crop in faces],
+    )
+
+
 def create_lower_mouth_mask(
     face: Face, frame: Frame
 ) -> (np.ndarray, np.ndarray, tuple, np.ndarray):
-    mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+    """
+    Mask of the lower mouth region, cropped to its bounding box.
+
+    Returns the box-sized mask, the frame cutout under it, the box
+    (min_x, min_y, max_x, max_y) and the expanded lip polygon in frame
+    coordinates.
+    """
+    mask = None
     mouth_cutout = None
+    mouth_box = (0, 0, 0, 0)
+    lower_lip_polygon = None
     landmarks = face.landmark_2d_106
     if landmarks is not None:
         #                  0  1  2  3  4  5  6  7  8  9  10 11 12 13 14 15 16 17 18 19 20
@@ -397,10 +667,9 @@ def create_lower_mouth_mask(
         toplip_extension = (
             modules.globals.mask_size * 0.5
         )  # Adjust this factor to control the extension
-        for idx in toplip_indices:
-            direction = expanded_landmarks[idx] - center
-            direction = direction / np.linalg.norm(direction)
-            expanded_landmarks[idx] += direction * toplip_extension
+        directions = expanded_landmarks[toplip_indices] - center
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        expanded_landmarks[toplip_indices] += directions * toplip_extension
 
         # Extend the bottom part (chin area)
         chin_indices = [
@@ -412,10 +681,9 @@ def create_lower_mouth_mask(
             16,
         ]  # Indices for landmarks 21, 22, 23, 24, 0, 8
         chin_extension = 2 * 0.2  # Adjust this factor to control the extension
-        for idx in chin_indices:
-            expanded_landmarks[idx][1] += (
-                expanded_landmarks[idx][1] - center[1]
-            ) * chin_extension
+        expanded_landmarks[chin_indices, 1] += (
+            expanded_landmarks[chin_indices, 1] - center[1]
+        ) * chin_extension
 
         # Convert back to integer coordinates
         expanded_landmarks = expanded_landmarks.astype(np.int32)
@@ -439,22 +707,21 @@ def create_lower_mouth_mask(
                 max_y = min_y + 1
 
         # Create the mask
-        mask_roi = np.zeros((max_y - min_y, max_x - min_x), dtype=np.uint8)
-        cv2.fillPoly(mask_roi, [expanded_landmarks - [min_x, min_y]], 255)
+        mask = np.zeros((max_y - min_y, max_x - min_x), dtype=np.uint8)
+        offset = np.array([min_x, min_y], dtype=np.int32)
+        cv2.fillPoly(mask, [expanded_landmarks - offset], 255)
 
         # Apply Gaussian blur to soften the mask edges
-        mask_roi = cv2.GaussianBlur(mask_roi, (15, 15), 5)
-
-        # Place the mask ROI in the full-sized mask
-        mask[min_y:max_y, min_x:max_x] = mask_roi
+        mask = cv2.GaussianBlur(mask, (15, 15), 5)
 
         # Extract the masked area from the frame
         mouth_cutout = frame[min_y:max_y, min_x:max_x].copy()
+        mouth_box = (min_x, min_y, max_x, max_y)
 
         # Return the expanded lower lip polygon in original frame coordinates
         lower_lip_polygon = expanded_landmarks
 
-    return mask, mouth_cutout, (min_x, min_y, max_x, max_y), lower_lip_polygon
+    return mask, mouth_cutout, mouth_box, lower_lip_polygon
 
 
 def draw_mouth_mask_visualization(
@@ -546,6 +813,12 @@ def apply_mouth_area(
     face_mask: np.ndarray,
     mouth_polygon: np.ndarray,
 ) -> np.ndarray:
+    """
+    Blend the original mouth back into the frame in place.
+
+    face_mask covers the mouth box only, as returned by
+    create_face_mask(face, frame, mouth_box).
+    """
     min_x, min_y, max_x, max_y = mouth_box
     box_width = max_x - min_x
     box_height = max_y - min_y
@@ -571,9 +844,9 @@ def apply_mouth_area(
         color_corrected_mouth = apply_color_transfer(resized_mouth_cutout, roi)
 
         # Use the provided mouth polygon to create the mask
-        polygon_mask = np.zeros(roi.shape[:2], dtype=np.uint8)
-        adjusted_polygon = mouth_polygon - [min_x, min_y]
-        cv2.fillPoly(polygon_mask, [adjusted_polygon], 255)
+        polygon_mask = np.zeros(roi.shape[:2], dtype=np.float32)
+        adjusted_polygon = mouth_polygon - np.array([min_x, min_y], dtype=np.int32)
+        cv2.fillPoly(polygon_mask, [adjusted_polygon], 1.0)
 
         # Apply feathering to the polygon mask
         feather_amount = min(
@@ -581,34 +854,36 @@ def apply_mouth_area(
             box_width // modules.globals.mask_feather_ratio,
             box_height // modules.globals.mask_feather_ratio,
         )
-        feathered_mask = cv2.GaussianBlur(
-            polygon_mask.astype(float), (0, 0), feather_amount
-        )
-        feathered_mask = feathered_mask / feathered_mask.max()
+        feathered_mask = cv2.GaussianBlur(polygon_mask, (0, 0), feather_amount)
+        feathered_mask /= feathered_mask.max()
 
-        face_mask_roi = face_mask[min_y:max_y, min_x:max_x]
-        combined_mask = feathered_mask * (face_mask_roi / 255.0)
+        face_mask_roi = face_mask[: roi.shape[0], : roi.shape[1]].astype(np.float32)
+        face_mask_roi *= 1.0 / 255.0
+        combined_mask = (feathered_mask * face_mask_roi)[:, :, np.newaxis]
 
-        combined_mask = combined_mask[:, :, np.newaxis]
+        roi_float = roi.astype(np.float32)
         blended = (
-            color_corrected_mouth * combined_mask + roi * (1 - combined_mask)
+            roi_float + combined_mask * (color_corrected_mouth - roi_float)
         ).astype(np.uint8)
 
         # Apply face mask to blended result
-        face_mask_3channel = (
-            np.repeat(face_mask_roi[:, :, np.newaxis], 3, axis=2) / 255.0
-        )
-        final_blend = blended * face_mask_3channel + roi * (1 - face_mask_3channel)
-
-        frame[min_y:max_y, min_x:max_x] = final_blend.astype(np.uint8)
+        face_mask_roi = face_mask_roi[:, :, np.newaxis]
+        roi[:] = (roi_float + face_mask_roi * (blended - roi_float)).astype(np.uint8)
     except Exception as e:
         pass
 
     return frame
 
 
-def create_face_mask(face: Face, frame: Frame) -> np.ndarray:
-    mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+def create_face_mask(face: Face, frame: Frame, box: tuple = None) -> np.ndarray:
+    """
+    Soft mask of the face outline.
+
+    When box (min_x, min_y, max_x, max_y) is given only that region of the
+    mask is rasterised and returned, otherwise the mask covers the frame.
+    """
+    min_x, min_y, max_x, max_y = box or (0, 0, frame.shape[1], frame.shape[0])
+    mask = np.zeros((max_y - min_y, max_x - min_x), dtype=np.uint8)
     landmarks = face.landmark_2d_106
     if landmarks is not None:
         # Convert landmarks to int32
@@ -655,20 +930,15 @@ def create_face_mask(face: Face, frame: Frame) -> np.ndarray:
         )  # 5% of face width
 
         # Create a slightly larger convex hull for padding
-        hull = cv2.convexHull(face_outline)
-        hull_padded = []
-        for point in hull:
-            x, y = point[0]
-            center = np.mean(face_outline, axis=0)
-            direction = np.array([x, y]) - center
-            direction = direction / np.linalg.norm(direction)
-            padded_point = np.array([x, y]) + direction * padding
-            hull_padded.append(padded_point)
-
-        hull_padded = np.array(hull_padded, dtype=np.int32)
+        hull = cv2.convexHull(face_outline)[:, 0, :].astype(np.float32)
+        center = np.mean(face_outline, axis=0)
+        directions = hull - center
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        hull_padded = (hull + directions * padding).astype(np.int32)
 
         # Fill the padded convex hull
-        cv2.fillConvexPoly(mask, hull_padded, 255)
+        offset = np.array([min_x, min_y], dtype=np.int32)
+        cv2.fillConvexPoly(mask, hull_padded - offset, 255)
 
         # Smooth the mask edges
         mask = cv2.GaussianBlur(mask, (5, 5), 3)
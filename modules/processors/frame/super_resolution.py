@@ -3,10 +3,13 @@ Super Resolution Processor using Real-ESRGAN
 Enhances image resolution for ultra-high-definition output
 """
 
-from typing import Any, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 import cv2
+import gc
 import numpy as np
 import threading
+import time
 import os
 import tempfile
 import logging
@@ -14,21 +17,59 @@ import logging
 import modules.globals
 import modules.processors.frame.core
 from modules.core import update_status
-from modules.typing import Frame
+from modules.blending import get_face_region, get_feather_mask, merge_regions
+from modules.capabilities import has_load_failed, is_available, record_load_failure
+from modules.face_analyser import get_many_faces
+from modules.typing import Face, Frame
 from modules.utilities import (
+    clean_temp,
     conditional_download,
-    is_image,
-    is_video,
+    create_temp,
+    create_video,
+    extract_frames,
+    get_temp_frame_paths,
+    restore_audio,
 )
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-SUPER_RESOLUTION_MODEL = None
+# loaded models by (model, scale, precision, runtime), least recently used first
+SR_MODELS: "OrderedDict[Tuple[str, int, str, str], SuperResolutionModel]" = OrderedDict()
+SR_MODEL_MEMORY: Dict[Tuple[str, int, str, str], int] = {}
 THREAD_SEMAPHORE = threading.Semaphore()
 THREAD_LOCK = threading.Lock()
 NAME = "DLC.SUPER-RESOLUTION"
 
+# tile sides tried by plan_tiles, largest first
+SR_TILE_SIZES = (1024, 768, 512, 384, 256, 192, 128)
+SR_TILE_PAD = 10
+# RRDBNet: 64 features, dense blocks concatenate up to 6 feature maps, and the
+# upsampling stages hold two 64-channel maps at the output resolution
+SR_FEATURES = 64
+SR_STATS: Dict[str, Any] = {}
+
+# Real-ESRGAN graphs exported by runpod/export_realesrgan_onnx.py
+SR_ONNX_MODELS = {4: 'RealESRGAN_x4plus.onnx', 2: 'RealESRGAN_x2plus.onnx'}
+# (device, runtime, precision) by (--sr-backend, --sr-precision)
+SR_BACKENDS: Dict[Tuple[str, str], Tuple[str, str, str]] = {}
+# traced TorchScript graphs kept per model, one per padded tile batch shape
+SR_TRACED_SHAPES = 8
+# tile sides are padded up to a multiple of this before tracing
+SR_TRACE_STEP = 64
+
+# upscaler tiers from best to fastest, see choose_tier
+SR_TIERS = ('realesrgan', 'light', 'lanczos')
+# seconds per input megapixel until a tier has been measured (Real-ESRGAN on CUDA)
+SR_TIER_PRIORS = {'realesrgan': 1.0, 'light': 0.4, 'lanczos': 0.02}
+SR_CPU_SLOWDOWN = 30.0
+SR_TIER_SECONDS: Dict[Tuple[str, int], float] = {}
+SR_TIER_COUNTS: Dict[str, int] = {}
+SR_DEADLINE: Optional[float] = None
+LIGHT_SR_MODELS = {2: 'FSRCNN_x2.pb', 4: 'FSRCNN_x4.pb'}
+LIGHT_SR_MODEL_PATHS: Dict[str, str] = {}
+LIGHT_SR_NETS = threading.local()
+
 def get_models_directory():
     """Get models directory with fallback options"""
     try:
@@ -59,7 +100,7 @@ def get_models_directory():
     return default_dir
 
 
-def find_model_file(model_name: str) -> Optional[str]:
+def find_model_file(model_name: str, min_size: int = 1024 * 1024) -> Optional[str]:
     """Find model file in various possible locations"""
     
     # Enhanced search paths with RunPod Serverless support
@@ -92,7 +133,7 @@ def find_model_file(model_name: str) -> Optional[str]:
         model_path = os.path.join(search_path, model_name)
         if os.path.exists(model_path) and os.path.isfile(model_path):
             file_size = os.path.getsize(model_path)
-            if file_size > 1024 * 1024:  # At least 1MB
+            if file_size > min_size:  # At least 1MB for the Real-ESRGAN weights
                 logger.info(f"✅ Found {model_name} at: {model_path} ({file_size} bytes)")
                 return model_path
             else:
@@ -159,7 +200,9 @@ def pre_check() -> bool:
         download_directory_path,
         [
             "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.0/RealESRGAN_x4plus.pth",
-            "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.1/RealESRGAN_x2plus.pth"
+            "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.2.1/RealESRGAN_x2plus.pth",
+            "https://github.com/Saafke/FSRCNN_Tensorflow/raw/master/models/FSRCNN_x2.pb",
+            "https://github.com/Saafke/FSRCNN_Tensorflow/raw/master/models/FSRCNN_x4.pb"
         ],
     )
     return True
@@ -170,121 +213,639 @@ def post_check() -> bool:
     return True
 
 
-def get_super_resolution_model(scale_factor: int = 4):
-    """Get Real-ESRGAN model for super resolution"""
-    global SUPER_RESOLUTION_MODEL
-    
+class SuperResolutionModel:
+    """
+    A loaded Real-ESRGAN network on the runtime picked at load time
+
+    run takes a batch of padded RGB uint8 tiles (N, H, W, 3) and returns
+    the upscaled batch in the same layout, whatever runs underneath.
+    """
+
+    def __init__(self, run_batch: Any, scale: int, device: str, half: bool, runtime: str, memory: int) -> None:
+        self.run_batch = run_batch
+        self.scale = scale
+        self.device = device
+        self.half = half
+        self.runtime = runtime
+        self.memory = memory
+
+    def run(self, tiles: np.ndarray) -> np.ndarray:
+        return self.run_batch(tiles)
+
+
+def get_super_resolution_backend() -> Tuple[str, str, str]:
+    """
+    Device, runtime and precision super resolution models are loaded with
+
+    CUDA runs the torch network in fp16. On CPU half precision is slow or
+    unsupported, so CPU models always run in fp32: on the exported ONNX graph
+    when there is one, else on the torch network. --sr-backend and
+    --sr-precision override the choice, frozen TorchScript traces are only
+    used when asked for. Resolved once per setting.
+    """
+    settings = (modules.globals.sr_backend, modules.globals.sr_precision)
+    backend = SR_BACKENDS.get(settings)
+    if backend is None:
+        backend = SR_BACKENDS[settings] = resolve_super_resolution_backend()
+    return backend
+
+
+def resolve_super_resolution_backend() -> Tuple[str, str, str]:
+    device = 'cuda' if is_cuda_available() else 'cpu'
+    precision = modules.globals.sr_precision
+    if precision == 'auto':
+        precision = 'fp16' if device == 'cuda' else 'fp32'
+    elif precision == 'fp16' and device == 'cpu':
+        logger.warning("⚠️ fp16 super resolution needs CUDA, using fp32 on CPU")
+        precision = 'fp32'
+    runtime = modules.globals.sr_backend
+    if runtime == 'auto':
+        runtime = 'torch'
+        if device == 'cpu':
+            runtime = 'onnx' if is_onnxruntime_available() and any(
+                find_model_file(model_name) for model_name in SR_ONNX_MODELS.values()
+            ) else 'torch'
+    if runtime == 'onnx':
+        # the exported graphs are fp32
+        precision = 'fp32'
+    return device, runtime, precision
+
+
+def is_onnxruntime_available() -> bool:
+    try:
+        import onnxruntime
+
+        return True
+    except ImportError:
+        return False
+
+
+def get_super_resolution_model(scale_factor: int = 4) -> Optional[SuperResolutionModel]:
+    """
+    Get the Real-ESRGAN model for a scale factor from the model registry
+
+    Models stay resident keyed by (model, scale, precision, runtime), the
+    runtime and precision coming from get_super_resolution_backend. Tiling is
+    planned per frame by plan_tiles, not at load time, so the tile config is
+    not part of the key. Loading a model that does not fit the
+    --sr-model-cache-mb budget evicts the least recently used ones, before
+    the load by its file size and after it by its actual weights.
+    """
+    key = get_model_key(scale_factor)
+    model_name, netscale, precision, runtime = key
+
     with THREAD_LOCK:
-        if SUPER_RESOLUTION_MODEL is None:
-            try:
-                # Try to import Real-ESRGAN
-                try:
-                    import basicsr
-                    from realesrgan import RealESRGANer
-                    from realesrgan.archs.srvgg_arch import SRVGGNetCompact
-                    logger.info("✅ Real-ESRGAN modules imported successfully")
-                except ImportError as e:
-                    logger.warning(f"⚠️ Real-ESRGAN not available: {e}")
-                    logger.info("📦 Installing Real-ESRGAN...")
-                    
-                    # Try to install Real-ESRGAN
-                    import subprocess
-                    import sys
-                    
-                    try:
-                        subprocess.check_call([sys.executable, "-m", "pip", "install", "realesrgan", "basicsr"])
-                        import basicsr
-                        from realesrgan import RealESRGANer
-                        from realesrgan.archs.srvgg_arch import SRVGGNetCompact
-                        logger.info("✅ Real-ESRGAN installed and imported successfully")
-                    except Exception as install_error:
-                        logger.error(f"❌ Failed to install Real-ESRGAN: {install_error}")
-                        return None
-                
-                # Determine model path based on scale factor
-                if scale_factor == 4:
-                    model_name = 'RealESRGAN_x4plus.pth'
-                    netscale = 4
-                elif scale_factor == 2:
-                    model_name = 'RealESRGAN_x2plus.pth'
-                    netscale = 2
-                else:
-                    logger.warning(f"⚠️ Unsupported scale factor {scale_factor}, using 4x")
-                    model_name = 'RealESRGAN_x4plus.pth'
-                    netscale = 4
-                
-                # Search for model in multiple locations
-                model_path = find_model_file(model_name)
-                
-                # Check if model exists
-                if not model_path or not os.path.exists(model_path):
-                    logger.error(f"❌ Super resolution model not found: {model_name}")
-                    logger.info("💡 Attempting to download model...")
-                    
-                    # Try to download missing model
-                    models_dir = get_models_directory()
-                    download_path = os.path.join(models_dir, model_name)
-                    
-                    if download_super_resolution_model(model_name, download_path):
-                        model_path = download_path
-                        logger.info(f"✅ Model downloaded successfully: {model_path}")
-                    else:
-                        logger.error(f"❌ Failed to download model: {model_name}")
-                        return None
-                
-                logger.info(f"🔍 Loading super resolution model: {model_name}")
-                
-                # Determine the correct network architecture for each model
-                if model_name == 'RealESRGAN_x4plus.pth':
-                    # RealESRGAN_x4plus uses RRDBNet architecture
-                    from basicsr.archs.rrdbnet_arch import RRDBNet
-                    model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=4)
-                elif model_name == 'RealESRGAN_x2plus.pth':
-                    # RealESRGAN_x2plus uses RRDBNet architecture
-                    from basicsr.archs.rrdbnet_arch import RRDBNet
-                    model = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=2)
-                else:
-                    # Fallback to auto-detection for unknown models
-                    model = None
-                    logger.warning(f"⚠️ Unknown model {model_name}, using auto-detection")
-                
-                # Initialize RealESRGAN with proper architecture
-                SUPER_RESOLUTION_MODEL = RealESRGANer(
-                    scale=netscale,
-                    model_path=model_path,
-                    model=model,  # Use specific architecture instead of None
-                    tile=512,     # Use tiling for memory efficiency
-                    tile_pad=10,
-                    pre_pad=0,
-                    half=True     # Use half precision for speed
-                )
-                
-                logger.info(f"✅ Super resolution model loaded successfully (scale: {netscale}x)")
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to load super resolution model: {e}")
-                # Try fallback initialization with simpler settings
+        sr_model = SR_MODELS.get(key)
+        if sr_model is not None:
+            SR_MODELS.move_to_end(key)
+            return sr_model
+        if not is_realesrgan_available(scale_factor):
+            return None
+        device = get_super_resolution_backend()[0]
+        evict_super_resolution_models(estimate_model_memory(model_name, netscale, runtime, precision == 'fp16'))
+        sr_model = load_super_resolution_model(model_name, netscale, device, runtime, precision == 'fp16')
+        if sr_model is None:
+            record_load_failure(('super_resolution',) + key)
+            return None
+        register_super_resolution_model(key, sr_model)
+    return sr_model
+
+
+def get_model_key(scale_factor: int) -> Tuple[str, int, str, str]:
+    """Registry key (model, scale, precision, runtime) of the model for a scale factor"""
+    # Determine model path based on scale factor
+    if scale_factor == 2:
+        model_name = 'RealESRGAN_x2plus.pth'
+        netscale = 2
+    else:
+        if scale_factor != 4:
+            logger.warning(f"⚠️ Unsupported scale factor {scale_factor}, using 4x")
+        model_name = 'RealESRGAN_x4plus.pth'
+        netscale = 4
+    _, runtime, precision = get_super_resolution_backend()
+    return model_name, netscale, precision, runtime
+
+
+def is_realesrgan_available(scale_factor: int) -> bool:
+    """False when the startup probe found no super resolution runtime or the model failed to load within the retry interval"""
+    return is_available('super_resolution') and not has_load_failed(('super_resolution',) + get_model_key(scale_factor))
+
+
+def estimate_model_memory(model_name: str, netscale: int, runtime: str, half: bool) -> int:
+    """Weight bytes of a model before loading it, from its file size (0 when not downloaded yet)"""
+    model_path = find_model_file(SR_ONNX_MODELS[netscale] if runtime == 'onnx' else model_name)
+    if model_path is None:
+        return 0
+    memory = os.path.getsize(model_path)
+    return memory // 2 if half and runtime != 'onnx' else memory
+
+
+def evict_super_resolution_models(memory: int) -> None:
+    """
+    Drop least recently used models until memory more bytes fit the budget (THREAD_LOCK held)
+
+    The registry holds the only lasting reference to a model, frames still
+    running on an evicted one release it when they finish. The garbage
+    collector runs before CUDA's cache is emptied, so networks kept alive
+    by reference cycles are freed and their blocks returned to the device.
+    """
+    budget = modules.globals.sr_model_cache_mb * 1024 * 1024
+    evicted_devices = set()
+    while SR_MODELS and sum(SR_MODEL_MEMORY.values()) + memory > budget:
+        evicted_key, evicted_model = SR_MODELS.popitem(last=False)
+        SR_MODEL_MEMORY.pop(evicted_key, None)
+        evicted_devices.add(evicted_model.device)
+        del evicted_model
+        logger.info(f"🗑️ Evicted super resolution model {evicted_key} from the registry")
+    if evicted_devices:
+        gc.collect()
+    if 'cuda' in evicted_devices:
+        import torch
+
+        torch.cuda.empty_cache()
+
+
+def register_super_resolution_model(key: Tuple[str, int, str, str], sr_model: SuperResolutionModel) -> None:
+    """Add a loaded model to the registry, evicting least recently used models over budget (THREAD_LOCK held)"""
+    evict_super_resolution_models(sr_model.memory)
+    SR_MODELS[key] = sr_model
+    SR_MODEL_MEMORY[key] = sr_model.memory
+    logger.info(f"📚 Super resolution models resident: {list(SR_MODELS)} ({sum(SR_MODEL_MEMORY.values()) // (1024 * 1024)}MB)")
+
+
+def load_super_resolution_model(
+    model_name: str, netscale: int, device: str, runtime: str, half: bool
+) -> Optional[SuperResolutionModel]:
+    """Load a Real-ESRGAN model on the given runtime, None if it cannot be loaded"""
+    try:
+        if runtime == 'onnx':
+            return load_onnx_model(netscale, device)
+
+        from basicsr.archs.rrdbnet_arch import RRDBNet
+        
+        # Search for model in multiple locations
+        model_path = find_model_file(model_name)
+        
+        # Check if model exists
+        if not model_path or not os.path.exists(model_path):
+            logger.error(f"❌ Super resolution model not found: {model_name}")
+            logger.info("💡 Attempting to download model...")
+            
+            # Try to download missing model
+            models_dir = get_models_directory()
+            download_path = os.path.join(models_dir, model_name)
+            
+            if download_super_resolution_model(model_name, download_path):
+                model_path = download_path
+                logger.info(f"✅ Model downloaded successfully: {model_path}")
+            else:
+                logger.error(f"❌ Failed to download model: {model_name}")
+                return None
+        
+        logger.info(f"🔍 Loading super resolution model: {model_name} ({runtime} on {device}, half: {half})")
+        
+        import torch
+
+        # Both models use the RRDBNet architecture
+        network = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=netscale)
+        weights = torch.load(model_path, map_location='cpu')
+        network.load_state_dict(weights['params_ema'] if 'params_ema' in weights else weights['params'], strict=True)
+        network = network.eval().to(device)
+        if half:
+            network = network.half()
+        memory = sum(parameter.numel() * parameter.element_size() for parameter in network.parameters())
+        if runtime == 'torchscript':
+            run_batch = get_torchscript_runner(network, netscale, device, half)
+        else:
+            run_batch = get_torch_runner(network, device, half)
+        
+        logger.info(f"✅ Super resolution model loaded successfully (scale: {netscale}x, {runtime}, half: {half})")
+        return SuperResolutionModel(run_batch, netscale, device, half, runtime, memory)
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to load super resolution model: {e}")
+        return None
+
+
+def to_tensor(tiles: np.ndarray, device: str, half: bool) -> Any:
+    import torch
+
+    tensor = torch.from_numpy(tiles).to(device).permute(0, 3, 1, 2)
+    return (tensor.half() if half else tensor.float()) / 255.0
+
+
+def from_tensor(upscaled: Any) -> np.ndarray:
+    return upscaled.clamp_(0, 1).mul_(255.0).round_().byte().permute(0, 2, 3, 1).cpu().numpy()
+
+
+def get_torch_runner(network: Any, device: str, half: bool) -> Any:
+    import torch
+
+    def run_batch(tiles: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return from_tensor(network(to_tensor(tiles, device, half)))
+
+    return run_batch
+
+
+def get_torchscript_runner(network: Any, scale: int, device: str, half: bool) -> Any:
+    """
+    Run on frozen TorchScript traces of the network, one per padded batch shape
+
+    Freezing inlines the weights so optimize_for_inference can fold and fuse
+    the convolutions for the device. Tile sizes follow each image's size and
+    face regions change from frame to frame, so tile sides are padded up to
+    a multiple of SR_TRACE_STEP with edge pixels, cropped off the output
+    again, and batches run in chunks of power-of-two sizes. Runs then share
+    a few traces and only the first batch of a shape pays for tracing. If
+    tracing fails the eager network is used instead, the weights are shared
+    either way.
+    """
+    import torch
+
+    traced: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+    # messages only, a kept exception's traceback would hold the network in a reference cycle
+    trace_errors: List[str] = []
+    eager = get_torch_runner(network, device, half)
+
+    def run_batch(tiles: np.ndarray) -> np.ndarray:
+        if trace_errors:
+            return eager(tiles)
+        count, height, width = tiles.shape[:3]
+        padded_height = -(-height // SR_TRACE_STEP) * SR_TRACE_STEP
+        padded_width = -(-width // SR_TRACE_STEP) * SR_TRACE_STEP
+        tiles = np.pad(tiles, ((0, 0), (0, padded_height - height), (0, padded_width - width), (0, 0)), mode='edge')
+        outputs = []
+        start = 0
+        while start < count:
+            # largest power of two that fits the remaining tiles
+            chunk = 1 << ((count - start).bit_length() - 1)
+            outputs.append(trace_batch(tiles[start:start + chunk]))
+            start += chunk
+        return np.concatenate(outputs)[:, :height * scale, :width * scale]
+
+    def trace_batch(tiles: np.ndarray) -> np.ndarray:
+        tensor = to_tensor(tiles, device, half)
+        shape = tuple(tensor.shape)
+        with torch.no_grad():
+            module = traced.get(shape)
+            if module is None:
                 try:
-                    logger.info("🔄 Attempting fallback model initialization...")
-                    
-                    # Try with default settings and no specific model architecture
-                    SUPER_RESOLUTION_MODEL = RealESRGANer(
-                        scale=netscale,
-                        model_path=model_path,
-                        tile=0,       # Disable tiling as fallback
-                        half=False    # Disable half precision as fallback
-                    )
-                    
-                    logger.info("✅ Fallback super resolution model loaded successfully")
-                    
-                except Exception as fallback_error:
-                    logger.error(f"❌ Fallback model loading also failed: {fallback_error}")
-                    return None
+                    module = torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.trace(network, tensor)))
+                except Exception as e:
+                    logger.warning(f"⚠️ TorchScript trace failed, running the torch network: {e}")
+                    trace_errors.append(str(e))
+                    traced.clear()
+                    return from_tensor(network(tensor))
+                traced[shape] = module
+                if len(traced) > SR_TRACED_SHAPES:
+                    traced.popitem(last=False)
+            traced.move_to_end(shape)
+            return from_tensor(module(tensor))
+
+    return run_batch
+
+
+def load_onnx_model(netscale: int, device: str) -> Optional[SuperResolutionModel]:
+    """Real-ESRGAN graph on an ONNX Runtime session, None when it was not exported"""
+    from modules.onnx_session import load_session
+
+    model_path = find_model_file(SR_ONNX_MODELS[netscale])
+    if model_path is None:
+        logger.error(f"❌ Super resolution graph not found: {SR_ONNX_MODELS[netscale]}, export it with runpod/export_realesrgan_onnx.py")
+        return None
+    providers = ['CUDAExecutionProvider', 'CPUExecutionProvider'] if device == 'cuda' else ['CPUExecutionProvider']
+    session = load_session(model_path, providers)
+    input_name = session.get_inputs()[0].name
+
+    def run_batch(tiles: np.ndarray) -> np.ndarray:
+        blob = tiles.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        upscaled = session.run(None, {input_name: blob})[0]
+        upscaled = (np.clip(upscaled, 0.0, 1.0) * 255.0).round().astype(np.uint8)
+        return np.ascontiguousarray(upscaled.transpose(0, 2, 3, 1))
+
+    logger.info(f"✅ Super resolution graph loaded: {model_path}")
+    return SuperResolutionModel(run_batch, netscale, device, False, 'onnx', os.path.getsize(model_path))
+
+
+def get_available_memory(device: str) -> int:
+    """Free bytes on the device the model runs on"""
+    if device == 'cuda':
+        import torch
+
+        free_memory, _ = torch.cuda.mem_get_info()
+        return free_memory
+    import psutil
+
+    return psutil.virtual_memory().available
+
+
+def estimate_tile_memory(tile_height: int, tile_width: int, scale: int, element_size: int) -> int:
+    """Rough peak activation bytes of one padded tile in a Real-ESRGAN forward pass"""
+    pixels = (tile_height + 2 * SR_TILE_PAD) * (tile_width + 2 * SR_TILE_PAD)
+    return pixels * element_size * SR_FEATURES * (6 + 2 * scale * scale)
+
+
+def split_evenly(size: int, tile_size: int) -> Tuple[int, int]:
+    """Tile length covering size in as few, equally long tiles as possible (multiple of 8), and their count"""
+    count = -(-size // tile_size)
+    length = -(-size // count)
+    return -(-length // 8) * 8, count
+
+
+def plan_tiles(height: int, width: int, scale: int, element_size: int, available: int) -> Tuple[int, int, int]:
+    """
+    Tile height, tile width and tiles per forward pass for an image
+
+    The largest tile whose estimated memory fits the budget is split evenly
+    over the image, so edge tiles are not mostly padding, and as many tiles
+    as still fit the budget are batched, up to --sr-tile-batch-size.
+    """
+    budget = available * modules.globals.sr_memory_fraction
+    tile_sizes = (modules.globals.sr_tile_size,) if modules.globals.sr_tile_size > 0 else SR_TILE_SIZES
+    tile_size = tile_sizes[-1]
+    for size in tile_sizes:
+        if estimate_tile_memory(size, size, scale, element_size) <= budget:
+            tile_size = size
+            break
+    tile_height, rows = split_evenly(height, tile_size)
+    tile_width, columns = split_evenly(width, tile_size)
+    batch_size = int(budget // estimate_tile_memory(tile_height, tile_width, scale, element_size))
+    batch_size = max(1, min(batch_size, modules.globals.sr_tile_batch_size, rows * columns))
+    return tile_height, tile_width, batch_size
+
+
+def is_out_of_memory(error: Exception) -> bool:
+    message = str(error).lower()
+    # onnxruntime reports allocation failures as "Failed to allocate memory"
+    return isinstance(error, (RuntimeError, MemoryError)) and ('out of memory' in message or 'failed to allocate' in message)
+
+
+def upscale_tiled(sr_model: SuperResolutionModel, image: np.ndarray) -> np.ndarray:
+    """
+    Run the Real-ESRGAN network over an RGB image in batches of tiles
+
+    The image is reflect-padded once so every tile, edge tiles included, has
+    the same padded shape and tiles can be stacked into one forward pass. On
+    an out of memory error the plan is redone with half the memory.
+    """
+    height, width = image.shape[:2]
+    scale = sr_model.scale
+    device = sr_model.device
+    element_size = 2 if sr_model.half else 4
+    available = get_available_memory(device)
+    plan = plan_tiles(height, width, scale, element_size, available)
+    while True:
+        tile_height, tile_width, batch_size = plan
+        try:
+            output, peak_memory = run_tiles(sr_model, image, tile_height, tile_width, batch_size)
+            break
+        except Exception as e:
+            if not is_out_of_memory(e):
+                raise
+            if device == 'cuda':
+                import torch
+
+                torch.cuda.empty_cache()
+            smaller_plan = plan
+            while smaller_plan == plan and available > 1:
+                available //= 2
+                smaller_plan = plan_tiles(height, width, scale, element_size, available)
+            if smaller_plan == plan:
+                raise
+            logger.warning(f"⚠️ Super resolution ran out of memory with {tile_width}x{tile_height} tiles x{batch_size}, replanning")
+            plan = smaller_plan
+
+    SR_STATS.update({
+        'tile_width': tile_width,
+        'tile_height': tile_height,
+        'tile_batch_size': batch_size,
+        'tiles': -(-height // tile_height) * -(-width // tile_width),
+        'peak_memory_mb': round(peak_memory / (1024 * 1024), 1),
+        'device': device,
+        'runtime': sr_model.runtime,
+    })
+    logger.info(f"🧩 Super resolution tiles: {SR_STATS}")
+    return output
+
+
+def run_tiles(sr_model: SuperResolutionModel, image: np.ndarray, tile_height: int, tile_width: int, batch_size: int) -> Tuple[np.ndarray, int]:
+    """
+    Upscaled image and the peak memory in bytes while producing it: the
+    allocator's high-water mark on CUDA, on CPU the largest growth of the
+    process RSS over its size before the run, sampled after each batch.
+    """
+    height, width = image.shape[:2]
+    scale = sr_model.scale
+    device = sr_model.device
+    pad = SR_TILE_PAD
+    rows = -(-height // tile_height)
+    columns = -(-width // tile_width)
+    padded = np.pad(
+        image,
+        ((pad, rows * tile_height - height + pad), (pad, columns * tile_width - width + pad), (0, 0)),
+        mode='reflect',
+    )
+    output = np.empty((rows * tile_height * scale, columns * tile_width * scale, 3), dtype=np.uint8)
+    positions = [(row * tile_height, column * tile_width) for row in range(rows) for column in range(columns)]
+    if device == 'cuda':
+        import torch
+
+        torch.cuda.reset_peak_memory_stats()
+    else:
+        import psutil
+
+        process = psutil.Process()
+        start_rss = peak_rss = process.memory_info().rss
+
+    for start in range(0, len(positions), batch_size):
+        batch_positions = positions[start:start + batch_size]
+        tiles = np.stack([
+            padded[y:y + tile_height + 2 * pad, x:x + tile_width + 2 * pad]
+            for y, x in batch_positions
+        ])
+        upscaled = sr_model.run(tiles)
+        for (y, x), tile in zip(batch_positions, upscaled):
+            output[y * scale:(y + tile_height) * scale, x * scale:(x + tile_width) * scale] = tile[
+                pad * scale:(pad + tile_height) * scale, pad * scale:(pad + tile_width) * scale
+            ]
+        if device != 'cuda':
+            peak_rss = max(peak_rss, process.memory_info().rss)
+
+    if device == 'cuda':
+        peak_memory = torch.cuda.max_memory_allocated()
+    else:
+        peak_memory = peak_rss - start_rss
+    return output[:height * scale, :width * scale], peak_memory
+
+
+def get_super_resolution_stats() -> Dict[str, Any]:
+    """Tile plan and peak memory of the last super resolution run"""
+    return dict(SR_STATS)
+
+
+def upscale_face_regions(sr_model: SuperResolutionModel, frame_rgb: np.ndarray, scale_factor: int, faces: List[Face]) -> np.ndarray:
+    """
+    Resize the whole frame with bicubic interpolation and run Real-ESRGAN
+    only on the face regions, grown by --sr-face-padding, which are feathered
+    into the resized frame. Overlapping regions are upscaled together.
+    """
+    height, width = frame_rgb.shape[:2]
+    output = cv2.resize(frame_rgb, (width * scale_factor, height * scale_factor), interpolation=cv2.INTER_CUBIC)
+    regions = []
+    for face in faces:
+        bbox = getattr(face, 'bbox', None)
+        if bbox is None:
+            continue
+        region = get_face_region(bbox, modules.globals.sr_face_padding, frame_rgb.shape)
+        if region is not None:
+            regions.append(region)
+
+    for x0, y0, x1, y1 in [union for union, _ in merge_regions(regions)]:
+        region_width, region_height = (x1 - x0) * scale_factor, (y1 - y0) * scale_factor
+        upscaled = upscale_tiled(sr_model, frame_rgb[y0:y1, x0:x1])
+        if upscaled.shape[:2] != (region_height, region_width):
+            upscaled = cv2.resize(upscaled, (region_width, region_height), interpolation=cv2.INTER_LANCZOS4)
+        output_roi = output[y0 * scale_factor:y1 * scale_factor, x0 * scale_factor:x1 * scale_factor]
+        mask = get_feather_mask(region_width, region_height, 8)[:, :, np.newaxis]
+        blended = output_roi + mask * (upscaled.astype(np.float32) - output_roi)
+        output_roi[:] = blended.astype(np.uint8)
+    logger.info(f"👤 Face region super resolution on {len(regions)} face(s)")
+    return output
+
+
+def upscale_realesrgan(frame: Frame, scale_factor: int, mode: Optional[str], faces: Optional[List[Face]]) -> Optional[Frame]:
+    """Real-ESRGAN tier, on the whole frame or only around the faces; None when the model is not available"""
+    sr_model = get_super_resolution_model(scale_factor)
+    if sr_model is None:
+        logger.warning("⚠️ Super resolution model not available")
+        return None
     
-    return SUPER_RESOLUTION_MODEL
+    # Convert BGR to RGB for Real-ESRGAN
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if (mode or modules.globals.sr_mode) == 'face':
+        if faces is None:
+            faces = get_many_faces(frame) or []
+        with THREAD_SEMAPHORE:
+            enhanced_rgb = upscale_face_regions(sr_model, frame_rgb, scale_factor, faces)
+    else:
+        with THREAD_SEMAPHORE:
+            enhanced_rgb = upscale_tiled(sr_model, frame_rgb)
+    return cv2.cvtColor(enhanced_rgb, cv2.COLOR_RGB2BGR)
+
+
+def get_light_sr_net(scale_factor: int) -> Any:
+    """
+    FSRCNN network for the light tier on this thread, None if the model is missing
+
+    cv2.dnn nets are not thread safe, every worker thread gets its own.
+    """
+    model_name = LIGHT_SR_MODELS.get(scale_factor)
+    if model_name is None:
+        return None
+    with THREAD_LOCK:
+        model_path = LIGHT_SR_MODEL_PATHS.get(model_name)
+        if model_path is None:
+            if has_load_failed(('light_super_resolution', model_name)):
+                return None
+            model_path = find_model_file(model_name, min_size=1024)
+            if model_path is None:
+                record_load_failure(('light_super_resolution', model_name), 'model file not found')
+                return None
+            LIGHT_SR_MODEL_PATHS[model_name] = model_path
+    nets = LIGHT_SR_NETS.__dict__.setdefault('nets', {})
+    if model_name not in nets:
+        nets[model_name] = cv2.dnn.readNet(model_path)
+    return nets[model_name]
+
+
+def upscale_light(frame: Frame, scale_factor: int) -> Frame:
+    """
+    Light tier: FSRCNN on the luma channel, chroma resized bicubically
+
+    The same pre- and post-processing as OpenCV's dnn_superres module, which
+    is not part of the opencv-python wheel.
+    """
+    net = get_light_sr_net(scale_factor)
+    height, width = frame.shape[:2]
+    ycrcb = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb)
+    net.setInput(cv2.dnn.blobFromImage(ycrcb[:, :, 0].astype(np.float32) / 255.0))
+    ycrcb = cv2.resize(ycrcb, (width * scale_factor, height * scale_factor), interpolation=cv2.INTER_CUBIC)
+    upscaled_luma = net.forward()[0, 0]
+    ycrcb[:, :, 0] = np.clip(upscaled_luma * 255.0, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+
+
+def start_super_resolution_budget(seconds: Optional[float]) -> None:
+    """Start a job's super resolution time budget (None for unlimited) and reset the tier counts"""
+    global SR_DEADLINE
+
+    SR_DEADLINE = time.monotonic() + float(seconds) if seconds else None
+    SR_TIER_COUNTS.clear()
+
+
+def estimate_tier_seconds(tier: str, pixels: int, scale_factor: int) -> float:
+    """Expected seconds for a frame, from measured runs or the tier's prior"""
+    seconds_per_megapixel = SR_TIER_SECONDS.get((tier, scale_factor))
+    if seconds_per_megapixel is None:
+        seconds_per_megapixel = SR_TIER_PRIORS[tier]
+        if tier == 'realesrgan' and not is_cuda_available():
+            seconds_per_megapixel *= SR_CPU_SLOWDOWN
+    return seconds_per_megapixel * pixels / 1e6
 
 
-def enhance_resolution(frame: Frame, scale_factor: int = 4, max_size: int = 4096) -> Optional[Frame]:
+def choose_tier(pixels: int, scale_factor: int) -> str:
+    """
+    Best upscaler tier whose estimated time fits the rest of the budget
+
+    Tiers from best to fastest: Real-ESRGAN, FSRCNN through cv2.dnn, Lanczos.
+    Without a budget the best available tier is used.
+    """
+    remaining = None if SR_DEADLINE is None else SR_DEADLINE - time.monotonic()
+    for tier in SR_TIERS:
+        if tier == 'realesrgan' and not is_realesrgan_available(scale_factor):
+            continue
+        if tier == 'light' and get_light_sr_net(scale_factor) is None:
+            continue
+        if remaining is None or estimate_tier_seconds(tier, pixels, scale_factor) <= remaining:
+            return tier
+    return 'lanczos'
+
+
+def record_tier(tier: str, seconds: float, pixels: int = 0, scale_factor: int = 0) -> None:
+    """Count the tier used and refine its speed estimate"""
+    with THREAD_LOCK:
+        SR_TIER_COUNTS[tier] = SR_TIER_COUNTS.get(tier, 0) + 1
+        if pixels:
+            key = (tier, scale_factor)
+            seconds_per_megapixel = seconds * 1e6 / pixels
+            previous = SR_TIER_SECONDS.get(key)
+            SR_TIER_SECONDS[key] = seconds_per_megapixel if previous is None else 0.8 * previous + 0.2 * seconds_per_megapixel
+    SR_STATS['tier'] = tier
+
+
+def get_tier_counts() -> Dict[str, int]:
+    """Frames per upscaler tier since the budget was last started"""
+    with THREAD_LOCK:
+        return dict(SR_TIER_COUNTS)
+
+
+def is_cuda_available() -> bool:
+    try:
+        import torch
+
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def enhance_resolution(
+    frame: Frame,
+    scale_factor: int = 4,
+    max_size: int = 4096,
+    mode: Optional[str] = None,
+    faces: Optional[List[Face]] = None,
+) -> Optional[Frame]:
     """
     Enhance frame resolution using Real-ESRGAN
     
@@ -292,6 +853,8 @@ def enhance_resolution(frame: Frame, scale_factor: int = 4, max_size: int = 4096
         frame: Input frame (numpy array)
         scale_factor: Upscaling factor (2 or 4)
         max_size: Maximum output dimension to prevent memory issues (increased to 4096 for higher quality)
+        mode: "full" or "face" (Real-ESRGAN only around the faces), defaults to --sr-mode
+        faces: Faces for the face mode, detected on the frame when not given
     
     Returns:
         Enhanced frame or None if failed
@@ -301,12 +864,6 @@ def enhance_resolution(frame: Frame, scale_factor: int = 4, max_size: int = 4096
         return None
     
     try:
-        # Get super resolution model
-        sr_model = get_super_resolution_model(scale_factor)
-        if sr_model is None:
-            logger.warning("⚠️ Super resolution model not available, returning original frame")
-            return frame
-        
         # Check input frame dimensions
         height, width = frame.shape[:2]
         logger.info(f"📐 Input frame size: {width}x{height}")
@@ -326,28 +883,36 @@ def enhance_resolution(frame: Frame, scale_factor: int = 4, max_size: int = 4096
             # Use smaller scale factor
             if safe_scale >= 2.0:
                 scale_factor = 2
+                output_width = width * scale_factor
+                output_height = height * scale_factor
             else:
                 logger.info(f"⚠️ Using conservative upscaling due to size constraints")
                 # Use traditional upscaling for very large images
                 new_width = int(width * safe_scale)
                 new_height = int(height * safe_scale)
+                record_tier('lanczos', 0.0)
                 return cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
         
-        logger.info(f"🚀 Starting super resolution enhancement ({scale_factor}x)...")
+        tier = choose_tier(width * height, scale_factor)
+        logger.info(f"🚀 Starting super resolution enhancement ({scale_factor}x, {tier} tier)...")
         logger.info(f"📏 Output size will be: {output_width}x{output_height}")
-        
-        # Convert BGR to RGB for Real-ESRGAN
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Apply super resolution
-        with THREAD_SEMAPHORE:
-            enhanced_rgb, _ = sr_model.enhance(frame_rgb, outscale=scale_factor)
-        
-        # Convert back to BGR
-        enhanced_frame = cv2.cvtColor(enhanced_rgb, cv2.COLOR_RGB2BGR)
-        
+        start = time.perf_counter()
+        
+        enhanced_frame = None
+        if tier == 'realesrgan':
+            enhanced_frame = upscale_realesrgan(frame, scale_factor, mode, faces)
+            if enhanced_frame is None:
+                tier = 'light' if get_light_sr_net(scale_factor) is not None else 'lanczos'
+        if tier == 'light':
+            enhanced_frame = upscale_light(frame, scale_factor)
+        if tier == 'lanczos':
+            enhanced_frame = cv2.resize(frame, (output_width, output_height), interpolation=cv2.INTER_LANCZOS4)
+        if enhanced_frame.shape[:2] != (output_height, output_width):
+            enhanced_frame = cv2.resize(enhanced_frame, (output_width, output_height), interpolation=cv2.INTER_LANCZOS4)
+        
+        record_tier(tier, time.perf_counter() - start, width * height, scale_factor)
         final_height, final_width = enhanced_frame.shape[:2]
-        logger.info(f"✅ Super resolution completed: {final_width}x{final_height}")
+        logger.info(f"✅ Super resolution completed: {final_width}x{final_height} ({tier})")
         
         return enhanced_frame
         
@@ -371,6 +936,7 @@ def enhance_resolution(frame: Frame, scale_factor: int = 4, max_size: int = 4096
                 new_width = max_size
             
             enhanced_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+            record_tier('lanczos', 0.0)
             logger.info(f"✅ Fallback upscaling completed: {new_width}x{new_height}")
             return enhanced_frame
             
@@ -379,153 +945,78 @@ def enhance_resolution(frame: Frame, scale_factor: int = 4, max_size: int = 4096
             return frame
 
 
-def process_frame(frame: Frame, scale_factor: int = 4) -> Frame:
-    """
-    Process a single frame with super resolution
-    
-    Args:
-        frame: Input frame
-        scale_factor: Upscaling factor (2 or 4)
-    
-    Returns:
-        Enhanced frame
-    """
-    return enhance_resolution(frame, scale_factor)
+def pre_start() -> bool:
+    if modules.globals.sr_scale not in (2, 4):
+        update_status("Super resolution scale must be 2 or 4.", NAME)
+        return False
+    return True
 
 
-def process_frames(source_paths: List[str], temp_frame_paths: List[str], update_progress=None) -> None:
-    """
-    Process multiple frames with super resolution
-    
-    Args:
-        source_paths: List of source frame paths
-        temp_frame_paths: List of temporary frame paths for output
-        update_progress: Progress update callback
-    """
-    for index, (source_path, temp_frame_path) in enumerate(zip(source_paths, temp_frame_paths)):
-        # Read frame
-        source_frame = cv2.imread(source_path)
-        if source_frame is None:
-            continue
-        
-        # Process frame
-        result_frame = process_frame(source_frame)
-        
-        # Save result
-        cv2.imwrite(temp_frame_path, result_frame)
-        
-        # Update progress
-        if update_progress:
-            update_progress(index + 1)
+def process_frame(source_face: Any, temp_frame: Frame) -> Frame:
+    """Upscale a frame by --sr-scale, the frame processor entry point"""
+    result = enhance_resolution(temp_frame, modules.globals.sr_scale, max_size=modules.globals.sr_max_size)
+    return temp_frame if result is None else result
 
 
-def process_image(source_path: str, target_path: str, scale_factor: int = 4) -> bool:
-    """
-    Process a single image with super resolution
-    
-    Args:
-        source_path: Input image path
-        target_path: Output image path  
-        scale_factor: Upscaling factor (2 or 4)
-    
-    Returns:
-        True if successful, False otherwise
-    """
-    try:
-        # Read image
-        source_frame = cv2.imread(source_path)
-        if source_frame is None:
-            logger.error(f"❌ Failed to read image: {source_path}")
-            return False
-        
-        # Process with super resolution
-        result_frame = process_frame(source_frame, scale_factor)
-        
-        if result_frame is None:
-            logger.error("❌ Super resolution processing failed")
-            return False
-        
-        # Save result
-        success = cv2.imwrite(target_path, result_frame)
-        if success:
-            logger.info(f"✅ Super resolution image saved: {target_path}")
-        else:
-            logger.error(f"❌ Failed to save enhanced image: {target_path}")
-        
-        return success
-        
-    except Exception as e:
-        logger.error(f"❌ Image super resolution failed: {e}")
-        return False
+def process_frames(source_path: str, temp_frame_paths: List[str], progress: Any = None) -> None:
+    for temp_frame_path in temp_frame_paths:
+        temp_frame = cv2.imread(temp_frame_path)
+        if temp_frame is not None:
+            cv2.imwrite(temp_frame_path, process_frame(None, temp_frame))
+        if progress:
+            progress.update(1)
+
 
+def process_image(source_path: str, target_path: str, output_path: str) -> None:
+    target_frame = cv2.imread(target_path)
+    cv2.imwrite(output_path, process_frame(None, target_frame))
 
-def process_video(source_path: str, target_path: str, scale_factor: int = 4) -> bool:
+
+def process_video(source_path: str, temp_frame_paths: List[str]) -> None:
+    modules.processors.frame.core.process_video(None, temp_frame_paths, process_frames)
+
+
+def process_video_file(input_path: str, output_path: str, scale_factor: int, fps: float, max_size: int = 4096) -> Optional[Tuple[int, int]]:
     """
-    Process a video with super resolution
-    
-    Args:
-        source_path: Input video path
-        target_path: Output video path
-        scale_factor: Upscaling factor (2 or 4)
-    
+    Upscale a video file on the frame processor path
+
+    Frames are extracted with ffmpeg, upscaled by the parallel frame
+    processor loop (repeated frames are copied, not upscaled again) and
+    encoded with ffmpeg, keeping the input's audio when it has any.
+
     Returns:
-        True if successful, False otherwise
+        The (width, height) of the frames written to output_path, None when
+        it was not written. Frames over max_size take the Lanczos fallback,
+        so the size is read back rather than computed from scale_factor.
     """
-    # Note: Video super resolution is computationally intensive
-    # This is a simplified implementation
-    logger.warning("⚠️ Video super resolution is experimental and may be slow")
-    
+    previous_settings = (modules.globals.sr_scale, modules.globals.sr_max_size)
+    modules.globals.sr_scale, modules.globals.sr_max_size = scale_factor, max_size
+    # the serverless handlers never parse the CLI arguments that set these
+    modules.globals.video_encoder = modules.globals.video_encoder or 'libx264'
+    modules.globals.video_quality = modules.globals.video_quality if modules.globals.video_quality is not None else 18
     try:
-        # Open video
-        cap = cv2.VideoCapture(source_path)
-        if not cap.isOpened():
-            logger.error(f"❌ Failed to open video: {source_path}")
-            return False
-        
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        # Read first frame to get dimensions
-        ret, first_frame = cap.read()
-        if not ret:
-            logger.error("❌ Failed to read first frame")
-            cap.release()
-            return False
-        
-        # Reset video to beginning
-        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        
-        # Process first frame to get output dimensions
-        enhanced_first_frame = process_frame(first_frame, scale_factor)
-        output_height, output_width = enhanced_first_frame.shape[:2]
-        
-        # Setup video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(target_path, fourcc, fps, (output_width, output_height))
-        
-        # Process frames
-        frame_index = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process frame
-            enhanced_frame = process_frame(frame, scale_factor)
-            out.write(enhanced_frame)
-            
-            frame_index += 1
-            if frame_index % 10 == 0:  # Log progress every 10 frames
-                logger.info(f"📹 Processed {frame_index}/{frame_count} frames")
-        
-        # Cleanup
-        cap.release()
-        out.release()
-        
-        logger.info(f"✅ Super resolution video saved: {target_path}")
-        return True
-        
+        create_temp(input_path)
+        extract_frames(input_path)
+        temp_frame_paths = sorted(get_temp_frame_paths(input_path))
+        if not temp_frame_paths:
+            logger.error(f"❌ Failed to extract frames from: {input_path}")
+            return None
+        process_video(None, temp_frame_paths)
+        output_frame = cv2.imread(temp_frame_paths[0])
+        if output_frame is None:
+            logger.error(f"❌ Failed to read upscaled frame: {temp_frame_paths[0]}")
+            return None
+        create_video(input_path, fps)
+        restore_audio(input_path, output_path)
+        if not os.path.isfile(output_path):
+            logger.error(f"❌ Failed to encode super resolution video: {output_path}")
+            return None
+        output_height, output_width = output_frame.shape[:2]
+        logger.info(f"✅ Super resolution video saved: {output_path} ({len(temp_frame_paths)} frames, {output_width}x{output_height})")
+        return output_width, output_height
     except Exception as e:
         logger.error(f"❌ Video super resolution failed: {e}")
-        return False 
\ No newline at end of file
+        return None
+    finally:
+        modules.globals.sr_scale, modules.globals.sr_max_size = previous_settings
+        clean_temp(input_path)
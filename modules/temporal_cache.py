@@ -0,0 +1,123 @@
+"""
+Temporal reuse of processed face crops across video frames.
+
+In talking-head and static-camera footage the aligned crop of a face barely
+changes from one frame to the next. Faces are tracked by bounding-box
+overlap; when no pixel of a face's new aligned crop differs by more than
+--temporal-reuse-threshold from the crop its cached result was computed
+from (compared as 64x64 grey thumbnails), the cached swapped or enhanced
+crop is reused and only the paste-back is redone. A mean difference would
+miss mouth and eye motion and freeze lip-sync, the largest one does not.
+
+Tracks are kept per stage. Callers reset them per job with
+reset_temporal_cache(), and per pass when a stage runs twice over a video.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import modules.globals
+from modules.typing import Face, Frame
+
+THUMBNAIL_SIZE = 64
+TRACK_IOU = 0.5
+MAX_TRACKS = 32
+TRACKS: Dict[str, List[Dict[str, Any]]] = {}
+THREAD_LOCK = threading.Lock()
+
+
+def reset_temporal_cache(stage: Optional[str] = None) -> None:
+    """
+    Forget the tracks of a stage, or all of them. Call before processing a
+    new video, and with the stage before running it again over the frames.
+    """
+    with THREAD_LOCK:
+        if stage is None:
+            TRACKS.clear()
+        else:
+            TRACKS.pop(stage, None)
+
+
+def get_thumbnail(crop: Frame) -> np.ndarray:
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(
+        gray, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+
+
+def get_iou(box: np.ndarray, other_box: np.ndarray) -> float:
+    x0, y0 = np.maximum(box[:2], other_box[:2])
+    x1, y1 = np.minimum(box[2:], other_box[2:])
+    intersection = max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    union = (
+        (box[2] - box[0]) * (box[3] - box[1])
+        + (other_box[2] - other_box[0]) * (other_box[3] - other_box[1])
+        - intersection
+    )
+    return float(intersection / union) if union > 0 else 0.0
+
+
+def find_track(stage: str, bbox: np.ndarray, key: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    # called with THREAD_LOCK held
+    best_track = None
+    best_iou = TRACK_IOU
+    for track in TRACKS.get(stage, []):
+        if track["key"] != key:
+            continue
+        iou = get_iou(bbox, track["bbox"])
+        if iou >= best_iou:
+            best_track, best_iou = track, iou
+    return best_track
+
+
+def get_cached_crop(
+    stage: str, face: Face, crop: Frame, key: Optional[bytes] = None
+) -> Tuple[Optional[Frame], Optional[np.ndarray]]:
+    """
+    Cached result for the aligned crop of a tracked face, if it is still valid.
+
+    The crop is compared with the one the cached result was computed from, not
+    with the previous frame's, so slow drift still triggers a recompute, as
+    does reaching --temporal-reuse-max reuses in a row. Returns the cached
+    crop (or None) and the thumbnail to pass to cache_crop after a recompute.
+    """
+    if not modules.globals.temporal_reuse or getattr(face, "bbox", None) is None:
+        return None, None
+    thumbnail = get_thumbnail(crop)
+    with THREAD_LOCK:
+        track = find_track(stage, face.bbox, key)
+        if (
+            track is None
+            or track["output"].shape != crop.shape
+            or track["reuse_count"] >= modules.globals.temporal_reuse_max
+        ):
+            return None, thumbnail
+        if np.max(np.abs(thumbnail - track["thumbnail"])) > modules.globals.temporal_reuse_threshold:
+            return None, thumbnail
+        track["bbox"] = face.bbox
+        track["reuse_count"] += 1
+        return track["output"], thumbnail
+
+
+def cache_crop(
+    stage: str,
+    face: Face,
+    thumbnail: Optional[np.ndarray],
+    output: Frame,
+    key: Optional[bytes] = None,
+) -> None:
+    """Remember a freshly computed crop for the face's track."""
+    if thumbnail is None:
+        return
+    with THREAD_LOCK:
+        track = find_track(stage, face.bbox, key)
+        if track is None:
+            tracks = TRACKS.setdefault(stage, [])
+            if len(tracks) >= MAX_TRACKS:
+                tracks.pop(0)
+            track = {"key": key}
+            tracks.append(track)
+        track.update(bbox=face.bbox, thumbnail=thumbnail, output=output, reuse_count=0)
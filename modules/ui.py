@@ -678,6 +678,12 @@ def check_and_ignore_nsfw(target, destroy: Callable = None) -> bool:
     TODO: Consider to make blur the target.
     """
     from numpy import ndarray
+    from modules.capabilities import has_load_failed, is_available
+
+    # a filter that cannot run must not let the target through
+    if not is_available("nsfw") or has_load_failed(("nsfw",)):
+        update_status("NSFW filter is not available, processing ignored!")
+        return True
     from modules.predicter import predict_image, predict_video, predict_frame
 
     if type(target) is str:  # image/video file path
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+GFPGAN ONNX Export Tool
+Exports the GFPGAN network to ONNX for the onnx face enhancer backend,
+optionally quantizes it to int8, and checks both graphs for parity with
+the torch output on aligned 512x512 face crops
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.webp', '*.bmp')
+
+
+def load_gfpgan_network(model_path):
+    import torch
+    from gfpgan import GFPGANer
+
+    enhancer = GFPGANer(model_path=model_path, upscale=1, device=torch.device('cpu'))
+    return enhancer.gfpgan.eval()
+
+
+def get_export_module(network):
+    import torch
+
+    class GFPGANExport(torch.nn.Module):
+        """Restored image only, with the fixed noise buffers so the graph is deterministic"""
+
+        def __init__(self, network):
+            super().__init__()
+            self.network = network
+
+        def forward(self, x):
+            return self.network(x, return_rgb=False, randomize_noise=False, weight=0.5)[0]
+
+    return GFPGANExport(network).eval()
+
+
+def export_onnx(export_module, output_path, opset):
+    import torch
+
+    logger.info(f"🔄 Exporting GFPGAN to {output_path} (opset {opset})...")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    dummy_input = torch.randn(1, 3, 512, 512)
+    with torch.no_grad():
+        torch.onnx.export(
+            export_module,
+            dummy_input,
+            output_path,
+            input_names=['input'],
+            output_names=['output'],
+            dynamic_axes={'input': {0: 'batch'}, 'output': {0: 'batch'}},
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    logger.info(f"✅ Exported {output_path}")
+
+
+def quantize_onnx(input_path, output_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info(f"🔄 Quantizing {input_path} -> {output_path}")
+    quantize_dynamic(input_path, output_path, weight_type=QuantType.QUInt8)
+    logger.info(f"✅ Saved int8 graph to {output_path}")
+
+
+def load_samples(images_dir, count):
+    """Aligned face crops from images_dir, or smooth random images when none are given"""
+    samples = []
+    if images_dir:
+        image_paths = sorted(
+            path for pattern in IMAGE_EXTENSIONS for path in glob.glob(os.path.join(images_dir, pattern))
+        )
+        for image_path in image_paths[:count]:
+            image = cv2.imread(image_path)
+            if image is not None:
+                samples.append(cv2.resize(image, (512, 512), interpolation=cv2.INTER_LINEAR))
+    if not samples:
+        logger.warning("⚠️ No crops given, checking parity on random images")
+        rng = np.random.default_rng(0)
+        for _ in range(count):
+            noise = rng.integers(0, 256, (512, 512, 3), dtype=np.uint8)
+            samples.append(cv2.GaussianBlur(noise, (0, 0), 8))
+    return samples
+
+
+def run_torch(export_module, crops):
+    """Mirrors run_face_enhancer_torch in modules/processors/frame/face_enhancer.py"""
+    import torch
+    from basicsr.utils import img2tensor, tensor2img
+    from torchvision.transforms.functional import normalize
+
+    outputs = []
+    for crop in crops:
+        tensor = img2tensor(crop / 255.0, bgr2rgb=True, float32=True)
+        normalize(tensor, (0.5, 0.5, 0.5), (0.5, 0.5, 0.5), inplace=True)
+        with torch.no_grad():
+            output = export_module(tensor.unsqueeze(0))[0]
+        outputs.append(tensor2img(output, rgb2bgr=True, min_max=(-1, 1)).astype(np.uint8))
+    return outputs
+
+
+def run_onnx(model_path, crops):
+    """Mirrors run_face_enhancer_onnx in modules/processors/frame/face_enhancer.py"""
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    outputs = []
+    for crop in crops:
+        blob = crop[:, :, ::-1].transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 127.5 - 1.0
+        output = session.run(None, {input_name: blob})[0][0]
+        output = (np.clip(output, -1.0, 1.0) + 1.0) * 127.5
+        outputs.append(output.transpose(1, 2, 0)[:, :, ::-1].round().astype(np.uint8))
+    return outputs
+
+
+def compare_outputs(reference_outputs, candidate_outputs):
+    diffs = [
+        reference.astype(np.float32) - candidate.astype(np.float32)
+        for reference, candidate in zip(reference_outputs, candidate_outputs)
+    ]
+    mse = float(np.mean([np.mean(diff ** 2) for diff in diffs]))
+    return {
+        'mean_abs_error': float(np.mean([np.abs(diff).mean() for diff in diffs])),
+        'max_abs_error': float(np.max([np.abs(diff).max() for diff in diffs])),
+        'psnr_db': float('inf') if mse == 0 else float(10.0 * np.log10(255.0 ** 2 / mse)),
+    }
+
+
+def main():
+    models_dir = os.getenv('MODELS_DIR', '/runpod-volume/faceswap')
+    parser = argparse.ArgumentParser(description='Export GFPGAN to ONNX and check parity with torch')
+    parser.add_argument('--model', default=os.path.join(models_dir, 'GFPGANv1.4.pth'))
+    parser.add_argument('--output', default=os.path.join(models_dir, 'GFPGANv1.4.onnx'))
+    parser.add_argument('--int8', action='store_true', help='also write a dynamically quantized int8 graph')
+    parser.add_argument('--int8-output', default=os.path.join(models_dir, 'GFPGANv1.4_int8.onnx'))
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--check-only', action='store_true', help='skip the export, only check existing graphs')
+    parser.add_argument('--images', help='directory of aligned 512x512 face crops for the parity check')
+    parser.add_argument('--samples', type=int, default=8)
+    parser.add_argument('--max-mean-error', type=float, default=1.0, help='fp32 parity threshold in 0-255 units')
+    parser.add_argument('--report', help='write the parity report as json to this path')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.model):
+        logger.error(f"❌ GFPGAN weights not found: {args.model}")
+        return 1
+
+    export_module = get_export_module(load_gfpgan_network(args.model))
+    if not args.check_only:
+        export_onnx(export_module, args.output, args.opset)
+        if args.int8:
+            quantize_onnx(args.output, args.int8_output)
+
+    crops = load_samples(args.images, args.samples)
+    torch_outputs = run_torch(export_module, crops)
+
+    report = {}
+    for precision, model_path in (('fp32', args.output), ('int8', args.int8_output)):
+        if not os.path.isfile(model_path):
+            continue
+        report[precision] = compare_outputs(torch_outputs, run_onnx(model_path, crops))
+        logger.info(f"📊 {precision} parity against torch: {report[precision]}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"📄 Report written to {args.report}")
+
+    if 'fp32' not in report:
+        logger.error(f"❌ No fp32 graph to check at {args.output}")
+        return 1
+    if report['fp32']['mean_abs_error'] > args.max_mean_error:
+        logger.error(f"❌ fp32 graph differs from torch by more than {args.max_mean_error}")
+        return 1
+    logger.info("✅ fp32 graph matches the torch output")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Real-ESRGAN ONNX Export Tool
+Exports the Real-ESRGAN x2/x4 networks to ONNX for the onnx super
+resolution backend and checks the graphs for parity with the torch output
+on padded tiles
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 128
+
+
+def load_realesrgan_network(model_path, scale):
+    import torch
+    from basicsr.archs.rrdbnet_arch import RRDBNet
+
+    network = RRDBNet(num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=scale)
+    weights = torch.load(model_path, map_location='cpu')
+    network.load_state_dict(weights['params_ema'] if 'params_ema' in weights else weights['params'], strict=True)
+    return network.eval()
+
+
+def export_onnx(network, output_path, opset):
+    import torch
+
+    logger.info(f"🔄 Exporting Real-ESRGAN to {output_path} (opset {opset})...")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    dummy_input = torch.rand(1, 3, TILE_SIZE, TILE_SIZE)
+    with torch.no_grad():
+        torch.onnx.export(
+            network,
+            dummy_input,
+            output_path,
+            input_names=['input'],
+            output_names=['output'],
+            dynamic_axes={
+                'input': {0: 'batch', 2: 'height', 3: 'width'},
+                'output': {0: 'batch', 2: 'height', 3: 'width'},
+            },
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    logger.info(f"✅ Exported {output_path}")
+
+
+def load_samples(count):
+    """Smooth random RGB tiles, the size super resolution plans for CPU memory"""
+    rng = np.random.default_rng(0)
+    samples = []
+    for _ in range(count):
+        noise = rng.integers(0, 256, (TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8)
+        samples.append(cv2.GaussianBlur(noise, (0, 0), 4))
+    return np.stack(samples)
+
+
+def run_torch(network, tiles):
+    """Mirrors get_torch_runner in modules/processors/frame/super_resolution.py"""
+    import torch
+
+    tensor = torch.from_numpy(tiles).permute(0, 3, 1, 2).float() / 255.0
+    with torch.no_grad():
+        upscaled = network(tensor)
+    return upscaled.clamp_(0, 1).mul_(255.0).round_().byte().permute(0, 2, 3, 1).numpy()
+
+
+def run_onnx(model_path, tiles):
+    """Mirrors load_onnx_model in modules/processors/frame/super_resolution.py"""
+    import onnxruntime
+
+    session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    blob = tiles.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    upscaled = session.run(None, {session.get_inputs()[0].name: blob})[0]
+    upscaled = (np.clip(upscaled, 0.0, 1.0) * 255.0).round().astype(np.uint8)
+    return upscaled.transpose(0, 2, 3, 1)
+
+
+def compare_outputs(reference_outputs, candidate_outputs):
+    diff = reference_outputs.astype(np.float32) - candidate_outputs.astype(np.float32)
+    mse = float(np.mean(diff ** 2))
+    return {
+        'mean_abs_error': float(np.abs(diff).mean()),
+        'max_abs_error': float(np.abs(diff).max()),
+        'psnr_db': float('inf') if mse == 0 else float(10.0 * np.log10(255.0 ** 2 / mse)),
+    }
+
+
+def main():
+    models_dir = os.getenv('MODELS_DIR', '/runpod-volume/faceswap')
+    parser = argparse.ArgumentParser(description='Export Real-ESRGAN to ONNX and check parity with torch')
+    parser.add_argument('--scales', type=int, nargs='+', default=[4, 2], choices=[2, 4])
+    parser.add_argument('--models-dir', default=models_dir, help='directory of the .pth weights, the graphs are written next to them')
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--check-only', action='store_true', help='skip the export, only check existing graphs')
+    parser.add_argument('--samples', type=int, default=4)
+    parser.add_argument('--max-mean-error', type=float, default=1.0, help='parity threshold in 0-255 units')
+    parser.add_argument('--report', help='write the parity report as json to this path')
+    args = parser.parse_args()
+
+    tiles = load_samples(args.samples)
+    report = {}
+    for scale in args.scales:
+        model_path = os.path.join(args.models_dir, f'RealESRGAN_x{scale}plus.pth')
+        output_path = os.path.join(args.models_dir, f'RealESRGAN_x{scale}plus.onnx')
+        if not os.path.isfile(model_path):
+            logger.error(f"❌ Real-ESRGAN weights not found: {model_path}")
+            return 1
+
+        network = load_realesrgan_network(model_path, scale)
+        if not args.check_only:
+            export_onnx(network, output_path, args.opset)
+        if not os.path.isfile(output_path):
+            logger.error(f"❌ No graph to check at {output_path}")
+            return 1
+        report[f'x{scale}'] = compare_outputs(run_torch(network, tiles), run_onnx(output_path, tiles))
+        logger.info(f"📊 x{scale} parity against torch: {report[f'x{scale}']}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"📄 Report written to {args.report}")
+
+    failed = [name for name, result in report.items() if result['mean_abs_error'] > args.max_mean_error]
+    if failed:
+        logger.error(f"❌ {', '.join(failed)} graph differs from torch by more than {args.max_mean_error}")
+        return 1
+    logger.info("✅ Graphs match the torch output")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
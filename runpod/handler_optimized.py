@@ -97,6 +97,7 @@ logger = logging.getLogger(__name__)
 sys.path.append('/app')
 import modules.globals
 import modules.core
+from modules.blending import blend_face_regions
 
 def verify_models():
     """验证Volume中的模型"""
@@ -206,9 +207,8 @@ def process_image_swap_simple(source_url, target_url, use_face_enhancer=True):
                 if enhanced_frame is not None:
                     # 适度混合，避免过度增强
                     face_enhancer_blend = 0.6
-                    result_frame = cv2.addWeighted(
-                        result_frame, 1 - face_enhancer_blend,
-                        enhanced_frame, face_enhancer_blend, 0
+                    result_frame = blend_face_regions(
+                        result_frame, enhanced_frame, [target_face], face_enhancer_blend
                     )
                     logger.info("✅ Face enhancement applied")
                 else:
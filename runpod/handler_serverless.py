@@ -405,8 +405,10 @@ try:
     logger.info(f"📁 Setting models directory to: {models_dir}")
     
     from modules.face_analyser import get_one_face, get_many_faces
-    from modules.processors.frame.face_swapper import swap_face, process_frame
+    from modules.processors.frame.face_swapper import swap_face, swap_faces_batch, get_source_latent, process_frame
     import modules.globals
+    from modules.output_resolution import OUTPUT_QUALITY_TIERS
+    from modules.image_pipeline import IMAGE_PRESETS, get_image_preset, run_image_pipeline
     
     # 更新模型目录
     modules.globals.models_dir = models_dir
@@ -430,7 +432,7 @@ try:
     except ImportError as e:
         logger.warning(f"⚠️ Super resolution module not available: {e}")
         SR_AVAILABLE = False
-        def enhance_resolution(frame, scale_factor=4, max_size=2048):
+        def enhance_resolution(frame, scale_factor=4, max_size=2048, mode=None, faces=None):
             return frame
     
     logger.info("✅ Core modules imported successfully")
@@ -469,8 +471,21 @@ except ImportError as e:
     def swap_face(source_face, target_face, frame):
         logger.error("❌ swap_face called but modules not available")
         return frame
-    def enhance_resolution(frame, scale_factor=4, max_size=2048):
+    def swap_faces_batch(face_pairs, frame):
+        logger.error("❌ swap_faces_batch called but modules not available")
         return frame
+    def get_source_latent(source_face):
+        return source_face
+    def enhance_resolution(frame, scale_factor=4, max_size=2048, mode=None, faces=None):
+        return frame
+    # the job options are validated against these, no preset or tier is known
+    OUTPUT_QUALITY_TIERS = {}
+    IMAGE_PRESETS = {}
+    def get_image_preset(name=None, overrides=None):
+        return {}
+    def run_image_pipeline(target_frame, face_pairs, preset=None):
+        logger.error("❌ run_image_pipeline called but modules not available")
+        return target_frame, {}
     SR_AVAILABLE = False
     MODULES_AVAILABLE = False
 
@@ -633,8 +648,8 @@ def download_video_from_url(url):
         logger.error(f"❌ Failed to download video: {e}")
         return None
 
-def process_image_swap_from_urls(source_url, target_url):
-    """Process face swap with image URLs - Enhanced with multi-round optimization"""
+def process_image_swap_from_urls(source_url, target_url, preset=None):
+    """Process face swap with image URLs, through the stages of the image preset"""
     try:
         # Download images from URLs
         logger.info("🔄 Starting image downloads...")
@@ -667,204 +682,28 @@ def process_image_swap_from_urls(source_url, target_url):
         
         logger.info("✅ Target face detected successfully")
         
-        # Configure enhancement settings
-        logger.info("⚙️ Configuring face enhancement settings...")
-        modules.globals.use_face_enhancer = True  # Enable face enhancer
-        modules.globals.mouth_mask = True         # Enable mouth mask for better blending
-        modules.globals.color_correction = True  # Enable color correction
-        
-        # Multi-round iterative face swap for higher quality
-        logger.info("🚀 Starting multi-round iterative face swap...")
-        result_frame = target_frame.copy()
-        
-        # Round 1: Initial face swap
-        logger.info("🔄 Round 1: Initial face swap...")
-        result_frame = swap_face(source_face, target_face, result_frame)
-        logger.info("✅ Round 1 completed")
-        
-        # Round 2: Refinement with detected result face
-        logger.info("🔄 Round 2: Refinement pass...")
-        refined_target_face = get_one_face(result_frame)
-        if refined_target_face is not None:
-            # Use a slightly more conservative approach for refinement
-            temp_result = swap_face(source_face, refined_target_face, result_frame)
-            # Quality check: compare face detection confidence
-            if refined_target_face.det_score > 0.5:  # If detection is confident
-                result_frame = temp_result
-                logger.info("✅ Round 2 refinement applied")
-            else:
-                logger.info("⚠️ Round 2 skipped due to low detection confidence")
-        else:
-            logger.warning("⚠️ Round 2 skipped - no face detected in result")
-        
-        # Round 3: Final precision pass
-        logger.info("🔄 Round 3: Final precision pass...")
-        final_target_face = get_one_face(result_frame)
-        if final_target_face is not None and final_target_face.det_score > 0.6:
-            # Very conservative final pass
-            temp_result = swap_face(source_face, final_target_face, result_frame)
-            # Check if the final result maintains face detectability
-            check_face = get_one_face(temp_result)
-            if check_face is not None and check_face.det_score > 0.5:
-                result_frame = temp_result
-                logger.info("✅ Round 3 precision pass applied")
-            else:
-                logger.info("⚠️ Round 3 skipped - would degrade quality")
-        else:
-            logger.info("⚠️ Round 3 skipped - insufficient face detection confidence")
-        
-        # Apply face enhancement if available
-        try:
-            logger.info("🎨 Applying advanced face enhancement...")
-            
-            # Try to import and use face enhancer
-            from modules.processors.frame.face_enhancer import enhance_face, get_face_enhancer
-            
-            # Multiple enhancement passes for better quality
-            for enhancement_round in range(2):  # Two rounds of enhancement
-                logger.info(f"✨ Enhancement round {enhancement_round + 1}/2...")
-                
-                enhanced_frame = enhance_face(result_frame)
-                if enhanced_frame is not None:
-                    if enhancement_round == 0:
-                        # First round: blend conservatively
-                        result_frame = cv2.addWeighted(result_frame, 0.4, enhanced_frame, 0.6, 0)
-                        logger.info("✅ First enhancement pass blended")
-                    else:
-                        # Second round: use full enhancement
-                        result_frame = enhanced_frame
-                        logger.info("✅ Final enhancement applied")
-                else:
-                    logger.warning(f"⚠️ Enhancement round {enhancement_round + 1} failed")
-                    break
-                    
-        except ImportError:
-            logger.warning("⚠️ Face enhancer module not available")
-        except Exception as e:
-            logger.warning(f"⚠️ Face enhancement failed: {e}")
-        
-        # Advanced post-processing for better realism
-        logger.info("🎭 Applying advanced post-processing...")
-        try:
-            # Ensure face region boundaries are smooth
-            final_face = get_one_face(result_frame)
-            if final_face is not None:
-                # Apply subtle smoothing to face edges
-                result_frame = apply_edge_smoothing(result_frame, final_face)
-                logger.info("✅ Edge smoothing applied")
-        except Exception as e:
-            logger.warning(f"⚠️ Post-processing warning: {e}")
-        
-        # Apply AI Super Resolution for ultra-high quality output
-        logger.info("🔍 Applying AI Super Resolution for ultra-high quality...")
-        try:
-            if SR_AVAILABLE:
-                # Determine optimal scale factor based on input size - OPTIMIZED FOR MAXIMUM QUALITY
-                height, width = result_frame.shape[:2]
-                
-                # Use 4x for most images to get maximum quality, 2x for large images, skip only for very large
-                if max(width, height) < 768:  # Increased threshold for 4x (was 512)
-                    scale_factor = 4
-                    max_output_size = 4096  # Higher max size for 4x
-                    logger.info(f"📐 Using 4x super resolution for maximum quality (input: {width}x{height})")
-                elif max(width, height) < 1536:  # Increased threshold for 2x (was 1024)
-                    scale_factor = 2 
-                    max_output_size = 3072  # Standard max size for 2x
-                    logger.info(f"📐 Using 2x super resolution (input: {width}x{height})")
-                else:
-                    scale_factor = 1  # Skip only for very large images (≥1536px)
-                    max_output_size = 3072
-                    logger.info(f"📐 Skipping super resolution (input already very large: {width}x{height})")
-                
-                if scale_factor > 1:
-                    enhanced_frame = enhance_resolution(result_frame, scale_factor, max_size=max_output_size)
-                    if enhanced_frame is not None:
-                        result_frame = enhanced_frame
-                        final_height, final_width = result_frame.shape[:2]
-                        logger.info(f"✅ AI Super Resolution completed: {final_width}x{final_height}")
-                    else:
-                        logger.warning("⚠️ Super resolution failed, using original")
-            else:
-                logger.info("⚠️ Super resolution not available, using traditional upscaling...")
-                # Fallback to traditional high-quality upscaling
-                height, width = result_frame.shape[:2]
-                if max(width, height) < 768:
-                    scale = min(2.0, 1536 / max(width, height))  # Target at least 1536px
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    result_frame = cv2.resize(result_frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                    logger.info(f"✅ Traditional upscaling: {new_width}x{new_height}")
-                    
-        except Exception as e:
-            logger.warning(f"⚠️ Super resolution failed: {e}")
+        # Swap, enhancement, edge smoothing and output rendering, as far as the preset asks
+        logger.info("🚀 Starting staged face swap...")
+        result_frame, pipeline_report = run_image_pipeline(target_frame, [(source_face, target_face)], preset)
         
         # Convert back to PIL with ultra-high quality settings
         logger.info("📸 Converting result to ultra-high quality image...")
         result_image = Image.fromarray(cv2.cvtColor(result_frame, cv2.COLOR_BGR2RGB))
         
-        # Resize if the image is too small (upscale for better quality)
-        width, height = result_image.size
-        if width < 512 or height < 512:
-            # Calculate new size maintaining aspect ratio
-            scale_factor = max(512 / width, 512 / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            
-            logger.info(f"🔍 Upscaling image from {width}x{height} to {new_width}x{new_height}")
-            result_image = result_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
         # Encode to base64 with high quality JPEG
         buffer = BytesIO()
         result_image.save(buffer, format='JPEG', quality=95, optimize=True)
         result_data = base64.b64encode(buffer.getvalue()).decode()
         
-        logger.info("✅ Ultra-high quality multi-round result image encoded successfully")
-        return {"result": result_data}
+        logger.info("✅ Result image encoded successfully")
+        return {"result": result_data, "pipeline": pipeline_report}
         
     except Exception as e:
         logger.error(f"❌ Face swap processing failed: {e}")
         return {"error": f"Processing failed: {str(e)}"}
 
-def apply_edge_smoothing(frame, face):
-    """Apply subtle edge smoothing to face boundaries"""
-    try:
-        # Create a face mask
-        mask = np.zeros(frame.shape[:2], dtype=np.uint8)
-        landmarks = face.landmark_2d_106
-        
-        if landmarks is not None:
-            # Convert landmarks to int32
-            landmarks = landmarks.astype(np.int32)
-            
-            # Create face contour
-            hull = cv2.convexHull(landmarks)
-            cv2.fillPoly(mask, [hull], 255)
-            
-            # Apply Gaussian blur to the mask for smooth edges
-            mask_blurred = cv2.GaussianBlur(mask, (5, 5), 2)
-            
-            # Normalize mask
-            mask_normalized = mask_blurred.astype(np.float32) / 255.0
-            mask_normalized = np.stack([mask_normalized] * 3, axis=2)
-            
-            # Apply very subtle smoothing
-            frame_float = frame.astype(np.float32)
-            blurred_frame = cv2.GaussianBlur(frame, (3, 3), 1)
-            blurred_frame_float = blurred_frame.astype(np.float32)
-            
-            # Blend only at edges (use a very small smoothing factor)
-            edge_factor = 0.1  # Very subtle
-            smoothed = frame_float * (1 - mask_normalized * edge_factor) + blurred_frame_float * (mask_normalized * edge_factor)
-            
-            return smoothed.astype(np.uint8)
-            
-    except Exception as e:
-        logger.warning(f"Edge smoothing failed: {e}")
-        
-    return frame
-
-def process_image_swap_from_base64(source_image_data, target_image_data):
-    """Process face swap with base64 data (backward compatibility) - Enhanced with multi-round optimization"""
+def process_image_swap_from_base64(source_image_data, target_image_data, preset=None):
+    """Process face swap with base64 data (backward compatibility), through the stages of the image preset"""
     try:
         # Decode base64 images
         source_image = Image.open(BytesIO(base64.b64decode(source_image_data)))
@@ -887,159 +726,21 @@ def process_image_swap_from_base64(source_image_data, target_image_data):
         if target_face is None:
             return {"error": "No face detected in target image"}
         
-        # Configure enhancement settings
-        logger.info("⚙️ Configuring face enhancement settings...")
-        modules.globals.use_face_enhancer = True  # Enable face enhancer
-        modules.globals.mouth_mask = True         # Enable mouth mask for better blending
-        modules.globals.color_correction = True  # Enable color correction
-        
-        # Multi-round iterative face swap for higher quality
-        logger.info("🚀 Starting multi-round iterative face swap...")
-        result_frame = target_frame.copy()
-        
-        # Round 1: Initial face swap
-        logger.info("🔄 Round 1: Initial face swap...")
-        result_frame = swap_face(source_face, target_face, result_frame)
-        logger.info("✅ Round 1 completed")
-        
-        # Round 2: Refinement with detected result face
-        logger.info("🔄 Round 2: Refinement pass...")
-        refined_target_face = get_one_face(result_frame)
-        if refined_target_face is not None:
-            # Use a slightly more conservative approach for refinement
-            temp_result = swap_face(source_face, refined_target_face, result_frame)
-            # Quality check: compare face detection confidence
-            if refined_target_face.det_score > 0.5:  # If detection is confident
-                result_frame = temp_result
-                logger.info("✅ Round 2 refinement applied")
-            else:
-                logger.info("⚠️ Round 2 skipped due to low detection confidence")
-        else:
-            logger.warning("⚠️ Round 2 skipped - no face detected in result")
-        
-        # Round 3: Final precision pass
-        logger.info("🔄 Round 3: Final precision pass...")
-        final_target_face = get_one_face(result_frame)
-        if final_target_face is not None and final_target_face.det_score > 0.6:
-            # Very conservative final pass
-            temp_result = swap_face(source_face, final_target_face, result_frame)
-            # Check if the final result maintains face detectability
-            check_face = get_one_face(temp_result)
-            if check_face is not None and check_face.det_score > 0.5:
-                result_frame = temp_result
-                logger.info("✅ Round 3 precision pass applied")
-            else:
-                logger.info("⚠️ Round 3 skipped - would degrade quality")
-        else:
-            logger.info("⚠️ Round 3 skipped - insufficient face detection confidence")
-        
-        # Apply face enhancement if available
-        try:
-            logger.info("🎨 Applying advanced face enhancement...")
-            
-            # Try to import and use face enhancer
-            from modules.processors.frame.face_enhancer import enhance_face, get_face_enhancer
-            
-            # Multiple enhancement passes for better quality
-            for enhancement_round in range(2):  # Two rounds of enhancement
-                logger.info(f"✨ Enhancement round {enhancement_round + 1}/2...")
-                
-                enhanced_frame = enhance_face(result_frame)
-                if enhanced_frame is not None:
-                    if enhancement_round == 0:
-                        # First round: blend conservatively
-                        result_frame = cv2.addWeighted(result_frame, 0.4, enhanced_frame, 0.6, 0)
-                        logger.info("✅ First enhancement pass blended")
-                    else:
-                        # Second round: use full enhancement
-                        result_frame = enhanced_frame
-                        logger.info("✅ Final enhancement applied")
-                else:
-                    logger.warning(f"⚠️ Enhancement round {enhancement_round + 1} failed")
-                    break
-                    
-        except ImportError:
-            logger.warning("⚠️ Face enhancer module not available")
-        except Exception as e:
-            logger.warning(f"⚠️ Face enhancement failed: {e}")
-        
-        # Advanced post-processing for better realism
-        logger.info("🎭 Applying advanced post-processing...")
-        try:
-            # Ensure face region boundaries are smooth
-            final_face = get_one_face(result_frame)
-            if final_face is not None:
-                # Apply subtle smoothing to face edges
-                result_frame = apply_edge_smoothing(result_frame, final_face)
-                logger.info("✅ Edge smoothing applied")
-        except Exception as e:
-            logger.warning(f"⚠️ Post-processing warning: {e}")
-        
-        # Apply AI Super Resolution for ultra-high quality output
-        logger.info("🔍 Applying AI Super Resolution for ultra-high quality...")
-        try:
-            if SR_AVAILABLE:
-                # Determine optimal scale factor based on input size - OPTIMIZED FOR MAXIMUM QUALITY
-                height, width = result_frame.shape[:2]
-                
-                # Use 4x for most images to get maximum quality, 2x for large images, skip only for very large
-                if max(width, height) < 768:  # Increased threshold for 4x (was 512)
-                    scale_factor = 4
-                    max_output_size = 4096  # Higher max size for 4x
-                    logger.info(f"📐 Using 4x super resolution for maximum quality (input: {width}x{height})")
-                elif max(width, height) < 1536:  # Increased threshold for 2x (was 1024)
-                    scale_factor = 2 
-                    max_output_size = 3072  # Standard max size for 2x
-                    logger.info(f"📐 Using 2x super resolution (input: {width}x{height})")
-                else:
-                    scale_factor = 1  # Skip only for very large images (≥1536px)
-                    max_output_size = 3072
-                    logger.info(f"📐 Skipping super resolution (input already very large: {width}x{height})")
-                
-                if scale_factor > 1:
-                    enhanced_frame = enhance_resolution(result_frame, scale_factor, max_size=max_output_size)
-                    if enhanced_frame is not None:
-                        result_frame = enhanced_frame
-                        final_height, final_width = result_frame.shape[:2]
-                        logger.info(f"✅ AI Super Resolution completed: {final_width}x{final_height}")
-                    else:
-                        logger.warning("⚠️ Super resolution failed, using original")
-            else:
-                logger.info("⚠️ Super resolution not available, using traditional upscaling...")
-                # Fallback to traditional high-quality upscaling
-                height, width = result_frame.shape[:2]
-                if max(width, height) < 768:
-                    scale = min(2.0, 1536 / max(width, height))  # Target at least 1536px
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    result_frame = cv2.resize(result_frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                    logger.info(f"✅ Traditional upscaling: {new_width}x{new_height}")
-                    
-        except Exception as e:
-            logger.warning(f"⚠️ Super resolution failed: {e}")
+        # Swap, enhancement, edge smoothing and output rendering, as far as the preset asks
+        logger.info("🚀 Starting staged face swap...")
+        result_frame, pipeline_report = run_image_pipeline(target_frame, [(source_face, target_face)], preset)
         
         # Convert back to PIL with ultra-high quality settings
         logger.info("📸 Converting result to ultra-high quality image...")
         result_image = Image.fromarray(cv2.cvtColor(result_frame, cv2.COLOR_BGR2RGB))
         
-        # Resize if the image is too small (upscale for better quality)
-        width, height = result_image.size
-        if width < 512 or height < 512:
-            # Calculate new size maintaining aspect ratio
-            scale_factor = max(512 / width, 512 / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            
-            logger.info(f"🔍 Upscaling image from {width}x{height} to {new_width}x{new_height}")
-            result_image = result_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
         # Encode to base64 with high quality JPEG
         buffer = BytesIO()
         result_image.save(buffer, format='JPEG', quality=95, optimize=True)
         result_data = base64.b64encode(buffer.getvalue()).decode()
         
-        logger.info("✅ Ultra-high quality multi-round result image encoded successfully")
-        return {"result": result_data}
+        logger.info("✅ Result image encoded successfully")
+        return {"result": result_data, "pipeline": pipeline_report}
         
     except Exception as e:
         logger.error(f"❌ Base64 image processing failed: {e}")
@@ -1171,11 +872,21 @@ def process_video_swap(source_image_data, target_video_data):
         
         logger.info("🚀 Starting frame-by-frame processing...")
         
+        # Repeated frames reuse the output of the frame they repeat
+        from modules.frame_dedup import FrameDeduplicator
+        swap_dedup = FrameDeduplicator()
+        
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
             
+            duplicate_output = swap_dedup.lookup(frame)
+            if duplicate_output is not None:
+                out.write(duplicate_output)
+                processed_frames += 1
+                continue
+            
             try:
                 # Detect face in current frame
                 target_face = get_one_face(frame)
@@ -1187,20 +898,23 @@ def process_video_swap(source_image_data, target_video_data):
                     # Apply enhancement if available
                     try:
                         from modules.processors.frame.face_enhancer import enhance_face
-                        enhanced_frame = enhance_face(swapped_frame)
+                        from modules.blending import blend_face_regions
+                        enhanced_frame = enhance_face(swapped_frame, [target_face])
                         if enhanced_frame is not None:
                             # Conservative blending for video stability
-                            swapped_frame = cv2.addWeighted(swapped_frame, 0.7, enhanced_frame, 0.3, 0)
+                            swapped_frame = blend_face_regions(swapped_frame, enhanced_frame, [target_face], 0.3)
                     except ImportError:
                         pass
                     except Exception as e:
                         logger.warning(f"⚠️ Frame enhancement failed: {e}")
                     
                     out.write(swapped_frame)
+                    swap_dedup.store(swapped_frame)
                     successful_swaps += 1
                 else:
                     # No face detected, write original frame
                     out.write(frame)
+                    swap_dedup.store(frame)
                 
                 processed_frames += 1
                 
@@ -1219,7 +933,7 @@ def process_video_swap(source_image_data, target_video_data):
         cap.release()
         out.release()
         
-        logger.info(f"✅ Video processing completed: {processed_frames} frames processed, {successful_swaps} successful face swaps")
+        logger.info(f"✅ Video processing completed: {processed_frames} frames processed, {successful_swaps} successful face swaps, {swap_dedup.duplicates} repeated frames reused")
         
         # Enhanced video processing with face enhancement and super resolution
         logger.info("🎨 Applying face enhancement and super resolution to video...")
@@ -1233,30 +947,44 @@ def process_video_swap(source_image_data, target_video_data):
             enhanced_temp = tempfile.NamedTemporaryFile(delete=False, suffix='_enhanced.mp4')
             enhanced_temp.close()
             
-            # Re-process video with face enhancement
+            # Re-process video with face enhancement, the first pass's
+            # enhanced crops were made from other frames and must not be reused
+            from modules.temporal_cache import reset_temporal_cache
+            reset_temporal_cache("enhance")
             cap_enhance = cv2.VideoCapture(temp_output_path)
             fourcc_enhance = cv2.VideoWriter_fourcc(*'mp4v')
             out_enhance = cv2.VideoWriter(enhanced_temp.name, fourcc_enhance, fps, (frame_width, frame_height))
             
             enhance_frame_count = 0
+            enhance_dedup = FrameDeduplicator()
             while True:
                 ret, frame = cap_enhance.read()
                 if not ret:
                     break
                 
+                duplicate_output = enhance_dedup.lookup(frame)
+                if duplicate_output is not None:
+                    out_enhance.write(duplicate_output)
+                    enhance_frame_count += 1
+                    continue
+                
                 try:
                     # Apply face enhancement if available
                     from modules.processors.frame.face_enhancer import enhance_face
-                    enhanced_frame = enhance_face(frame)
+                    from modules.blending import blend_face_regions
+                    # the detected faces bound both the enhancement and the blend
+                    enhance_faces = get_many_faces(frame) or []
+                    enhanced_frame = enhance_face(frame, enhance_faces)
                     if enhanced_frame is not None:
                         # Conservative blending for video stability
-                        frame = cv2.addWeighted(frame, 0.3, enhanced_frame, 0.7, 0)
+                        frame = blend_face_regions(frame, enhanced_frame, enhance_faces, 0.7)
                 except ImportError:
                     pass
                 except Exception as e:
                     logger.warning(f"⚠️ Frame enhancement failed for frame {enhance_frame_count}: {e}")
                 
                 out_enhance.write(frame)
+                enhance_dedup.store(frame)
                 enhance_frame_count += 1
                 
                 if enhance_frame_count % 60 == 0:
@@ -1294,39 +1022,15 @@ def process_video_swap(source_image_data, target_video_data):
                     logger.info(f"📐 Skipping super resolution (already good size: {frame_width}x{frame_height})")
                 
                 if scale_factor > 1:
-                    cap_sr = cv2.VideoCapture(enhanced_video_path)
-                    fourcc_sr = cv2.VideoWriter_fourcc(*'mp4v')
-                    out_sr = cv2.VideoWriter(sr_temp.name, fourcc_sr, fps, (new_width, new_height))
-                    
-                    sr_frame_count = 0
-                    while True:
-                        ret, frame = cap_sr.read()
-                        if not ret:
-                            break
-                        
-                        try:
-                            enhanced_frame = enhance_resolution(frame, scale_factor, max_size=2048)
-                            if enhanced_frame is not None:
-                                out_sr.write(enhanced_frame)
-                            else:
-                                upscaled_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                                out_sr.write(upscaled_frame)
-                        except Exception as e:
-                            logger.warning(f"⚠️ SR failed for frame {sr_frame_count}: {e}")
-                            upscaled_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                            out_sr.write(upscaled_frame)
-                        
-                        sr_frame_count += 1
-                        if sr_frame_count % 30 == 0:
-                            logger.info(f"🔍 Super resolution progress: {sr_frame_count} frames")
-                    
-                    cap_sr.release()
-                    out_sr.release()
-                    
-                    enhanced_video_path = sr_temp.name
-                    frame_width = new_width
-                    frame_height = new_height
-                    logger.info(f"✅ Super resolution completed: {sr_frame_count} frames enhanced to {new_width}x{new_height}")
+                    # Parallel frame processor path, encoded by ffmpeg
+                    from modules.processors.frame.super_resolution import process_video_file
+                    output_size = process_video_file(enhanced_video_path, sr_temp.name, scale_factor, fps, max_size=2048)
+                    if output_size:
+                        enhanced_video_path = sr_temp.name
+                        frame_width, frame_height = output_size
+                        logger.info(f"✅ Super resolution completed: video enhanced to {frame_width}x{frame_height}")
+                    else:
+                        logger.warning("⚠️ Super resolution failed, using face-enhanced video")
                     
             except Exception as e:
                 logger.warning(f"⚠️ Super resolution failed: {e}, using face-enhanced video")
@@ -1429,60 +1133,22 @@ def process_video_swap(source_image_data, target_video_data):
                     logger.info(f"📐 Skipping super resolution for video (already large: {frame_width}x{frame_height})")
                 
                 if scale_factor > 1:
-                    # Re-process the output video with super resolution
-                    cap_enhanced = cv2.VideoCapture(final_video_path)
-                    
-                    # Calculate new dimensions
-                    new_width = frame_width * scale_factor
-                    new_height = frame_height * scale_factor
-                    
-                    # Setup enhanced video writer
-                    fourcc_enhanced = cv2.VideoWriter_fourcc(*'mp4v')
-                    out_enhanced = cv2.VideoWriter(enhanced_video.name, fourcc_enhanced, fps, (new_width, new_height))
-                    
-                    enhanced_frames = 0
+                    # Re-process the output video with super resolution, keeping its audio
+                    from modules.processors.frame.super_resolution import process_video_file
                     logger.info("🚀 Starting video super resolution enhancement...")
                     
-                    while True:
-                        ret, frame = cap_enhanced.read()
-                        if not ret:
-                            break
+                    output_size = process_video_file(final_video_path, enhanced_video.name, scale_factor, fps, max_size=2048)
+                    if output_size:
+                        logger.info(f"✅ Video super resolution completed: enhanced to {output_size[0]}x{output_size[1]}")
                         
-                        try:
-                            # Apply super resolution to frame
-                            enhanced_frame = enhance_resolution(frame, scale_factor, max_size=2048)
-                            if enhanced_frame is not None:
-                                out_enhanced.write(enhanced_frame)
-                            else:
-                                # Fallback to traditional upscaling
-                                upscaled_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                                out_enhanced.write(upscaled_frame)
-                            
-                            enhanced_frames += 1
-                            
-                            # Log progress every 60 frames (roughly every 2 seconds at 30fps)
-                            if enhanced_frames % 60 == 0:
-                                logger.info(f"📹 Super resolution progress: {enhanced_frames} frames enhanced")
-                                
-                        except Exception as e:
-                            logger.warning(f"⚠️ Error enhancing frame {enhanced_frames}: {e}")
-                            # Write original frame on error
-                            upscaled_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                            out_enhanced.write(upscaled_frame)
-                            enhanced_frames += 1
-                    
-                    cap_enhanced.release()
-                    out_enhanced.release()
-                    
-                    logger.info(f"✅ Video super resolution completed: {enhanced_frames} frames enhanced to {new_width}x{new_height}")
-                    
-                    # Use enhanced video as final result
-                    with open(enhanced_video.name, 'rb') as f:
-                        video_data = f.read()
-                    
-                    # Update video info
-                    frame_width = new_width
-                    frame_height = new_height
+                        # Use enhanced video as final result
+                        with open(enhanced_video.name, 'rb') as f:
+                            video_data = f.read()
+                        
+                        # Update video info
+                        frame_width, frame_height = output_size
+                    else:
+                        logger.warning("⚠️ Video super resolution failed, using original quality")
                     
                     # Cleanup enhanced video file
                     try:
@@ -1677,8 +1343,8 @@ def extract_face_image(image_frame, face):
         logger.warning(f"⚠️ Failed to extract face image: {e}")
         return None
 
-def process_multi_image_swap_from_urls(target_url, face_mappings):
-    """Process multi-person face swap with individual face mappings - Enhanced with multi-round processing"""
+def process_multi_image_swap_from_urls(target_url, face_mappings, preset=None):
+    """Process multi-person face swap with individual face mappings, through the stages of the image preset"""
     try:
         logger.info("🚀 Starting enhanced multi-person face swap processing...")
         logger.info(f"📋 Target image URL: {target_url}")
@@ -1764,229 +1430,19 @@ def process_multi_image_swap_from_urls(target_url, face_mappings):
         if not face_mapping_pairs:
             return {"error": "No valid face mappings could be processed"}
         
-        logger.info(f"🎯 Processing {len(face_mapping_pairs)} face swap(s) with multi-round enhancement...")
-        
-        # Configure enhancement settings for high quality
-        modules.globals.use_face_enhancer = True
-        modules.globals.mouth_mask = True
-        modules.globals.color_correction = True
-        
-        # Multi-round iterative processing for superior quality
-        result_frame = target_frame.copy()
-        
-        # Store original target faces for quality comparison
-        original_target_faces = target_faces.copy()
-        
-        # Round 1: Initial face swaps for all faces
-        logger.info("🔄 Round 1: Initial multi-face swap...")
-        for i, mapping in enumerate(face_mapping_pairs):
-            logger.info(f"   Processing face {i+1}/{len(face_mapping_pairs)} ({mapping['face_id']})...")
-            
-            try:
-                # Perform initial face swap
-                temp_result = swap_face(
-                    mapping['source_face'], 
-                    mapping['target_face'], 
-                    result_frame
-                )
-                result_frame = temp_result
-                logger.info(f"   ✅ Face {i+1} initial swap completed")
-                
-            except Exception as e:
-                logger.warning(f"   ⚠️ Face {i+1} initial swap failed: {e}")
-                continue
-        
-        logger.info("✅ Round 1 completed - all initial face swaps done")
-        
-        # Round 2: Refinement pass - re-detect faces and refine
-        logger.info("🔄 Round 2: Refinement pass...")
-        current_faces = get_many_faces(result_frame)
-        
-        if current_faces and len(current_faces) >= len(face_mapping_pairs):
-            refinement_count = 0
-            for i, mapping in enumerate(face_mapping_pairs):
-                try:
-                    # Use current detected face for refinement
-                    if i < len(current_faces):
-                        current_face = current_faces[i]
-                        
-                        # Quality check before refinement
-                        if current_face.det_score > 0.5:
-                            temp_result = swap_face(
-                                mapping['source_face'],
-                                current_face,
-                                result_frame
-                            )
-                            
-                            # Verify refinement improves quality
-                            refined_faces = get_many_faces(temp_result)
-                            if refined_faces and len(refined_faces) >= len(face_mapping_pairs):
-                                result_frame = temp_result
-                                refinement_count += 1
-                                logger.info(f"   ✅ Face {i+1} refinement applied")
-                            else:
-                                logger.info(f"   ⚠️ Face {i+1} refinement skipped - would degrade detection")
-                        else:
-                            logger.info(f"   ⚠️ Face {i+1} refinement skipped - low confidence")
-                    
-                except Exception as e:
-                    logger.warning(f"   ⚠️ Face {i+1} refinement failed: {e}")
-                    continue
-            
-            logger.info(f"✅ Round 2 completed - {refinement_count}/{len(face_mapping_pairs)} faces refined")
-        else:
-            logger.warning("⚠️ Round 2 skipped - insufficient face detection quality")
-        
-        # Round 3: Final precision pass - high-quality enhancement
-        logger.info("🔄 Round 3: Final precision pass...")
-        final_faces = get_many_faces(result_frame)
-        
-        if final_faces and len(final_faces) >= len(face_mapping_pairs):
-            precision_count = 0
-            for i, mapping in enumerate(face_mapping_pairs):
-                try:
-                    if i < len(final_faces):
-                        final_face = final_faces[i]
-                        
-                        # Very high quality threshold for final pass
-                        if final_face.det_score > 0.6:
-                            temp_result = swap_face(
-                                mapping['source_face'],
-                                final_face,
-                                result_frame
-                            )
-                            
-                            # Conservative quality check
-                            check_faces = get_many_faces(temp_result)
-                            if (check_faces and len(check_faces) >= len(face_mapping_pairs) and
-                                all(f.det_score > 0.5 for f in check_faces[:len(face_mapping_pairs)])):
-                                result_frame = temp_result
-                                precision_count += 1
-                                logger.info(f"   ✅ Face {i+1} precision pass applied")
-                            else:
-                                logger.info(f"   ⚠️ Face {i+1} precision pass skipped - would degrade quality")
-                        else:
-                            logger.info(f"   ⚠️ Face {i+1} precision pass skipped - insufficient confidence")
-                    
-                except Exception as e:
-                    logger.warning(f"   ⚠️ Face {i+1} precision pass failed: {e}")
-                    continue
-            
-            logger.info(f"✅ Round 3 completed - {precision_count}/{len(face_mapping_pairs)} faces precision-enhanced")
-        else:
-            logger.warning("⚠️ Round 3 skipped - insufficient face detection quality")
-        
-        # Advanced face enhancement - multiple passes for superior quality
-        try:
-            logger.info("🎨 Applying advanced multi-pass face enhancement...")
-            
-            from modules.processors.frame.face_enhancer import enhance_face
-            
-            # Enhancement Pass 1: Conservative blend
-            logger.info("✨ Enhancement pass 1: Conservative blending...")
-            enhanced_frame_1 = enhance_face(result_frame)
-            if enhanced_frame_1 is not None:
-                # Conservative blend (30% original + 70% enhanced)
-                result_frame = cv2.addWeighted(result_frame, 0.3, enhanced_frame_1, 0.7, 0)
-                logger.info("✅ Enhancement pass 1 completed")
-            
-            # Enhancement Pass 2: Standard enhancement
-            logger.info("✨ Enhancement pass 2: Standard enhancement...")
-            enhanced_frame_2 = enhance_face(result_frame)
-            if enhanced_frame_2 is not None:
-                # Balanced blend (40% original + 60% enhanced)
-                result_frame = cv2.addWeighted(result_frame, 0.4, enhanced_frame_2, 0.6, 0)
-                logger.info("✅ Enhancement pass 2 completed")
-                
-            # Enhancement Pass 3: Final refinement
-            logger.info("✨ Enhancement pass 3: Final refinement...")
-            enhanced_frame_3 = enhance_face(result_frame)
-            if enhanced_frame_3 is not None:
-                # Final enhancement application
-                result_frame = enhanced_frame_3
-                logger.info("✅ Enhancement pass 3 completed")
-                
-        except ImportError:
-            logger.warning("⚠️ Face enhancer module not available")
-        except Exception as e:
-            logger.warning(f"⚠️ Advanced face enhancement failed: {e}")
+        logger.info(f"🎯 Processing {len(face_mapping_pairs)} face swap(s)...")
         
-        # Advanced post-processing for all faces
-        logger.info("🎭 Applying advanced post-processing to all faces...")
-        try:
-            current_faces = get_many_faces(result_frame)
-            if current_faces:
-                edge_smoothing_count = 0
-                for face in current_faces:
-                    try:
-                        result_frame = apply_edge_smoothing(result_frame, face)
-                        edge_smoothing_count += 1
-                    except Exception as e:
-                        logger.warning(f"⚠️ Edge smoothing failed for one face: {e}")
-                        continue
-                
-                logger.info(f"✅ Edge smoothing applied to {edge_smoothing_count} faces")
-        except Exception as e:
-            logger.warning(f"⚠️ Post-processing warning: {e}")
-        
-        # Apply AI Super Resolution for ultra-high quality multi-person output
-        logger.info("🔍 Applying AI Super Resolution for ultra-high quality multi-person output...")
-        try:
-            if SR_AVAILABLE:
-                # Determine optimal scale factor based on input size - OPTIMIZED FOR MAXIMUM QUALITY
-                height, width = result_frame.shape[:2]
-                
-                # Use 4x for most multi-person images too, but with slightly more conservative thresholds
-                if max(width, height) < 640:  # 4x for smaller multi-person images  
-                    scale_factor = 4
-                    max_output_size = 5120  # Even higher max for multi-person 4x
-                    logger.info(f"📐 Using 4x super resolution for maximum quality (multi-person input: {width}x{height})")
-                elif max(width, height) < 1280:  # 2x for medium multi-person images
-                    scale_factor = 2 
-                    max_output_size = 4096  # Higher max for multi-person 2x
-                    logger.info(f"📐 Using 2x super resolution (multi-person input: {width}x{height})")
-                else:
-                    scale_factor = 1  # Skip only for very large multi-person images (≥1280px)
-                    max_output_size = 4096
-                    logger.info(f"📐 Skipping super resolution (multi-person input already very large: {width}x{height})")
-                
-                if scale_factor > 1:
-                    enhanced_frame = enhance_resolution(result_frame, scale_factor, max_size=max_output_size)
-                    if enhanced_frame is not None:
-                        result_frame = enhanced_frame
-                        final_height, final_width = result_frame.shape[:2]
-                        logger.info(f"✅ AI Super Resolution completed: {final_width}x{final_height}")
-                    else:
-                        logger.warning("⚠️ Super resolution failed, using original")
-            else:
-                logger.info("⚠️ Super resolution not available, using traditional upscaling...")
-                # Fallback to traditional high-quality upscaling
-                height, width = result_frame.shape[:2]
-                if max(width, height) < 768:
-                    scale = min(2.0, 1536 / max(width, height))  # Target at least 1536px
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    result_frame = cv2.resize(result_frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                    logger.info(f"✅ Traditional upscaling: {new_width}x{new_height}")
-                    
-        except Exception as e:
-            logger.warning(f"⚠️ Super resolution failed: {e}")
+        # All mapped faces go through every stage together
+        result_frame, pipeline_report = run_image_pipeline(
+            target_frame,
+            [(mapping['source_face'], mapping['target_face']) for mapping in face_mapping_pairs],
+            preset,
+        )
         
         # Convert back to PIL with ultra-high quality settings
         logger.info("📸 Converting result to ultra-high quality multi-person image...")
         result_image = Image.fromarray(cv2.cvtColor(result_frame, cv2.COLOR_BGR2RGB))
         
-        # Resize if the image is too small (upscale for better quality)
-        width, height = result_image.size
-        if width < 512 or height < 512:
-            # Calculate new size maintaining aspect ratio
-            scale_factor = max(512 / width, 512 / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            
-            logger.info(f"🔍 Upscaling multi-person image from {width}x{height} to {new_width}x{new_height}")
-            result_image = result_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
         # Encode to base64 with ultra-high quality JPEG
         buffer = BytesIO()
         result_image.save(buffer, format='JPEG', quality=95, optimize=True)
@@ -1997,8 +1453,9 @@ def process_multi_image_swap_from_urls(target_url, face_mappings):
             "result": result_data,
             "total_faces_mapped": len(face_mapping_pairs),
             "processing_type": "multi-person",
-            "quality_level": "ultra-high",
-            "enhanced": True
+            "quality_level": pipeline_report["preset"],
+            "enhanced": pipeline_report["enhance_passes"] > 0,
+            "pipeline": pipeline_report
         }
         
     except Exception as e:
@@ -2095,6 +1552,9 @@ def process_video_with_multi_faces(video_path, source_faces):
         frame_count = 0
         processed_frames = 0
         
+        # Project every source face to its swapper latent once for the whole video
+        source_latents = [get_source_latent(source_face) for source_face in source_faces.values()]
+        
         while True:
             ret, frame = cap.read()
             if not ret:
@@ -2115,17 +1575,18 @@ def process_video_with_multi_faces(video_path, source_faces):
                 
                 target_faces.sort(key=get_face_position)
                 
-                # Apply face swaps
-                result_frame = frame.copy()
-                
-                for i, (face_key, source_face) in enumerate(source_faces.items()):
-                    if i < len(target_faces):
-                        target_face = target_faces[i]
-                        try:
-                            result_frame = swap_face(source_face, target_face, result_frame)
-                            logger.debug(f"✅ Frame {frame_count}: Swapped {face_key} (face {i})")
-                        except Exception as e:
-                            logger.warning(f"⚠️ Frame {frame_count}: Failed to swap {face_key}: {e}")
+                # Apply all face swaps of this frame in one batched swapper run
+                face_pairs = [
+                    (source_latent, target_faces[i])
+                    for i, source_latent in enumerate(source_latents)
+                    if i < len(target_faces)
+                ]
+                try:
+                    result_frame = swap_faces_batch(face_pairs, frame)
+                    logger.debug(f"✅ Frame {frame_count}: Swapped {len(face_pairs)} face(s)")
+                except Exception as e:
+                    logger.warning(f"⚠️ Frame {frame_count}: Failed to swap faces: {e}")
+                    result_frame = frame
                 
                 out.write(result_frame)
                 processed_frames += 1
@@ -2155,7 +1616,10 @@ def process_video_with_multi_faces(video_path, source_faces):
             enhanced_temp = tempfile.NamedTemporaryFile(delete=False, suffix='_enhanced.mp4')
             enhanced_temp.close()
             
-            # Re-process video with face enhancement
+            # Re-process video with face enhancement, the first pass's
+            # enhanced crops were made from other frames and must not be reused
+            from modules.temporal_cache import reset_temporal_cache
+            reset_temporal_cache("enhance")
             cap_enhance = cv2.VideoCapture(temp_output_path)
             fourcc_enhance = cv2.VideoWriter_fourcc(*'mp4v')
             out_enhance = cv2.VideoWriter(enhanced_temp.name, fourcc_enhance, fps, (width, height))
@@ -2168,14 +1632,17 @@ def process_video_with_multi_faces(video_path, source_faces):
                 
                 try:
                     # Apply face enhancement if available
-                        from modules.processors.frame.face_enhancer import enhance_face
-                    enhanced_frame = enhance_face(frame)
-                        if enhanced_frame is not None:
+                    from modules.processors.frame.face_enhancer import enhance_face
+                    from modules.blending import blend_face_regions
+                    # the detected faces bound both the enhancement and the blend
+                    enhance_faces = get_many_faces(frame) or []
+                    enhanced_frame = enhance_face(frame, enhance_faces)
+                    if enhanced_frame is not None:
                         # Conservative blending for video stability
-                        frame = cv2.addWeighted(frame, 0.3, enhanced_frame, 0.7, 0)
-                    except ImportError:
-                        pass
-                    except Exception as e:
+                        frame = blend_face_regions(frame, enhanced_frame, enhance_faces, 0.7)
+                except ImportError:
+                    pass
+                except Exception as e:
                     logger.warning(f"⚠️ Frame enhancement failed for frame {enhance_frame_count}: {e}")
                 
                 out_enhance.write(frame)
@@ -2216,39 +1683,15 @@ def process_video_with_multi_faces(video_path, source_faces):
                     logger.info(f"📐 Skipping super resolution (already good size: {width}x{height})")
                 
                 if scale_factor > 1:
-                    cap_sr = cv2.VideoCapture(enhanced_video_path)
-                    fourcc_sr = cv2.VideoWriter_fourcc(*'mp4v')
-                    out_sr = cv2.VideoWriter(sr_temp.name, fourcc_sr, fps, (new_width, new_height))
-                    
-                    sr_frame_count = 0
-                    while True:
-                        ret, frame = cap_sr.read()
-                        if not ret:
-                            break
-                        
-                        try:
-                            enhanced_frame = enhance_resolution(frame, scale_factor, max_size=2048)
-                            if enhanced_frame is not None:
-                                out_sr.write(enhanced_frame)
-                            else:
-                                upscaled_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                                out_sr.write(upscaled_frame)
-            except Exception as e:
-                            logger.warning(f"⚠️ SR failed for frame {sr_frame_count}: {e}")
-                            upscaled_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-                            out_sr.write(upscaled_frame)
-                        
-                        sr_frame_count += 1
-                        if sr_frame_count % 30 == 0:
-                            logger.info(f"🔍 Multi-person super resolution progress: {sr_frame_count} frames")
-                    
-                    cap_sr.release()
-                    out_sr.release()
-                    
-                    enhanced_video_path = sr_temp.name
-                    width = new_width
-                    height = new_height
-                    logger.info(f"✅ Multi-person super resolution completed: {sr_frame_count} frames enhanced to {new_width}x{new_height}")
+                    # Parallel frame processor path, encoded by ffmpeg
+                    from modules.processors.frame.super_resolution import process_video_file
+                    output_size = process_video_file(enhanced_video_path, sr_temp.name, scale_factor, fps, max_size=2048)
+                    if output_size:
+                        enhanced_video_path = sr_temp.name
+                        width, height = output_size
+                        logger.info(f"✅ Multi-person super resolution completed: video enhanced to {width}x{height}")
+                    else:
+                        logger.warning("⚠️ Super resolution failed, using face-enhanced video")
                     
             except Exception as e:
                 logger.warning(f"⚠️ Super resolution failed: {e}, using face-enhanced video")
@@ -2366,6 +1809,20 @@ def process_video_with_multi_faces(video_path, source_faces):
 
 
 # ====== Main RunPod Handler Function ======
+def apply_ort_options(ort_options):
+    """Apply ONNX Runtime session settings from the job input"""
+    try:
+        from modules.onnx_session import configure_session_options
+        import modules.face_analyser
+        import modules.processors.frame.face_swapper
+
+        if configure_session_options(ort_options):
+            logger.info(f"🔧 ONNX Runtime session options changed: {ort_options}")
+            modules.face_analyser.FACE_ANALYSER = None
+            modules.processors.frame.face_swapper.FACE_SWAPPER_POOL = None
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to apply ONNX Runtime session options: {e}")
+
 def handler(job):
     """
     RunPod Serverless Handler - Optimized for Volume Models
@@ -2396,6 +1853,68 @@ def handler(job):
         
         logger.info(f"🎯 Processing job type: {process_type}")
         
+        # Optional ONNX Runtime session tuning, sessions are rebuilt when it changes
+        ort_options = job_input.get("ort_options")
+        if ort_options:
+            apply_ort_options(ort_options)
+        
+        # Face enhancer backend: "torch" (GFPGANer) or "onnx" (exported graph, fp32/int8)
+        enhancer_backend = job_input.get("enhancer_backend", os.environ.get('FACE_ENHANCER_BACKEND', 'torch'))
+        if enhancer_backend not in ("torch", "onnx"):
+            return {"error": f"Unknown enhancer_backend: {enhancer_backend}, expected one of ['torch', 'onnx']"}
+        enhancer_precision = job_input.get("enhancer_precision", os.environ.get('FACE_ENHANCER_PRECISION', 'fp32'))
+        if enhancer_precision not in ("fp32", "int8"):
+            return {"error": f"Unknown enhancer_precision: {enhancer_precision}, expected one of ['fp32', 'int8']"}
+        # "full" lets GFPGAN enhance every face of the frame, "crop" only the swapped faces
+        enhancer_mode = job_input.get("enhancer_mode", os.environ.get('FACE_ENHANCER_MODE', 'full'))
+        if enhancer_mode not in ("full", "crop"):
+            return {"error": f"Unknown enhancer_mode: {enhancer_mode}, expected one of ['full', 'crop']"}
+        modules.globals.face_enhancer_backend = enhancer_backend
+        modules.globals.face_enhancer_precision = enhancer_precision
+        modules.globals.face_enhancer_mode = enhancer_mode
+        logger.info(f"🎨 Face enhancer backend: {modules.globals.face_enhancer_backend} ({modules.globals.face_enhancer_precision}, {modules.globals.face_enhancer_mode} mode)")
+        
+        # Temporal reuse of swapped/enhanced crops, only when the job or TEMPORAL_REUSE asks for it
+        try:
+            from modules.temporal_cache import reset_temporal_cache
+            modules.globals.temporal_reuse = bool(job_input.get("temporal_reuse", os.environ.get('TEMPORAL_REUSE', 'false').lower() == 'true'))
+            reset_temporal_cache()
+        except ImportError:
+            pass
+        
+        # Super resolution on the whole frame ("full") or only around the faces ("face")
+        modules.globals.sr_mode = job_input.get("sr_mode", os.environ.get('SR_MODE', 'full'))
+        
+        # Stages of image jobs: preset "fast", "balanced" or "max", each of its
+        # settings (swap_passes, enhance_passes, edge_smoothing,
+        # super_resolution, output_quality) can be overridden by the job
+        preset_name = job_input.get("preset", os.environ.get('IMAGE_PRESET', 'max'))
+        if preset_name not in IMAGE_PRESETS:
+            return {"error": f"Unknown preset: {preset_name}, expected one of {list(IMAGE_PRESETS)}"}
+        output_quality = job_input.get("output_quality")
+        if output_quality is not None and output_quality not in OUTPUT_QUALITY_TIERS:
+            return {"error": f"Unknown output_quality: {output_quality}, expected one of {list(OUTPUT_QUALITY_TIERS)}"}
+        image_preset = get_image_preset(preset_name, {key: job_input.get(key) for key in IMAGE_PRESETS[preset_name]})
+        modules.globals.output_quality = image_preset["output_quality"]
+        logger.info(f"🧩 Image preset: {image_preset}")
+        
+        # Whole-frame deduplication of video frames, only when the job or FRAME_DEDUP asks for it
+        modules.globals.frame_dedup = bool(job_input.get("frame_dedup", os.environ.get('FRAME_DEDUP', 'false').lower() == 'true'))
+        
+        # Optional per-job face enhancement time budget in seconds
+        try:
+            from modules.processors.frame.face_enhancer import start_enhancement_budget
+            start_enhancement_budget(job_input.get("enhancer_time_budget"))
+        except ImportError:
+            pass
+        
+        # Optional per-job super resolution time budget in seconds, picks the upscaler tier
+        try:
+            from modules.processors.frame.super_resolution import start_super_resolution_budget
+            start_super_resolution_budget(job_input.get("sr_time_budget"))
+        except ImportError:
+            pass
+        
         # Process different types of requests
         if process_type == "single_image":
             # Single image face swap with URLs - support both field name formats
@@ -2409,8 +1928,8 @@ def handler(job):
             logger.info(f"   Source: {source_url}")
             logger.info(f"   Target: {target_url}")
             
-            result = process_image_swap_from_urls(source_url, target_url)
-            return result
+            result = process_image_swap_from_urls(source_url, target_url, image_preset)
+            return add_job_reports(result)
             
         elif process_type == "single_image_base64":
             # Single image face swap with base64 data (backward compatibility)
@@ -2421,8 +1940,8 @@ def handler(job):
                 return {"error": "Missing source_image/source_file or target_image/target_file for single_image_base64 processing"}
             
             logger.info(f"📸 Processing single image face swap (base64)")
-            result = process_image_swap_from_base64(source_data, target_data)
-            return result
+            result = process_image_swap_from_base64(source_data, target_data, image_preset)
+            return add_job_reports(result)
             
         elif process_type == "video":
             # Video face swap - support both field name formats
@@ -2434,7 +1953,7 @@ def handler(job):
             
             logger.info(f"🎬 Processing video face swap")
             result = process_video_swap(source_data, target_data)
-            return result
+            return add_job_reports(result)
             
         elif process_type in ["detect_faces", "detect-faces"]:
             # Face detection - support both field name formats and both underscore/hyphen formats
@@ -2461,8 +1980,8 @@ def handler(job):
             logger.info(f"   Target: {target_url}")
             logger.info(f"   Face mappings: {len(face_mappings)} faces")
             
-            result = process_multi_image_swap_from_urls(target_url, face_mappings)
-            return result
+            result = process_multi_image_swap_from_urls(target_url, face_mappings, image_preset)
+            return add_job_reports(result)
             
         elif process_type == "multi_video":
             # Multi-person video face swap - support both field name formats
@@ -2477,7 +1996,7 @@ def handler(job):
             logger.info(f"   Face mappings: {len(face_mappings)} faces")
             
             result = process_multi_video_swap_from_urls(target_url, face_mappings)
-            return result
+            return add_job_reports(result)
             
         else:
             error_msg = f"Unknown or unsupported process_type: {process_type}"
@@ -2489,6 +2008,44 @@ def handler(job):
         logger.error(f"❌ {error_msg}")
         logger.error(f"❌ Exception details: {e}")
         return {"error": error_msg}
+    finally:
+        log_enhancement_decisions()
+
+def add_job_reports(result):
+    return add_enhancement_report(add_super_resolution_report(result))
+
+def add_enhancement_report(result):
+    """Report how often the face enhancement policy enhanced or skipped a face, by reason"""
+    try:
+        from modules.processors.frame.face_enhancer import get_enhancement_decisions
+        decisions = get_enhancement_decisions()
+        if isinstance(result, dict) and "error" not in result and decisions:
+            result["enhancement_decisions"] = decisions
+    except ImportError:
+        pass
+    return result
+
+def add_super_resolution_report(result):
+    """Report which upscaler tiers the job used (realesrgan, light or lanczos)"""
+    try:
+        from modules.processors.frame.super_resolution import get_tier_counts
+        tier_counts = get_tier_counts()
+        if isinstance(result, dict) and "error" not in result and tier_counts:
+            result["sr_tier"] = max(tier_counts, key=tier_counts.get)
+            result["sr_tier_counts"] = tier_counts
+    except ImportError:
+        pass
+    return result
+
+def log_enhancement_decisions():
+    """Log how the face enhancement policy decided during the job, for tuning"""
+    try:
+        from modules.processors.frame.face_enhancer import get_enhancement_decisions
+        decisions = get_enhancement_decisions()
+        if decisions:
+            logger.info(f"📊 Face enhancement decisions: {decisions}")
+    except ImportError:
+        pass
 
 # ====== RunPod Serverless Startup ======
 if __name__ == "__main__":
@@ -2496,5 +2053,11 @@ if __name__ == "__main__":
     logger.info(f"📁 Models directory: {os.getenv('MODELS_DIR', '/runpod-volume/faceswap')}")
     logger.info(f"🎯 Models ready: {models_ready}")
     
+    # Record once which optional subsystems this worker can run, jobs skip
+    # the missing ones instead of trying to load them for every frame
+    if MODULES_AVAILABLE:
+        from modules.capabilities import probe_capabilities
+        probe_capabilities()
+    
     # Start RunPod serverless
     runpod.serverless.start({"handler": handler}) 
\ No newline at end of file
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Inswapper Quantization Tool
+Quantizes the fp32 inswapper model to int8 for CPU workers and reports the
+accuracy delta against the fp32 reference on a calibration set of images
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import onnx
+import onnxruntime
+from onnx import numpy_helper
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.webp', '*.bmp')
+QUANT_TYPES = {'int8': QuantType.QInt8, 'uint8': QuantType.QUInt8}
+
+
+def load_emap(model_path):
+    """Source embedding projection, insightface keeps it as the last initializer"""
+    model = onnx.load(model_path)
+    return model.graph.initializer[-1]
+
+
+def restore_emap(model_path, emap):
+    """
+    Put the embedding projection back as the last initializer.
+
+    The quantizer drops or reorders initializers the graph does not use, but
+    insightface's INSwapper reads the projection from initializer[-1].
+    """
+    model = onnx.load(model_path)
+    initializers = [init for init in model.graph.initializer if init.name != emap.name]
+    del model.graph.initializer[:]
+    model.graph.initializer.extend(initializers)
+    model.graph.initializer.append(emap)
+    onnx.save(model, model_path)
+
+
+def build_calibration_samples(calibration_dir, emap, insightface_root, max_samples):
+    """Aligned target crops paired with the latent of another face from the set"""
+    from insightface.app import FaceAnalysis
+    from insightface.utils import face_align
+
+    analyser = FaceAnalysis(name='buffalo_l', root=insightface_root, providers=['CPUExecutionProvider'])
+    analyser.prepare(ctx_id=0, det_size=(640, 640))
+
+    image_paths = sorted(
+        path for pattern in IMAGE_EXTENSIONS for path in glob.glob(os.path.join(calibration_dir, pattern))
+    )
+    logger.info(f"🔍 Detecting faces in {len(image_paths)} calibration images...")
+
+    crops = []
+    embeddings = []
+    for image_path in image_paths:
+        image = cv2.imread(image_path)
+        if image is None:
+            logger.warning(f"⚠️ Could not read {image_path}")
+            continue
+        for face in analyser.get(image):
+            crop, _ = face_align.norm_crop2(image, face.kps, 128)
+            crops.append(crop)
+            embeddings.append(face.normed_embedding)
+        if len(crops) >= max_samples:
+            break
+
+    if len(crops) < 2:
+        raise ValueError(f"Need at least two faces in {calibration_dir}, found {len(crops)}")
+
+    emap = numpy_helper.to_array(emap)
+    samples = []
+    for index, crop in enumerate(crops[:max_samples]):
+        # swap each face with the next one so source and target differ
+        latent = embeddings[(index + 1) % len(crops)].reshape((1, -1))
+        latent = np.dot(latent, emap)
+        latent /= np.linalg.norm(latent)
+        blob = cv2.dnn.blobFromImage(crop, 1.0 / 255.0, (128, 128), (0.0, 0.0, 0.0), swapRB=True)
+        samples.append((blob.astype(np.float32), latent.astype(np.float32)))
+    logger.info(f"✅ Built {len(samples)} calibration samples")
+    return samples
+
+
+class InswapperCalibrationReader(CalibrationDataReader):
+    def __init__(self, samples, input_names):
+        self.samples = samples
+        self.input_names = input_names
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.samples):
+            return None
+        target, source = self.samples[self.index]
+        self.index += 1
+        return {self.input_names[0]: target, self.input_names[1]: source}
+
+    def rewind(self):
+        self.index = 0
+
+
+def get_input_names(model_path):
+    session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    return [model_input.name for model_input in session.get_inputs()]
+
+
+def quantize_model(args, samples, input_names):
+    logger.info(f"🔄 Quantizing {args.input} ({args.mode}) -> {args.output}")
+    if args.mode == 'dynamic':
+        quantize_dynamic(
+            args.input,
+            args.output,
+            weight_type=QUANT_TYPES[args.weight_type],
+            per_channel=args.per_channel,
+        )
+    else:
+        quantize_static(
+            args.input,
+            args.output,
+            InswapperCalibrationReader(samples, input_names),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QUANT_TYPES[args.weight_type],
+            per_channel=args.per_channel,
+        )
+
+
+def run_model(model_path, samples, input_names):
+    session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+    outputs = []
+    start = time.perf_counter()
+    for target, source in samples:
+        outputs.append(session.run(None, {input_names[0]: target, input_names[1]: source})[0])
+    elapsed = time.perf_counter() - start
+    return outputs, elapsed * 1000.0 / len(samples)
+
+
+def compare_models(reference_path, candidate_path, samples, input_names):
+    """Pixel error of the candidate against the reference, in 0-255 units"""
+    reference_outputs, reference_ms = run_model(reference_path, samples, input_names)
+    candidate_outputs, candidate_ms = run_model(candidate_path, samples, input_names)
+
+    abs_errors = []
+    squared_errors = []
+    for reference, candidate in zip(reference_outputs, candidate_outputs):
+        reference = np.clip(reference, 0, 1) * 255.0
+        candidate = np.clip(candidate, 0, 1) * 255.0
+        diff = reference - candidate
+        abs_errors.append(np.abs(diff))
+        squared_errors.append(np.mean(diff ** 2))
+
+    mse = float(np.mean(squared_errors))
+    return {
+        'reference': reference_path,
+        'candidate': candidate_path,
+        'samples': len(samples),
+        'mean_abs_error': float(np.mean([error.mean() for error in abs_errors])),
+        'max_abs_error': float(np.max([error.max() for error in abs_errors])),
+        'psnr_db': float('inf') if mse == 0 else float(10.0 * np.log10(255.0 ** 2 / mse)),
+        'reference_ms_per_face': reference_ms,
+        'candidate_ms_per_face': candidate_ms,
+        'reference_size_mb': os.path.getsize(reference_path) / (1024 * 1024),
+        'candidate_size_mb': os.path.getsize(candidate_path) / (1024 * 1024),
+    }
+
+
+def main():
+    models_dir = os.getenv('MODELS_DIR', '/runpod-volume/faceswap')
+    parser = argparse.ArgumentParser(description='Quantize inswapper to int8 and report its accuracy against fp32')
+    parser.add_argument('--input', default=os.path.join(models_dir, 'inswapper_128.onnx'), help='fp32 reference model')
+    parser.add_argument('--output', default=os.path.join(models_dir, 'inswapper_128_int8.onnx'), help='quantized model path')
+    parser.add_argument('--calibration-dir', required=True, help='directory of face images used for calibration and evaluation')
+    parser.add_argument('--mode', default='dynamic', choices=['dynamic', 'static'])
+    parser.add_argument('--weight-type', default='uint8', choices=list(QUANT_TYPES))
+    parser.add_argument('--per-channel', action='store_true')
+    parser.add_argument('--max-samples', type=int, default=64)
+    parser.add_argument('--insightface-root', default=os.getenv('INSIGHTFACE_HOME', '~/.insightface'))
+    parser.add_argument('--evaluate-only', action='store_true', help='only compare an existing --output model against --input')
+    parser.add_argument('--report', help='write the accuracy report as json to this path')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input):
+        logger.error(f"❌ fp32 reference model not found: {args.input}")
+        logger.error("   Download inswapper_128.onnx to the models directory first")
+        return 1
+
+    emap = load_emap(args.input)
+    input_names = get_input_names(args.input)
+    samples = build_calibration_samples(args.calibration_dir, emap, args.insightface_root, args.max_samples)
+
+    if not args.evaluate_only:
+        quantize_model(args, samples, input_names)
+        restore_emap(args.output, emap)
+        logger.info(f"✅ Saved quantized model to {args.output}")
+
+    report = compare_models(args.input, args.output, samples, input_names)
+    logger.info("📊 Accuracy against the fp32 reference:")
+    for key, value in report.items():
+        logger.info(f"   {key}: {value}")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"📄 Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+InferenceBatcher: when a batch runs, what goes into it and who gets which results.
+
+Every submitting thread first submits a warm-up request without waiting,
+so the batcher knows all of them before the requests under test arrive.
+"""
+
+import threading
+import time
+
+import pytest
+
+from modules.batching import InferenceBatcher
+
+
+class RecordingBatch:
+    """run_batch that records the batch sizes and multiplies every item by 10."""
+
+    def __init__(self):
+        self.sizes = []
+
+    def __call__(self, items):
+        self.sizes.append(len(items))
+        return [item * 10 for item in items]
+
+
+def submit_together(batcher, batch, requests):
+    """Submit each request from its own registered thread at the same time, returns the results."""
+    warmed_up = threading.Barrier(len(requests) + 1)
+    start = threading.Barrier(len(requests) + 1)
+    results = [None] * len(requests)
+    max_wait, batcher.max_wait = batcher.max_wait, 0.0
+
+    def submit(index):
+        batcher.submit([0])
+        warmed_up.wait()
+        start.wait()
+        results[index] = batcher.submit(requests[index])
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    warmed_up.wait()
+    batch.sizes.clear()
+    batcher.max_wait = max_wait
+    start.wait()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_single_submitter_runs_without_waiting():
+    batch = RecordingBatch()
+    batcher = InferenceBatcher(batch, max_batch=8, max_wait=5.0)
+    start = time.monotonic()
+    assert batcher.submit([1, 2]) == [10, 20]
+    assert batcher.submit([3]) == [30]
+    assert time.monotonic() - start < 1.0
+    assert batch.sizes == [2, 1]
+
+
+def test_idle_submitter_is_waited_for_max_wait():
+    batch = RecordingBatch()
+    batcher = InferenceBatcher(batch, max_batch=8, max_wait=0.3)
+    submitted, done = threading.Event(), threading.Event()
+
+    def idle():
+        batcher.submit([0])
+        submitted.set()
+        done.wait()
+
+    thread = threading.Thread(target=idle)
+    thread.start()
+    submitted.wait()
+    start = time.monotonic()
+    assert batcher.submit([1]) == [10]
+    elapsed = time.monotonic() - start
+    done.set()
+    thread.join()
+    assert 0.25 <= elapsed < 2.0
+
+
+def test_exited_submitter_is_not_waited_for():
+    batch = RecordingBatch()
+    batcher = InferenceBatcher(batch, max_batch=8, max_wait=5.0)
+    thread = threading.Thread(target=batcher.submit, args=([0],))
+    thread.start()
+    thread.join()
+    start = time.monotonic()
+    assert batcher.submit([1]) == [10]
+    assert time.monotonic() - start < 1.0
+
+
+def test_concurrent_requests_share_a_batch_in_order():
+    batch = RecordingBatch()
+    batcher = InferenceBatcher(batch, max_batch=8, max_wait=1.0)
+    requests = [[1, 2], [3], [4, 5, 6]]
+    results = submit_together(batcher, batch, requests)
+    assert results == [[10, 20], [30], [40, 50, 60]]
+    assert batch.sizes == [6]
+
+
+def test_request_that_does_not_fit_opens_the_next_batch():
+    batch = RecordingBatch()
+    batcher = InferenceBatcher(batch, max_batch=4, max_wait=1.0)
+    results = submit_together(batcher, batch, [[1, 2, 3], [4, 5, 6]])
+    assert results == [[10, 20, 30], [40, 50, 60]]
+    assert batch.sizes == [3, 3]
+
+
+def test_oversized_request_runs_whole():
+    batch = RecordingBatch()
+    batcher = InferenceBatcher(batch, max_batch=4, max_wait=0.0)
+    assert batcher.submit(list(range(6))) == [item * 10 for item in range(6)]
+    assert batch.sizes == [6]
+
+
+def test_batch_errors_reach_every_request():
+    def fail(items):
+        raise RuntimeError("out of memory")
+
+    batcher = InferenceBatcher(fail, max_batch=4, max_wait=0.0)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        batcher.submit([1])
+    with pytest.raises(RuntimeError, match="out of memory"):
+        batcher.submit([2])
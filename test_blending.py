@@ -0,0 +1,99 @@
+"""
+ROI-local blending against the full-frame operations it replaces.
+
+paste_crop must blend a swapped crop like INSwapper.get with
+paste_back=True does on the full frame, also for rotated faces and faces
+clipped at the frame edge. blend_face_regions must weight the face
+regions like cv2.addWeighted and leave the rest of the frame alone.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from modules.blending import blend_face_regions, paste_crop
+
+CROP_SIZE = 128
+
+
+class CropSession:
+    """Stands in for the inswapper graph, always returns the same RGB crop."""
+
+    def __init__(self, crop):
+        self.pred = (crop[:, :, ::-1].transpose(2, 0, 1)[np.newaxis] / 255.0).astype(np.float32)
+
+    def run(self, output_names, feeds):
+        return [self.pred]
+
+
+def get_swapper(crop):
+    inswapper = pytest.importorskip("insightface.model_zoo.inswapper")
+    swapper = inswapper.INSwapper.__new__(inswapper.INSwapper)
+    swapper.session = CropSession(crop)
+    swapper.input_names = ["target", "source"]
+    swapper.output_names = ["output"]
+    swapper.input_size = (CROP_SIZE, CROP_SIZE)
+    swapper.input_mean = 0.0
+    swapper.input_std = 255.0
+    swapper.emap = np.eye(512, dtype=np.float32)
+    return swapper
+
+
+def get_face(center, size, angle):
+    """A face whose five landmarks are the arcface template, scaled, rotated and moved."""
+    face_align = pytest.importorskip("insightface.utils.face_align")
+    theta = np.deg2rad(angle)
+    rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+    kps = (face_align.arcface_dst - 56.0) @ rotation.T * (size / 112.0) + center
+    return SimpleNamespace(kps=kps.astype(np.float32))
+
+
+@pytest.mark.parametrize(
+    "center, size, angle",
+    [
+        ((320, 240), 150, 0),
+        ((300, 250), 180, 35),
+        ((20, 460), 200, -20),
+        ((630, 10), 120, 60),
+    ],
+    ids=["upright", "rotated", "clipped", "clipped-rotated"],
+)
+def test_paste_crop_matches_paste_back(center, size, angle):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    swapper = get_swapper(rng.integers(0, 256, (CROP_SIZE, CROP_SIZE, 3), dtype=np.uint8))
+    target_face = get_face(np.array(center, dtype=np.float32), size, angle)
+    source_face = SimpleNamespace(normed_embedding=np.ones(512, dtype=np.float32) / np.sqrt(512))
+
+    swapped_crop, affine = swapper.get(frame, target_face, source_face, paste_back=False)
+    expected = swapper.get(frame, target_face, source_face, paste_back=True)
+    result = paste_crop(frame.copy(), swapped_crop, affine)
+
+    # the ROI warp may round a few pixels differently than the full-frame warp
+    difference = np.abs(result.astype(np.int16) - expected.astype(np.int16))
+    assert difference.max() <= 1
+    assert (difference > 0).mean() < 0.001
+
+
+def test_blend_face_regions_matches_add_weighted_inside_the_faces():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    processed_frame = rng.integers(0, 256, frame.shape, dtype=np.uint8)
+    # two overlapping faces share one region, blended once
+    faces = [
+        SimpleNamespace(bbox=np.array([80.0, 60.0, 140.0, 140.0])),
+        SimpleNamespace(bbox=np.array([120.0, 70.0, 180.0, 150.0])),
+    ]
+    expected = cv2.addWeighted(frame, 0.4, processed_frame, 0.6, 0)
+    result = blend_face_regions(frame.copy(), processed_frame, faces, 0.6)
+
+    for x0, y0, x1, y1 in (face.bbox.astype(int) for face in faces):
+        difference = np.abs(result[y0:y1, x0:x1].astype(np.int16) - expected[y0:y1, x0:x1])
+        assert difference.max() <= 1
+    # the faces grown by half their size on every side, nothing outside is touched
+    untouched = np.ones(frame.shape[:2], dtype=bool)
+    untouched[20:190, 50:210] = False
+    assert np.array_equal(result[untouched], frame[untouched])
@@ -0,0 +1,53 @@
+"""
+Capability probes and the negative cache of failed model loads.
+"""
+
+import pytest
+
+import modules.globals
+from modules import capabilities
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.setattr(capabilities, "CAPABILITIES", {})
+    monkeypatch.setattr(capabilities, "CAPABILITY_ERRORS", {})
+    monkeypatch.setattr(capabilities, "FAILED_LOADS", {})
+
+
+def test_missing_module_is_not_available(monkeypatch):
+    calls = []
+
+    def probe():
+        calls.append(1)
+        capabilities.require_modules("a_module_that_is_not_installed")
+
+    monkeypatch.setitem(capabilities.CAPABILITY_PROBES, "nsfw", probe)
+    assert capabilities.is_available("nsfw") is False
+    assert capabilities.is_available("nsfw") is False
+    assert calls == [1]
+    assert "a_module_that_is_not_installed" in capabilities.CAPABILITY_ERRORS["nsfw"]
+
+
+def test_probe_capabilities_probes_each_subsystem_once(monkeypatch):
+    calls = []
+    probes = {name: (lambda name=name: calls.append(name)) for name in ("a", "b")}
+    monkeypatch.setattr(capabilities, "CAPABILITY_PROBES", probes)
+    assert capabilities.probe_capabilities() == {"a": True, "b": True}
+    assert capabilities.probe_capabilities() == {"a": True, "b": True}
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_failed_load_is_skipped_until_the_retry_interval(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(capabilities.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(modules.globals, "load_retry_interval", 60.0)
+    key = ("super_resolution", 4)
+    assert not capabilities.has_load_failed(key)
+    capabilities.record_load_failure(key, RuntimeError("no weights"))
+    now[0] += 59.0
+    assert capabilities.has_load_failed(key)
+    assert capabilities.get_capabilities()["failed_loads"] == [str(key)]
+    now[0] += 2.0
+    assert not capabilities.has_load_failed(key)
+    assert capabilities.get_capabilities()["failed_loads"] == []
@@ -0,0 +1,86 @@
+"""
+Parity of the torch and onnx face enhancer backends.
+
+Both wrappers must turn a crop into the same network input and a network
+output into the same crop, and the torch backend must run without noise
+injection, like the exported graph.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+face_enhancer = pytest.importorskip("modules.processors.frame.face_enhancer")
+torch = pytest.importorskip("torch")
+pytest.importorskip("basicsr")
+pytest.importorskip("torchvision")
+
+import modules.globals
+
+
+class IdentityGFPGAN:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, batch, **kwargs):
+        self.calls.append(kwargs)
+        return (batch,)
+
+
+class IdentityEnhancer:
+    device = "cpu"
+
+    def __init__(self):
+        self.gfpgan = IdentityGFPGAN()
+
+
+class IdentityInput:
+    name = "input"
+
+
+class IdentitySession:
+    def get_inputs(self):
+        return [IdentityInput()]
+
+    def run(self, output_names, feeds):
+        return [feeds["input"]]
+
+
+def get_crops(count=3):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (512, 512, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def test_torch_backend_disables_noise(monkeypatch):
+    enhancer = IdentityEnhancer()
+    monkeypatch.setattr(face_enhancer, "get_face_enhancer", lambda: enhancer)
+    face_enhancer.run_face_enhancer_torch(get_crops(1))
+    assert enhancer.gfpgan.calls == [{"return_rgb": False, "randomize_noise": False, "weight": 0.5}]
+
+
+def test_wrappers_match_on_identity_network(monkeypatch):
+    monkeypatch.setattr(face_enhancer, "get_face_enhancer", IdentityEnhancer)
+    monkeypatch.setattr(face_enhancer, "get_face_enhancer_session", IdentitySession)
+    crops = get_crops()
+    torch_outputs = face_enhancer.run_face_enhancer_torch(crops)
+    onnx_outputs = face_enhancer.run_face_enhancer_onnx(crops)
+    for crop, torch_output, onnx_output in zip(crops, torch_outputs, onnx_outputs):
+        assert torch_output.dtype == onnx_output.dtype == np.uint8
+        assert np.array_equal(torch_output, crop)
+        assert np.array_equal(onnx_output, crop)
+
+
+def test_exported_graph_matches_torch_backend(monkeypatch):
+    pytest.importorskip("gfpgan")
+    pytest.importorskip("onnxruntime")
+    models_dir = modules.globals.get_models_dir()
+    for model_name in ("GFPGANv1.4.pth", face_enhancer.ENHANCER_ONNX_MODELS["fp32"]):
+        if not os.path.isfile(os.path.join(models_dir, model_name)):
+            pytest.skip(f"{model_name} not found in {models_dir}")
+    monkeypatch.setattr(modules.globals, "face_enhancer_precision", "fp32")
+    crops = get_crops(2)
+    torch_outputs = np.stack(face_enhancer.run_face_enhancer_torch(crops)).astype(np.float32)
+    onnx_outputs = np.stack(face_enhancer.run_face_enhancer_onnx(crops)).astype(np.float32)
+    # the parity threshold of runpod/export_gfpgan_onnx.py, in 0-255 units
+    assert np.abs(torch_outputs - onnx_outputs).mean() <= 1.0
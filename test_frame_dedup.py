@@ -0,0 +1,87 @@
+"""
+Frame deduplication thresholds: only near-exact repeats reuse an output.
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import modules.globals
+from modules.frame_dedup import FrameDeduplicator, find_duplicate_frames
+
+
+@pytest.fixture(autouse=True)
+def dedup_settings(monkeypatch):
+    monkeypatch.setattr(modules.globals, "frame_dedup", True)
+    monkeypatch.setattr(modules.globals, "frame_dedup_threshold", 2.0)
+
+
+def get_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 200, (64, 64, 3), dtype=np.uint8)
+    return cv2.resize(frame, (256, 256), interpolation=cv2.INTER_NEAREST)
+
+
+def test_repeated_frame_reuses_the_output():
+    deduplicator = FrameDeduplicator()
+    frame = get_frame()
+    assert deduplicator.lookup(frame) is None
+    output = frame + 1
+    deduplicator.store(output)
+    assert deduplicator.lookup(frame.copy()) is output
+    assert deduplicator.duplicates == 1
+
+
+def test_sensor_noise_is_a_repeat():
+    deduplicator = FrameDeduplicator()
+    frame = get_frame()
+    deduplicator.lookup(frame)
+    deduplicator.store(frame)
+    noise = np.random.default_rng(1).integers(0, 2, frame.shape, dtype=np.uint8)
+    assert deduplicator.lookup(frame + noise) is frame
+
+
+def test_local_motion_is_not_a_repeat():
+    # a mouth-sized patch changes, the mean difference stays far below the threshold
+    deduplicator = FrameDeduplicator()
+    frame = get_frame()
+    deduplicator.lookup(frame)
+    deduplicator.store(frame)
+    moved = frame.copy()
+    moved[160:176, 112:144] = 255
+    assert np.abs(moved.astype(np.float32) - frame).mean() < 2.0
+    assert deduplicator.lookup(moved) is None
+
+
+def test_runs_compare_against_their_first_frame():
+    # every step is within the threshold, the drift from the first frame is not
+    deduplicator = FrameDeduplicator()
+    frame = get_frame().astype(np.int16)
+    deduplicator.lookup(frame.astype(np.uint8))
+    deduplicator.store(frame.astype(np.uint8))
+    results = [deduplicator.lookup((frame + step).astype(np.uint8)) for step in (1, 2, 3)]
+    assert results[0] is not None and results[1] is not None
+    assert results[2] is None
+
+
+def test_disabled_deduplication_never_reuses(monkeypatch):
+    monkeypatch.setattr(modules.globals, "frame_dedup", False)
+    deduplicator = FrameDeduplicator()
+    frame = get_frame()
+    deduplicator.lookup(frame)
+    deduplicator.store(frame)
+    assert deduplicator.lookup(frame) is None
+
+
+def test_find_duplicate_frames(tmp_path):
+    frames = [get_frame(0), get_frame(0), get_frame(1), get_frame(1), get_frame(0)]
+    frame_paths = []
+    for index, frame in enumerate(frames):
+        frame_path = str(tmp_path / f"{index:04d}.png")
+        cv2.imwrite(frame_path, frame)
+        frame_paths.append(frame_path)
+    assert find_duplicate_frames(frame_paths) == {
+        frame_paths[1]: frame_paths[0],
+        frame_paths[3]: frame_paths[2],
+    }
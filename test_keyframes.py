@@ -0,0 +1,56 @@
+"""
+Keyframe propagation: landmarks tracked between keyframes and the crops
+cross-faded by temporal distance.
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from modules.keyframes import blend_tracked_faces, propagate_segment
+
+KPS = np.array([[90, 100], [150, 100], [120, 130], [95, 160], [145, 160]], dtype=np.float32)
+
+
+def get_frames(count, shift):
+    """Textured frames moving right by shift pixels per frame."""
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(0, 256, (240, 400, 3), dtype=np.uint8), (7, 7), 2)
+    return [np.roll(texture, index * shift, axis=1) for index in range(count)]
+
+
+def get_crop(value):
+    return np.full((128, 128, 3), value, dtype=np.uint8)
+
+
+def test_intermediate_frames_follow_the_motion_and_fade_the_crops():
+    frames = get_frames(5, 3)
+    start_faces = [(KPS, get_crop(0))]
+    end_faces = [(KPS + (12, 0), get_crop(200))]
+    propagated = []
+
+    def propagate(frame, faces):
+        propagated.append(faces)
+        return frame
+
+    results = propagate_segment(frames, start_faces, end_faces, propagate)
+    assert len(results) == 3
+    for offset, faces in enumerate(propagated, 1):
+        assert len(faces) == 1
+        kps, crop = faces[0]
+        np.testing.assert_allclose(kps, KPS + (3 * offset, 0), atol=0.5)
+        assert abs(int(crop[0, 0, 0]) - 200 * offset / 4) <= 1
+
+
+def test_one_sided_faces_keep_their_crop():
+    start_points = [KPS]
+    end_points = [None, KPS + (200, 0)]
+    end_faces = [(KPS, get_crop(50)), (KPS + (200, 0), get_crop(100))]
+    faces = blend_tracked_faces([(KPS, get_crop(10))], start_points, end_faces, end_points, 0.5)
+    assert [int(crop[0, 0, 0]) for _, crop in faces] == [10, 100]
+
+
+def test_lost_faces_are_dropped():
+    faces = blend_tracked_faces([(KPS, get_crop(10))], [None], [(KPS, get_crop(50))], [None], 0.5)
+    assert faces == []
@@ -0,0 +1,49 @@
+"""
+Output size planning: one output size per quality tier, reached by the
+largest super resolution scale that does not overshoot it.
+"""
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from modules.output_resolution import OUTPUT_QUALITY_TIERS, plan_output
+
+
+@pytest.mark.parametrize(
+    "size, quality, output_size, sr_scale, sr_input_size",
+    [
+        # small images reach min_long_side with the smallest scale that gets there
+        ((640, 480), "fast", (1280, 960), 2, None),
+        ((900, 700), "max", (1800, 1400), 2, None),
+        ((640, 480), "max", (2560, 1920), 4, None),
+        # the largest scale allowed when none reaches it
+        ((300, 200), "balanced", (768, 512), 2, None),
+        # images meeting the tier are left alone
+        ((1500, 1000), "fast", (1500, 1000), 0, None),
+        # a short side below min_short_side is brought up, past the model scale
+        ((1000, 200), "balanced", (2560, 512), 2, None),
+        # capped by max_side, under 1.5x a resize is enough
+        ((1600, 400), "fast", (2048, 512), 0, None),
+        # capped between 1.5x and 2x, the 2x model runs on a downsized frame
+        ((1200, 300), "fast", (2048, 512), 2, (1024, 256)),
+    ],
+)
+def test_plan_output(size, quality, output_size, sr_scale, sr_input_size):
+    plan = plan_output(*size, quality)
+    assert plan["input_size"] == size
+    assert plan["output_size"] == output_size
+    assert plan["sr_scale"] == sr_scale
+    assert plan["sr_input_size"] == sr_input_size
+
+
+@pytest.mark.parametrize("quality", sorted(OUTPUT_QUALITY_TIERS))
+@pytest.mark.parametrize("size", [(64, 64), (320, 180), (1080, 1920), (5000, 3000)])
+def test_plan_stays_within_the_tier(quality, size):
+    tier = OUTPUT_QUALITY_TIERS[quality]
+    plan = plan_output(*size, quality)
+    width, height = plan["output_size"]
+    assert max(width, height) <= max(tier["max_side"], max(size))
+    assert plan["sr_scale"] <= tier["max_sr_scale"]
+    if plan["sr_input_size"] is not None:
+        assert plan["sr_scale"] * plan["sr_input_size"][0] == pytest.approx(width, abs=plan["sr_scale"])
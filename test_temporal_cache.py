@@ -0,0 +1,83 @@
+"""
+Temporal reuse of face crops: what reuses a cached crop and what recomputes it.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+import modules.globals
+from modules.temporal_cache import cache_crop, get_cached_crop, reset_temporal_cache
+
+
+@pytest.fixture(autouse=True)
+def reuse_settings(monkeypatch):
+    monkeypatch.setattr(modules.globals, "temporal_reuse", True)
+    monkeypatch.setattr(modules.globals, "temporal_reuse_threshold", 4.0)
+    monkeypatch.setattr(modules.globals, "temporal_reuse_max", 3)
+    reset_temporal_cache()
+    yield
+    reset_temporal_cache()
+
+
+def get_face(x=100.0):
+    return SimpleNamespace(bbox=np.array([x, 100.0, x + 100.0, 200.0], dtype=np.float32))
+
+
+def get_crop():
+    return np.random.default_rng(0).integers(0, 200, (128, 128, 3), dtype=np.uint8)
+
+
+def compute(stage, face, crop):
+    """Look the crop up and cache a fresh output on a miss, returns the output and whether it was reused."""
+    cached_crop, thumbnail = get_cached_crop(stage, face, crop)
+    if cached_crop is not None:
+        return cached_crop, True
+    output = crop + 1
+    cache_crop(stage, face, thumbnail, output)
+    return output, False
+
+
+def test_unchanged_face_reuses_its_crop():
+    crop = get_crop()
+    output, reused = compute("swap", get_face(), crop)
+    assert not reused
+    cached_output, reused = compute("swap", get_face(102.0), crop.copy())
+    assert reused and cached_output is output
+
+
+def test_mouth_motion_is_recomputed():
+    crop = get_crop()
+    compute("swap", get_face(), crop)
+    moved = crop.copy()
+    moved[88:100, 48:80] = 255
+    assert compute("swap", get_face(), moved)[1] is False
+
+
+def test_moved_face_is_a_new_track():
+    crop = get_crop()
+    compute("swap", get_face(), crop)
+    assert compute("swap", get_face(300.0), crop)[1] is False
+
+
+def test_reuse_is_limited_in_a_row():
+    crop = get_crop()
+    reused = [compute("swap", get_face(), crop)[1] for _ in range(6)]
+    assert reused == [False, True, True, True, False, True]
+
+
+def test_stages_are_reset_separately():
+    crop = get_crop()
+    compute("swap", get_face(), crop)
+    compute("enhance", get_face(), crop)
+    reset_temporal_cache("enhance")
+    assert compute("swap", get_face(), crop)[1] is True
+    assert compute("enhance", get_face(), crop)[1] is False
+
+
+def test_disabled_reuse_skips_the_cache(monkeypatch):
+    monkeypatch.setattr(modules.globals, "temporal_reuse", False)
+    assert get_cached_crop("swap", get_face(), get_crop()) == (None, None)
@@ -0,0 +1,59 @@
+"""
+Super resolution tile planning: the largest tile that fits the memory
+budget, split evenly over the image, and as many tiles per pass as fit.
+"""
+
+import pytest
+
+super_resolution = pytest.importorskip("modules.processors.frame.super_resolution")
+
+import modules.globals
+from modules.processors.frame.super_resolution import estimate_tile_memory, plan_tiles, split_evenly
+
+SCALE = 4
+ELEMENT_SIZE = 4
+
+
+@pytest.fixture(autouse=True)
+def tile_settings(monkeypatch):
+    monkeypatch.setattr(modules.globals, "sr_tile_size", 0)
+    monkeypatch.setattr(modules.globals, "sr_tile_batch_size", 4)
+    monkeypatch.setattr(modules.globals, "sr_memory_fraction", 0.5)
+
+
+def get_available(tile_size, tiles=1):
+    """Free memory whose budget holds exactly tiles square tiles of tile_size."""
+    return tiles * estimate_tile_memory(tile_size, tile_size, SCALE, ELEMENT_SIZE) / 0.5
+
+
+@pytest.mark.parametrize("size", [1, 7, 8, 100, 511, 512, 513, 1000, 4097])
+@pytest.mark.parametrize("tile_size", [128, 512, 1024])
+def test_split_evenly(size, tile_size):
+    length, count = split_evenly(size, tile_size)
+    assert count == -(-size // tile_size)
+    assert length % 8 == 0
+    assert length * count >= size
+    assert length - 8 < -(-size // count)
+
+
+def test_largest_fitting_tile_is_split_evenly():
+    # 512 tiles fit, 768 ones do not: 1000 rows take two 500 (504) tiles, not 512 + 488
+    assert plan_tiles(1000, 700, SCALE, ELEMENT_SIZE, get_available(512)) == (504, 352, 1)
+
+
+def test_smallest_tile_when_nothing_fits():
+    assert plan_tiles(300, 300, SCALE, ELEMENT_SIZE, 0) == (104, 104, 1)
+
+
+def test_tiles_are_batched_as_far_as_the_budget_allows(monkeypatch):
+    monkeypatch.setattr(modules.globals, "sr_tile_size", 256)
+    assert plan_tiles(1000, 1000, SCALE, ELEMENT_SIZE, get_available(256, 3)) == (256, 256, 3)
+    # capped by --sr-tile-batch-size
+    assert plan_tiles(1000, 1000, SCALE, ELEMENT_SIZE, get_available(256, 100)) == (256, 256, 4)
+    # and by the number of tiles
+    assert plan_tiles(200, 200, SCALE, ELEMENT_SIZE, get_available(256, 100)) == (200, 200, 1)
+
+
+def test_half_precision_fits_larger_tiles():
+    available = get_available(768)
+    assert plan_tiles(2000, 2000, SCALE, 2, available)[0] > plan_tiles(2000, 2000, SCALE, 4, available)[0]